@@ -13,6 +13,7 @@ from crypto_alerts import (
     detener_monitor_criptoalertas,
 )
 from routes import routes  # nuestro nuevo módulo de rutas
+from services import calentar_conexiones
 
 MODO_TESTER = False
 
@@ -20,6 +21,10 @@ LOCAL_MODE=os.getenv("LOCAL_MODE",False) in ("true", "y")
 
 load_dotenv()
 
+# Solo webhook: las entregas y el monitor corren en `python -m reminders --worker`,
+# lo que permite levantar varios workers de gunicorn sin duplicar envíos.
+WEB_ONLY = os.getenv("WEB_ONLY", "false").lower() in ("true", "y", "1")
+
 app = Flask(__name__)
 app.register_blueprint(routes)
 
@@ -29,8 +34,9 @@ def Modo_Tester(valor:bool):
 def cerrar_aplicacion():
     """Cierra correctamente los recursos al terminar la aplicación."""
     print("Cerrando aplicación...")
-    detener_monitor_criptoalertas()
-    detener_administrador()
+    if not WEB_ONLY:
+        detener_monitor_criptoalertas()
+        detener_administrador()
     print("Recursos liberados")
     print("Estableciendo servidor remoto...")
     
@@ -41,6 +47,7 @@ def cerrar_aplicacion():
     os._exit(0)
 
 # Al arrancar la aplicación
+calentar_conexiones()
 db_ok = inicializar_supabase()
 
 if not db_ok:
@@ -49,8 +56,11 @@ if not db_ok:
 else:
     print("✅  Conexión a base de datos exitosa.")
     app.config['MAINTENANCE_MODE'] = False
-    iniciar_administrador()
-    iniciar_monitor_criptoalertas()
+    if WEB_ONLY:
+        print("Modo WEB_ONLY: las entregas las realiza el worker de recordatorios.")
+    else:
+        iniciar_administrador()
+        iniciar_monitor_criptoalertas()
 # Registrar cierre limpio
 atexit.register(cerrar_aplicacion)
 signal.signal(signal.SIGINT, lambda s,f: cerrar_aplicacion())
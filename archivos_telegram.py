@@ -0,0 +1,130 @@
+"""Caché local (SQLite) de los ``file_id`` de documentos e imágenes ya subidos a Telegram."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+# Archivo SQLite de la caché; vacío la desactiva y cada envío vuelve a subir el archivo.
+TELEGRAM_FILE_CACHE_PATH = os.getenv("TELEGRAM_FILE_CACHE_PATH", "archivos_telegram.db")
+
+_BLOQUE_LECTURA = 1024 * 1024
+
+
+def huella_archivo(ruta):
+    """SHA-256 del contenido, leído por bloques."""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        while bloque := archivo.read(_BLOQUE_LECTURA):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class CacheArchivosTelegram:
+    """
+    Recuerda el ``file_id`` que Telegram devolvió al subir cada archivo, por
+    ruta, tipo (``document`` o ``photo``) y huella del contenido.
+
+    Mientras tamaño y fecha de modificación no cambien se confía en la huella
+    guardada y no se relee el archivo; si cambian, se recalcula y un contenido
+    distinto invalida el ``file_id``. El mismo contenido en otra ruta también
+    reutiliza el ``file_id`` ya conocido.
+    """
+
+    def __init__(self, ruta=TELEGRAM_FILE_CACHE_PATH, reloj=time.time):
+        self.ruta = ruta
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archivos (
+                ruta TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                huella TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                file_id TEXT NOT NULL,
+                actualizado_en REAL NOT NULL,
+                PRIMARY KEY (ruta, tipo)
+            );
+            CREATE INDEX IF NOT EXISTS idx_archivos_huella ON archivos (tipo, huella);
+        """)
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def buscar(self, ruta, tipo):
+        """
+        Devuelve ``(file_id, huella)``; ``file_id`` es None si el contenido
+        actual nunca se subió como ``tipo``. Sin acceso al archivo devuelve
+        ``(None, None)`` y el envío normal reporta el error.
+        """
+        ruta = os.path.abspath(ruta)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            return None, None
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT huella, tamano, mtime_ns, file_id FROM archivos "
+                "WHERE ruta = ? AND tipo = ?",
+                (ruta, tipo),
+            ).fetchone()
+        if fila and (fila[1], fila[2]) == (estado.st_size, estado.st_mtime_ns):
+            return fila[3], fila[0]
+
+        try:
+            huella = huella_archivo(ruta)
+        except OSError:
+            return None, None
+        with self._lock:
+            conocido = self._conn.execute(
+                "SELECT file_id FROM archivos WHERE tipo = ? AND huella = ? "
+                "ORDER BY actualizado_en DESC LIMIT 1",
+                (tipo, huella),
+            ).fetchone()
+        if conocido:
+            self.guardar(ruta, tipo, huella, conocido[0])
+            return conocido[0], huella
+        return None, huella
+
+    def guardar(self, ruta, tipo, huella, file_id):
+        ruta = os.path.abspath(ruta)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO archivos
+                    (ruta, tipo, huella, tamano, mtime_ns, file_id, actualizado_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ruta, tipo) DO UPDATE SET
+                    huella = excluded.huella,
+                    tamano = excluded.tamano,
+                    mtime_ns = excluded.mtime_ns,
+                    file_id = excluded.file_id,
+                    actualizado_en = excluded.actualizado_en
+                """,
+                (ruta, tipo, huella, estado.st_size, estado.st_mtime_ns,
+                 file_id, self._reloj()),
+            )
+
+    def olvidar(self, ruta, tipo):
+        """Descarta el ``file_id`` de ``ruta`` (y de su contenido) si Telegram lo rechazó."""
+        ruta = os.path.abspath(ruta)
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT huella FROM archivos WHERE ruta = ? AND tipo = ?", (ruta, tipo)
+            ).fetchone()
+            if fila:
+                self._conn.execute(
+                    "DELETE FROM archivos WHERE tipo = ? AND huella = ?", (tipo, fila[0])
+                )
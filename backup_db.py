@@ -2,11 +2,21 @@
 backup_db.py — Backup automático: Supabase → Docker Postgres
 Se ejecuta como tarea programada cada 30 minutos dentro del bot.
 
-Estrategia: TRUNCATE + INSERT (copia completa, simple y confiable).
+Estrategia incremental: cada tabla guarda en `_backup_metadata` su marca de
+agua (el mayor `actualizado_en` copiado) y en cada ciclo solo se leen y se
+hacen UPSERT de las filas modificadas desde entonces. Las bajas se detectan
+comparando periódicamente el conjunto de claves de Supabase con el del backup.
 """
 import os
+import json
 import logging
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+
+from planificador import iso_utc, marca_tiempo_utc
 
 logger = logging.getLogger("backup_db")
 
@@ -29,6 +39,38 @@ TABLAS_A_RESPALDAR = [
     "cripto_alertas",
 ]
 
+# Clave única de cada tabla, igual en Supabase y en el backup (ON CONFLICT).
+CLAVES_TABLAS = {
+    "recordatorios": "id",
+    "chats_info": "chat_id",
+    "chats_id_estados": "chat_id",
+    "actualizaciones_info": "id",
+    "chats_avisados_actualizaciones": "chat_id",
+    "reportes": "id",
+    "cripto_premium_users": "chat_id",
+    "cripto_alertas": "id",
+}
+
+# Columna que Supabase renueva en cada alta o edición (setup_supabase.py).
+COLUMNA_MARCA_AGUA = "actualizado_en"
+# Se relee este margen antes de la marca por si una transacción confirmó tarde.
+BACKUP_WATERMARK_OVERLAP_SECONDS = 120
+# Cada cuánto se comparan las claves para borrar del backup las bajas.
+BACKUP_RECONCILE_HOURS = float(os.getenv("BACKUP_RECONCILE_HOURS", "6"))
+BACKUP_PAGE_SIZE = 1000
+# Tablas respaldadas a la vez, cada una con su conexión y su cliente.
+BACKUP_WORKERS = max(1, int(os.getenv("BACKUP_WORKERS", "4")))
+# Plazo de todo el ciclo; queda por debajo de los 30 min entre backups.
+BACKUP_DEADLINE_SECONDS = float(os.getenv("BACKUP_DEADLINE_SECONDS", "1500"))
+# Filas que se aplican por cada COPY; acota la memoria de tablas grandes.
+BACKUP_BATCH_ROWS = 10000
+# Tamaño de cada bloque que COPY envía al servidor.
+BACKUP_COPY_BUFFER = 1 << 16
+
+# Tablas del último ciclo que seguían en curso al vencer su plazo; mientras no
+# terminen no empieza otro ciclo.
+_rezagados = []
+
 
 def _get_pg_connection():
     """Crea conexión al Postgres de backup."""
@@ -93,65 +135,359 @@ def _asegurar_esquema_cripto(conn):
     conn.commit()
 
 
-def backup_tabla(supabase_client, conn, tabla):
-    """Copia completa de una tabla de Supabase a Postgres local (TRUNCATE + INSERT)."""
+def _asegurar_esquema_incremental(conn):
+    """Columnas de marca de agua y de control del backup incremental."""
+    cursor = conn.cursor()
+    for tabla in TABLAS_A_RESPALDAR:
+        cursor.execute(
+            f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS "
+            f"{COLUMNA_MARCA_AGUA} TIMESTAMPTZ DEFAULT NOW()"
+        )
+    cursor.execute("""
+        ALTER TABLE _backup_metadata
+            ADD COLUMN IF NOT EXISTS marca_agua TEXT,
+            ADD COLUMN IF NOT EXISTS ultima_conciliacion TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS registros_eliminados INTEGER DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS duracion_segundos REAL,
+            ADD COLUMN IF NOT EXISTS huella TEXT;
+    """)
+    conn.commit()
+
+
+def _leer_metadata(cursor, tabla):
+    cursor.execute(
+        "SELECT marca_agua, ultima_conciliacion, huella FROM _backup_metadata "
+        "WHERE tabla = %s",
+        (tabla,),
+    )
+    fila = cursor.fetchone()
+    return fila if fila else (None, None, None)
+
+
+def _huella_supabase(supabase_client, tabla):
+    """
+    Huella barata de una tabla de Supabase: filas, clave máxima y mayor
+    ``actualizado_en`` (dos consultas de una fila). Con el trigger de
+    ``actualizado_en`` cualquier alta, edición o baja la cambia. Devuelve
+    ``(huella, filas)`` o ``(None, None)`` si no se puede calcular, por
+    ejemplo si la tabla aún no tiene la columna.
+    """
+    clave = CLAVES_TABLAS[tabla]
     try:
-        # 1. Leer todos los datos de Supabase
-        response = supabase_client.table(tabla).select("*").execute()
-        datos = response.data
-        
-        if not datos:
-            logger.info(f"Backup [{tabla}]: 0 registros (tabla vacía en Supabase)")
-            return 0
+        conteo = (
+            supabase_client.table(tabla).select(clave, count="exact")
+            .order(clave, desc=True).limit(1).execute()
+        )
+        ultima = (
+            supabase_client.table(tabla).select(COLUMNA_MARCA_AGUA)
+            .order(COLUMNA_MARCA_AGUA, desc=True).limit(1).execute()
+        )
+    except Exception as e:
+        logger.warning(f"Backup [{tabla}]: Sin huella de cambios ({e})")
+        return None, None
+    if conteo.count is None:
+        return None, None
+    clave_maxima = conteo.data[0][clave] if conteo.data else None
+    marca_maxima = ultima.data[0][COLUMNA_MARCA_AGUA] if ultima.data else None
+    return f"{conteo.count}|{clave_maxima}|{marca_maxima}", conteo.count
+
+
+def _leer_supabase(supabase_client, tabla, columnas="*", desde=None,
+                   pagina_tamano=BACKUP_PAGE_SIZE, fin=None, detener=None):
+    """
+    Recorre una tabla con paginación por clave. Con ``desde`` solo trae las
+    filas con ``actualizado_en >= desde``. ``fin`` y ``detener`` se revisan
+    en cada página.
+    """
+    from supabase_db import iterar_tabla
+
+    filtros = [] if desde is None else [(COLUMNA_MARCA_AGUA, "gte", desde)]
+    filas = iterar_tabla(
+        tabla, columnas, clave=CLAVES_TABLAS[tabla], filtros=filtros,
+        pagina_tamano=pagina_tamano, cliente=supabase_client,
+    )
+    if fin is None and detener is None:
+        return filas
+    return _con_plazo(filas, pagina_tamano, fin, detener)
+
+
+def _con_plazo(filas, cada, fin, detener):
+    for numero, fila in enumerate(filas):
+        if numero % cada == 0:
+            _verificar_plazo(fin, detener)
+        yield fila
+
+
+def _en_lotes(filas, tamano=None):
+    filas = iter(filas)
+    while lote := list(islice(filas, tamano or BACKUP_BATCH_ROWS)):
+        yield lote
+
+
+def _sql_upsert(tabla, columnas, origen):
+    """INSERT ... ON CONFLICT por la clave; ``origen`` es VALUES o un SELECT."""
+    clave = CLAVES_TABLAS[tabla]
+    cols = ", ".join(f'"{c}"' for c in columnas)
+    actualizar = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in columnas if c != clave)
+    return (
+        f'INSERT INTO {tabla} ({cols}) {origen} '
+        f'ON CONFLICT ("{clave}") DO '
+        + (f"UPDATE SET {actualizar}" if actualizar else "NOTHING")
+    )
+
+
+def _upsert_por_fila(cursor, tabla, filas, columnas):
+    """UPSERT con un SAVEPOINT por fila: aísla las filas incompatibles."""
+    clave = CLAVES_TABLAS[tabla]
+    placeholders = ", ".join(["%s"] * len(columnas))
+    upsert_sql = _sql_upsert(tabla, columnas, f"VALUES ({placeholders})")
+
+    copiados = 0
+    for fila in filas:
+        valores = tuple(fila.get(c) for c in columnas)
+        try:
+            cursor.execute("SAVEPOINT fila_save")
+            cursor.execute(upsert_sql, valores)
+            cursor.execute("RELEASE SAVEPOINT fila_save")
+            copiados += 1
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT fila_save")
+            logger.warning(f"Backup [{tabla}]: Error copiando fila {fila.get(clave, '?')}: {e}")
+    return copiados
+
+
+def _valor_copy(valor):
+    """Un campo en el formato de texto de COPY."""
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, bool):
+        return "t" if valor else "f"
+    if isinstance(valor, (dict, list)):
+        valor = json.dumps(valor, ensure_ascii=False)
+    return (
+        str(valor)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class _LectorCopy:
+    """Archivo de solo lectura que genera las líneas de COPY bajo demanda."""
+
+    def __init__(self, filas, columnas):
+        self._lineas = (
+            "\t".join(_valor_copy(fila.get(c)) for c in columnas) + "\n"
+            for fila in filas
+        )
+        self._resto = ""
+
+    def read(self, size=-1):
+        partes, n = [self._resto], len(self._resto)
+        for linea in self._lineas:
+            partes.append(linea)
+            n += len(linea)
+            if 0 <= size <= n:
+                break
+        datos = "".join(partes)
+        if size < 0:
+            self._resto = ""
+            return datos
+        self._resto = datos[size:]
+        return datos[:size]
+
+
+def _copiar_filas(cursor, tabla, filas, columnas):
+    """
+    Carga masiva: COPY a una tabla temporal y un solo UPSERT hacia ``tabla``.
+    Lanza la excepción de Postgres si alguna fila no es compatible.
+    """
+    clave = CLAVES_TABLAS[tabla]
+    # El margen de relectura puede traer la misma fila dos veces: gana la última.
+    unicas = {fila.get(clave): fila for fila in filas}
+    cols = ", ".join(f'"{c}"' for c in columnas)
+    cursor.execute(
+        f"CREATE TEMP TABLE _staging_backup ON COMMIT DROP AS "
+        f"SELECT {cols} FROM {tabla} WITH NO DATA"
+    )
+    cursor.copy_expert(
+        f"COPY _staging_backup ({cols}) FROM STDIN",
+        _LectorCopy(unicas.values(), columnas),
+        size=BACKUP_COPY_BUFFER,
+    )
+    cursor.execute(_sql_upsert(tabla, columnas, f"SELECT {cols} FROM _staging_backup"))
+    copiados = cursor.rowcount
+    cursor.execute("DROP TABLE _staging_backup")
+    return copiados
 
+
+def _upsert_filas(cursor, tabla, filas, columnas):
+    """
+    Aplica las filas con COPY + UPSERT. Si la carga masiva falla (un valor
+    incompatible, por ejemplo) se deshace y se repite fila por fila.
+    """
+    cursor.execute("SAVEPOINT copia_masiva")
+    try:
+        copiados = _copiar_filas(cursor, tabla, filas, columnas)
+        cursor.execute("RELEASE SAVEPOINT copia_masiva")
+        return copiados
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT copia_masiva")
+        logger.warning(f"Backup [{tabla}]: COPY falló ({e}); se copia fila por fila")
+    return _upsert_por_fila(cursor, tabla, filas, columnas)
+
+
+def _conciliar_bajas(supabase_client, cursor, tabla, fin=None, detener=None):
+    """Borra del backup las filas cuya clave ya no existe en Supabase."""
+    clave = CLAVES_TABLAS[tabla]
+    cursor.execute("CREATE TEMP TABLE _claves_vivas (clave TEXT PRIMARY KEY) ON COMMIT DROP")
+    leidas = _leer_supabase(supabase_client, tabla, clave, fin=fin, detener=detener)
+    for lote in _en_lotes(leidas):
+        cursor.execute(
+            "INSERT INTO _claves_vivas SELECT DISTINCT unnest(%s::text[])",
+            ([str(f[clave]) for f in lote],),
+        )
+    cursor.execute(
+        f'DELETE FROM {tabla} t WHERE NOT EXISTS '
+        f'(SELECT 1 FROM _claves_vivas v WHERE v.clave = t."{clave}"::text)'
+    )
+    return cursor.rowcount
+
+
+def _toca_conciliar(marca_agua, ultima_conciliacion, ahora):
+    # Sin marca de agua (tabla sin actualizado_en) las bajas se revisan siempre.
+    if marca_agua is None or ultima_conciliacion is None:
+        return True
+    if ultima_conciliacion.tzinfo is None:
+        ultima_conciliacion = ultima_conciliacion.replace(tzinfo=timezone.utc)
+    return ahora - ultima_conciliacion >= timedelta(hours=BACKUP_RECONCILE_HOURS)
+
+
+def _verificar_plazo(fin, detener=None):
+    if detener is not None and detener.is_set():
+        raise TimeoutError("backup detenido al vencer el plazo del ciclo")
+    if fin is not None and time.monotonic() >= fin:
+        raise TimeoutError("plazo global del backup agotado")
+
+
+def backup_tabla(supabase_client, conn, tabla, fin=None, detener=None):
+    """
+    Copia incremental de una tabla de Supabase a Postgres local.
+
+    Lee solo las filas con ``actualizado_en`` posterior a la marca de agua
+    (menos un margen) y las aplica con UPSERT. La primera vez, o si la tabla
+    de Supabase aún no tiene ``actualizado_en``, lee la tabla completa. Si la
+    huella de la tabla no cambió desde la última copia no lee nada.
+    ``fin`` (``time.monotonic``) es el plazo global del ciclo y ``detener``
+    (``threading.Event``) la orden de parar del ciclo: se revisan en cada
+    página leída y entre lotes, y si saltan la tabla se deshace completa.
+    Devuelve las filas copiadas o -1 si hubo un error.
+    """
+    inicio = time.monotonic()
+    try:
         cursor = conn.cursor()
+        marca_agua, ultima_conciliacion, huella_anterior = _leer_metadata(cursor, tabla)
+        ahora = datetime.now(timezone.utc)
+        toca_conciliar = _toca_conciliar(marca_agua, ultima_conciliacion, ahora)
 
-        # 2. Obtener columnas que EXISTEN en la tabla de backup
-        cursor.execute("""
-            SELECT column_name FROM information_schema.columns 
-            WHERE table_name = %s AND table_schema = 'public'
-        """, (tabla,))
-        columnas_backup = {row[0] for row in cursor.fetchall()}
-
-        # 3. Filtrar: solo columnas que existen en AMBOS lados
-        columnas_supabase = set(datos[0].keys())
-        columnas = sorted(columnas_supabase & columnas_backup)
-        
-        if not columnas:
-            logger.warning(f"Backup [{tabla}]: Sin columnas en común entre Supabase y backup")
+        # 0. Saltar la tabla si no cambió. La conciliación periódica obliga a
+        # una pasada aunque la huella coincida, por si una transacción larga
+        # confirmó con un actualizado_en anterior al último copiado.
+        huella, filas_supabase = _huella_supabase(supabase_client, tabla)
+        if huella is not None and huella == huella_anterior and not toca_conciliar:
+            cursor.execute("""
+                UPDATE _backup_metadata
+                SET registros_copiados = 0, registros_eliminados = 0,
+                    ultimo_backup = %s, duracion_segundos = %s
+                WHERE tabla = %s
+            """, (ahora, round(time.monotonic() - inicio, 3), tabla))
+            conn.commit()
+            logger.info(f"Backup [{tabla}]: Sin cambios desde la última copia")
             return 0
 
-        # 4. Truncate tabla de backup
-        cursor.execute(f"TRUNCATE TABLE {tabla} CASCADE")
+        # 1. Leer de Supabase solo lo modificado desde la marca de agua
+        desde = None
+        if marca_agua and marca_tiempo_utc(marca_agua) is not None:
+            desde = iso_utc(marca_tiempo_utc(marca_agua) - BACKUP_WATERMARK_OVERLAP_SECONDS)
+        lotes = _en_lotes(_leer_supabase(
+            supabase_client, tabla, desde=desde, fin=fin, detener=detener
+        ))
+        try:
+            primero = next(lotes, [])
+        except Exception as e:
+            if desde is None:
+                raise
+            logger.warning(f"Backup [{tabla}]: Lectura incremental falló ({e}); copia completa")
+            desde = None
+            lotes = _en_lotes(_leer_supabase(
+                supabase_client, tabla, fin=fin, detener=detener
+            ))
+            primero = next(lotes, [])
 
-        # 5. Insertar registros con savepoint por fila
-        placeholders = ", ".join(["%s"] * len(columnas))
-        cols = ", ".join(f'"{c}"' for c in columnas)
-        insert_sql = f'INSERT INTO {tabla} ({cols}) VALUES ({placeholders})'
-        
-        insertados = 0
-        for fila in datos:
-            valores = tuple(fila.get(c) for c in columnas)
-            try:
-                cursor.execute("SAVEPOINT fila_save")
-                cursor.execute(insert_sql, valores)
-                cursor.execute("RELEASE SAVEPOINT fila_save")
-                insertados += 1
-            except Exception as e:
-                cursor.execute("ROLLBACK TO SAVEPOINT fila_save")
-                logger.warning(f"Backup [{tabla}]: Error insertando fila {fila.get('id', '?')}: {e}")
+        copiados = 0
+        if primero:
+            # 2. Obtener columnas que EXISTEN en la tabla de backup
+            cursor.execute("""
+                SELECT column_name FROM information_schema.columns 
+                WHERE table_name = %s AND table_schema = 'public'
+            """, (tabla,))
+            columnas_backup = {row[0] for row in cursor.fetchall()}
+
+            # 3. Filtrar: solo columnas que existen en AMBOS lados
+            columnas = sorted(set(primero[0].keys()) & columnas_backup)
+            if CLAVES_TABLAS[tabla] not in columnas:
+                logger.warning(f"Backup [{tabla}]: Sin la clave {CLAVES_TABLAS[tabla]} en común entre Supabase y backup")
+                conn.rollback()
+                return 0
+
+            # 4. UPSERT de las filas nuevas o modificadas, lote por lote
+            nueva, nueva_ts = None, None
+            for lote in chain([primero], lotes):
+                _verificar_plazo(fin, detener)
+                copiados += _upsert_filas(cursor, tabla, lote, columnas)
+                for fila in lote:
+                    ts = marca_tiempo_utc(fila.get(COLUMNA_MARCA_AGUA))
+                    if ts is not None and (nueva_ts is None or ts > nueva_ts):
+                        nueva, nueva_ts = fila[COLUMNA_MARCA_AGUA], ts
+            if nueva is not None:
+                if marca_agua is None or nueva_ts > marca_tiempo_utc(marca_agua):
+                    marca_agua = nueva
+            elif desde is None:
+                marca_agua = None  # Sin actualizado_en: siempre copia completa
+
+        # 5. Detectar bajas comparando claves; si el conteo ya no cuadra con
+        # Supabase hubo bajas y no se espera a la conciliación periódica.
+        if filas_supabase is not None and not toca_conciliar:
+            cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
+            toca_conciliar = cursor.fetchone()[0] != filas_supabase
+        eliminados = 0
+        if toca_conciliar or _toca_conciliar(marca_agua, ultima_conciliacion, ahora):
+            _verificar_plazo(fin, detener)
+            eliminados = _conciliar_bajas(supabase_client, cursor, tabla, fin, detener)
+            ultima_conciliacion = ahora
 
         # 6. Actualizar metadatos de backup
         cursor.execute("""
-            INSERT INTO _backup_metadata (tabla, registros_copiados, ultimo_backup)
-            VALUES (%s, %s, %s)
+            INSERT INTO _backup_metadata
+                (tabla, registros_copiados, ultimo_backup, marca_agua,
+                 ultima_conciliacion, registros_eliminados, duracion_segundos, huella)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (tabla) DO UPDATE 
             SET registros_copiados = EXCLUDED.registros_copiados,
-                ultimo_backup = EXCLUDED.ultimo_backup
-        """, (tabla, insertados, datetime.utcnow()))
+                ultimo_backup = EXCLUDED.ultimo_backup,
+                marca_agua = EXCLUDED.marca_agua,
+                ultima_conciliacion = EXCLUDED.ultima_conciliacion,
+                registros_eliminados = EXCLUDED.registros_eliminados,
+                duracion_segundos = EXCLUDED.duracion_segundos,
+                huella = EXCLUDED.huella
+        """, (tabla, copiados, ahora, marca_agua, ultima_conciliacion, eliminados,
+              round(time.monotonic() - inicio, 3), huella))
 
         conn.commit()
-        return insertados
+        if eliminados:
+            logger.info(f"Backup [{tabla}]: {eliminados} bajas eliminadas")
+        return copiados
 
     except Exception as e:
         logger.error(f"Backup [{tabla}]: Error general: {e}")
@@ -162,36 +498,105 @@ def backup_tabla(supabase_client, conn, tabla):
         return -1
 
 
-def ejecutar_backup():
-    """Ejecuta backup completo de todas las tablas. Llamado por schedule cada 30 min."""
+def _respaldar_tabla_aislada(tabla, fin, detener):
+    """Respalda ``tabla`` con su propia conexión a Postgres y su cliente de Supabase."""
+    from supabase_db import _obtener_cliente_supabase_por_hilo
+
+    restante = fin - time.monotonic()
+    if restante <= 0 or detener.is_set():
+        logger.error(f"Backup [{tabla}]: Plazo agotado antes de empezar")
+        return -1
+    cliente = _obtener_cliente_supabase_por_hilo()
+    conn = _get_pg_connection()
+    if not cliente or not conn:
+        logger.error(f"Backup [{tabla}]: Sin conexión a Supabase o al Postgres de backup")
+        return -1
+    try:
+        # Ninguna sentencia del lado de Postgres puede pasar del plazo global.
+        with conn.cursor() as cursor:
+            cursor.execute("SET statement_timeout = %s", (int(restante * 1000),))
+        conn.commit()
+        return backup_tabla(cliente, conn, tabla, fin=fin, detener=detener)
+    finally:
+        conn.close()
+
+
+def ejecutar_backup(trabajadores=None, plazo=None):
+    """
+    Ejecuta backup de todas las tablas. Llamado por schedule cada 30 min.
+
+    Las tablas se reparten entre ``BACKUP_WORKERS`` hilos, cada una con su
+    conexión, así que el ciclo dura lo que la tabla más grande. Al vencer
+    ``BACKUP_DEADLINE_SECONDS`` se deja de esperar: las tablas sin empezar se
+    cancelan y las que siguen en curso reciben la orden de parar y se deshacen
+    en su siguiente página. Si alguna sigue viva cuando toca el siguiente
+    ciclo, ese ciclo se salta para no solaparse con ella.
+    Devuelve ``{tabla: registros copiados o -1}``.
+    """
+    resultados = {}
+    en_curso = [f for f in _rezagados if not f.done()]
+    if en_curso:
+        logger.warning(
+            f"Backup: {len(en_curso)} tablas del ciclo anterior siguen en curso. Saltando ciclo."
+        )
+        return resultados
+    _rezagados.clear()
     try:
         from supabase_db import supabase, inicializar_supabase
         
         if not supabase:
             if not inicializar_supabase():
                 logger.error("Backup: No se pudo conectar a Supabase. Abortando.")
-                return
+                return resultados
 
         conn = _get_pg_connection()
         if not conn:
             logger.warning("Backup: Sin conexión a Postgres de backup. Saltando ciclo.")
-            return
+            return resultados
 
-        _asegurar_esquema_cripto(conn)
+        try:
+            _asegurar_esquema_cripto(conn)
+            _asegurar_esquema_incremental(conn)
+        finally:
+            conn.close()
         logger.info("=== Inicio de backup Supabase → Postgres ===")
+        inicio = time.monotonic()
+        fin = inicio + (BACKUP_DEADLINE_SECONDS if plazo is None else plazo)
+
+        detener = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=min(trabajadores or BACKUP_WORKERS, len(TABLAS_A_RESPALDAR)),
+            thread_name_prefix="backup",
+        )
+        futuros = {
+            executor.submit(_respaldar_tabla_aislada, tabla, fin, detener): tabla
+            for tabla in TABLAS_A_RESPALDAR
+        }
+        _, pendientes = wait(futuros, timeout=max(0, fin - time.monotonic()))
+        detener.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        _rezagados.extend(f for f in pendientes if not f.cancelled())
+
         total = 0
         errores = 0
-
-        for tabla in TABLAS_A_RESPALDAR:
-            n = backup_tabla(supabase, conn, tabla)
+        for futuro, tabla in futuros.items():
+            if futuro in pendientes:
+                logger.error(f"Backup [{tabla}]: Sin terminar al vencer el plazo")
+                n = -1
+            else:
+                n = futuro.result()
+            resultados[tabla] = n
             if n >= 0:
                 total += n
                 logger.info(f"Backup [{tabla}]: {n} registros copiados")
             else:
                 errores += 1
 
-        conn.close()
-        logger.info(f"=== Backup completado: {total} registros, {errores} errores ===")
+        logger.info(
+            f"=== Backup completado: {total} registros, {errores} errores "
+            f"en {time.monotonic() - inicio:.1f}s ==="
+        )
 
     except Exception as e:
         logger.error(f"Backup: Error general en ciclo de backup: {e}")
+    return resultados
@@ -0,0 +1,106 @@
+"""
+Benchmark de la carga del backup: UPSERT fila por fila contra COPY + UPSERT.
+
+Crea una copia temporal de ``recordatorios`` en la sesión (oculta a la tabla
+real, que no se toca), genera filas sintéticas y mide filas por segundo de
+cada método, primero insertando en la tabla vacía y luego actualizando las
+mismas claves.
+
+    python benchmark_backup.py --filas 50000 --dsn "host=127.0.0.1 dbname=arv_backup"
+
+Sin ``--dsn`` usa las variables ``BACKUP_PG_*`` igual que el backup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import backup_db
+from planificador import iso_utc
+
+
+TABLA = "recordatorios"
+COLUMNAS = sorted([
+    "id", "chat_id", "usuario", "nombre_tarea", "descripcion", "fecha_hora",
+    "notificado", "aviso_constante", "aviso_detenido", "actualizado_en",
+])
+METODOS = {
+    "fila por fila": backup_db._upsert_por_fila,
+    "COPY": backup_db._upsert_filas,
+}
+
+
+def generar_filas(n, version=0):
+    base = time.time()
+    return [
+        {
+            "id": i,
+            "chat_id": str(1000 + i % 5000),
+            "usuario": f"usuario{i % 5000}",
+            "nombre_tarea": f"Tarea {i} v{version}",
+            "descripcion": "Texto con\ttabulador y\nsalto de línea" if i % 100 == 0 else "Beber agua",
+            "fecha_hora": iso_utc(base + 60 * (i % 10000)),
+            "notificado": bool(version and i % 2),
+            "aviso_constante": i % 7 == 0,
+            "aviso_detenido": False,
+            "actualizado_en": iso_utc(base + version),
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def medir(conn, metodo, filas):
+    with conn.cursor() as cursor:
+        inicio = time.perf_counter()
+        copiados = metodo(cursor, TABLA, filas, COLUMNAS)
+        conn.commit()
+        segundos = time.perf_counter() - inicio
+    if copiados != len(filas):
+        raise RuntimeError(f"Se copiaron {copiados} de {len(filas)} filas")
+    return segundos
+
+
+def ejecutar(conn, n):
+    altas, cambios = generar_filas(n), generar_filas(n, version=1)
+    resultados = {}
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE {TABLA} (LIKE public.{TABLA} INCLUDING ALL)")
+    conn.commit()
+    for nombre, metodo in METODOS.items():
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE pg_temp.{TABLA}")
+        conn.commit()
+        resultados[nombre] = (medir(conn, metodo, altas), medir(conn, metodo, cambios))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--dsn", default="", help="DSN de un PostgreSQL con init_backup_db.sql.")
+    args = parser.parse_args()
+
+    if args.dsn:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+    else:
+        conn = backup_db._get_pg_connection()
+    if not conn:
+        raise SystemExit("Sin conexión al PostgreSQL de backup")
+
+    try:
+        resultados = ejecutar(conn, args.filas)
+    finally:
+        conn.close()
+
+    print(f"{args.filas} filas en {TABLA}")
+    print(f"{'método':<14} {'altas/s':>12} {'cambios/s':>12}")
+    for nombre, (altas, cambios) in resultados.items():
+        print(f"{nombre:<14} {args.filas / altas:>12,.0f} {args.filas / cambios:>12,.0f}")
+    lento, rapido = resultados["fila por fila"], resultados["COPY"]
+    print(f"COPY es {sum(lento) / sum(rapido):.1f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Bitácora local (SQLite WAL) de envíos de recordatorios."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+
+from planificador import iso_utc, marca_tiempo_utc
+
+
+# Archivo SQLite de la bitácora; vacío la desactiva.
+REMINDER_LEDGER_PATH = os.getenv("REMINDER_LEDGER_PATH", "entregas.db")
+# Días que se conservan las entradas ya confirmadas en Supabase.
+REMINDER_LEDGER_RETENTION_DAYS = 7
+
+INTENTO = "intento"
+ENVIADO = "enviado"
+FALLIDO = "fallido"
+CONFIRMADO = "confirmado"
+
+
+def _clave(recordatorio):
+    """Una ocurrencia es ``(id, fecha_hora)``: aplazar crea otra ocurrencia."""
+    marca = marca_tiempo_utc(recordatorio.get("fecha_hora"))
+    fecha = iso_utc(marca) if marca is not None else str(recordatorio.get("fecha_hora"))
+    return int(recordatorio["id"]), fecha
+
+
+class BitacoraEntregas:
+    """
+    Registra la intención y el resultado de cada primer envío.
+
+    Antes de llamar a Telegram se escribe ``intento``; después, ``enviado`` o
+    ``fallido``, y ``confirmado`` cuando Supabase ya lo tiene como notificado.
+    Todo es local: no añade llamadas de red por envío. Una ocurrencia que ya
+    figura como intento, enviada o confirmada no se vuelve a enviar, aunque
+    Supabase no llegara a enterarse (caída entre el envío y el acuse).
+    """
+
+    def __init__(self, ruta=REMINDER_LEDGER_PATH, reloj=time.time):
+        self.ruta = ruta
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entregas (
+                recordatorio_id INTEGER NOT NULL,
+                fecha_hora TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 1,
+                creado_en REAL NOT NULL,
+                actualizado_en REAL NOT NULL,
+                PRIMARY KEY (recordatorio_id, fecha_hora)
+            );
+            CREATE INDEX IF NOT EXISTS idx_entregas_estado
+                ON entregas (estado, actualizado_en);
+        """)
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def registrar_intento(self, recordatorio):
+        """
+        Anota la intención de enviar. Devuelve False si esa ocurrencia ya se
+        envió o quedó a medias, en cuyo caso no debe enviarse otra vez. Un envío
+        ``fallido`` sí puede reintentarse.
+        """
+        recordatorio_id, fecha = _clave(recordatorio)
+        ahora = self._reloj()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO entregas
+                    (recordatorio_id, fecha_hora, estado, creado_en, actualizado_en)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (recordatorio_id, fecha_hora) DO UPDATE
+                    SET estado = excluded.estado,
+                        intentos = entregas.intentos + 1,
+                        actualizado_en = excluded.actualizado_en
+                    WHERE entregas.estado = ?
+                """,
+                (recordatorio_id, fecha, INTENTO, ahora, ahora, FALLIDO),
+            )
+            return cursor.rowcount == 1
+
+    def registrar_resultado(self, recordatorio, exito):
+        recordatorio_id, fecha = _clave(recordatorio)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entregas SET estado = ?, actualizado_en = ? "
+                "WHERE recordatorio_id = ? AND fecha_hora = ? AND estado = ?",
+                (ENVIADO if exito else FALLIDO, self._reloj(),
+                 recordatorio_id, fecha, INTENTO),
+            )
+
+    def confirmar(self, ids):
+        """
+        Marca como confirmadas las ocurrencias de ``ids`` que Supabase ya tiene
+        como notificadas. Solo pasan las ``enviado`` y las ``intento`` que se
+        acusaron sin reenviar; una ``fallido`` sigue pendiente de reenvío.
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        with self._lock:
+            for inicio in range(0, len(ids), 500):
+                bloque = ids[inicio:inicio + 500]
+                marcas = ",".join("?" * len(bloque))
+                self._conn.execute(
+                    f"UPDATE entregas SET estado = ?, actualizado_en = ? "
+                    f"WHERE estado IN (?, ?) AND recordatorio_id IN ({marcas})",
+                    (CONFIRMADO, self._reloj(), ENVIADO, INTENTO, *bloque),
+                )
+
+    def pendientes(self):
+        """Ocurrencias que Supabase quizá no tiene como notificadas."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT recordatorio_id, fecha_hora, estado FROM entregas "
+                "WHERE estado != ? ORDER BY creado_en",
+                (CONFIRMADO,),
+            ).fetchall()
+        return [
+            {"id": recordatorio_id, "fecha_hora": fecha, "estado": estado}
+            for recordatorio_id, fecha, estado in filas
+        ]
+
+    def purgar(self, dias=REMINDER_LEDGER_RETENTION_DAYS):
+        """
+        Elimina entradas confirmadas o fallidas con más de ``dias`` de
+        antigüedad (una fallida nunca llega a confirmarse si el recordatorio
+        se borra o aplaza antes del reenvío).
+        """
+        limite = self._reloj() - dias * 86400
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM entregas WHERE estado IN (?, ?) AND actualizado_en < ?",
+                (CONFIRMADO, FALLIDO, limite),
+            )
+            return cursor.rowcount
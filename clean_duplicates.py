@@ -2,6 +2,7 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client
+from supabase_db import iterar_tabla
 
 load_dotenv()
 
@@ -17,45 +18,39 @@ supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 def limpiar_duplicados():
     print("🔍 Buscando recordatorios...")
     
-    # 1. Obtener todos los recordatorios ordenados por fecha de creación (ascendente)
-    # Paginar si es necesario, pero intentemos traer un chunk grande
-    response = supabase.table("recordatorios").select("*").order("creado_en", desc=False).limit(3000).execute()
-    recordatorios = response.data
-    
-    if not recordatorios:
-        print("No se encontraron recordatorios.")
-        return
+    # 1. Recorrer todos los recordatorios por páginas, solo con las columnas
+    # de la clave de duplicado (PostgREST trunca un select sin paginar).
+    columnas = "id,chat_id,nombre_tarea,fecha_hora,creado_en"
+    recordatorios = iterar_tabla("recordatorios", columnas, cliente=supabase)
 
-    print(f"Total recordatorios encontrados: {len(recordatorios)}")
-    
     # 2. Agrupar por clave única lógica
     # Clave: chat_id + nombre_tarea + fecha_hora (exacta) 
     # Si son repeticiones del mismo evento con el MISMO tiempo objetivo, son duplicados erróneos.
-    grupos = {}
-    
+    # Por grupo solo se conserva el MÁS ANTIGUO (creado_en, id); el resto se elimina.
+    originales = {}
+    eliminar_ids = []
+    total = 0
+
     for r in recordatorios:
-        # Clave compuesta
-        # Normalizar fecha_hora si es string
+        total += 1
         clave = f"{r['chat_id']}_{r['nombre_tarea']}_{r['fecha_hora']}"
-        
-        if clave not in grupos:
-            grupos[clave] = []
-        grupos[clave].append(r)
-        
-    # 3. Identificar duplicados y eliminar
-    eliminar_ids = []
-    
-    for clave, lista in grupos.items():
-        if len(lista) > 1:
-            print(f"⚠️ Detectado grupo duplicado: {clave} ({len(lista)} copias)")
-            # Mantener el MÁS ANTIGUO (el primero de la lista, ya que ordenamos por creado_en ASC)
-            original = lista[0]
-            duplicados = lista[1:]
-            
-            for d in duplicados:
-                eliminar_ids.append(d['id'])
-                print(f"   -> Marcar para eliminar ID: {d['id']} (Creado: {d['creado_en']})")
-                
+        orden = (r.get("creado_en") or "", r["id"])
+        actual = originales.get(clave)
+        if actual is None:
+            originales[clave] = orden
+            continue
+        # 3. Identificar duplicados
+        if orden < actual:
+            originales[clave], orden = orden, actual
+        eliminar_ids.append(orden[1])
+        print(f"⚠️ Duplicado en grupo {clave}: marcar para eliminar ID {orden[1]} (Creado: {orden[0]})")
+
+    if not total:
+        print("No se encontraron recordatorios.")
+        return
+
+    print(f"Total recordatorios encontrados: {total}")
+
     if not eliminar_ids:
         print("✅ No se encontraron duplicados exactos.")
         return
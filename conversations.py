@@ -3,7 +3,7 @@ import re
 # ... el resto de tus importaciones mod detener avisos
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from services import enviar_telegram, editar_botones_mensaje, editar_mensaje_con_botones, editar_mensaje_texto, enviar_mensaje_con_grid, editar_mensaje_con_grid, eliminar_mensaje
+from services import enviar_telegram, editar_botones_mensaje, editar_mensaje_con_botones, editar_mensaje_texto, enviar_mensaje_con_grid, editar_mensaje_con_grid, eliminar_mensaje, editar_mensajes_texto
 import supabase_db
 import crypto_alerts
 from supabase_db import actualizar_campos_recordatorio  # IMPORT
@@ -2956,6 +2956,8 @@ def modificar_mensajes_avisos_a_detenidos(chat_id):
         if not obtener_recordatorios_aviso_constante(chat_id=chat_id):
             return False
         recordatorios = conversaciones[chat_id]["recordatorios_aviso_constante"]
+        # Con TELEGRAM_ASYNC las ediciones van todas en vuelo a la vez.
+        ediciones = []
         for r in recordatorios:
             recordatorio = recordatorios[r]
             last_id_message = recordatorio["last_id_message"]
@@ -2964,8 +2966,8 @@ def modificar_mensajes_avisos_a_detenidos(chat_id):
             descripcion = recordatorio["descripcion"]
             texto = f'El recordatorio con el nombre de {nombre_tarea} y descripción "{descripcion}", ¡ha sido detenido exitosamente!'
             # print(f"Modificando aviso de {usuario} llamado '{nombre_tarea}': ")
-            editar_mensaje_texto (chat_id=chat_id, message_id=last_id_message, 
-                                  nuevo_texto= texto)
+            ediciones.append((chat_id, last_id_message, texto))
+        editar_mensajes_texto(ediciones)
         # Todos los recordatorios avisados
         supabase_db.actualizar_estado_chat_id(chat_id=chat_id, numero_estado= CAMPO_GUARDADO_RECORDATORIO_AVISO_CONSTANTE, nuevo_valor="{}")
         conversaciones[chat_id]["recordatorios_aviso_constante"] = {}
@@ -3021,27 +3023,31 @@ def procesar_callback(chat_id, callback_data, nombre_usuario, tipo, id_callback)
 
     # Los botones de aplazamiento deben funcionar aunque el usuario tenga otro
     # flujo conversacional abierto.
+    # El sufijo ":r" indica un botón dentro de un resumen de varios avisos: se
+    # responde con un mensaje nuevo para no reemplazar el resumen completo.
     if callback_data.startswith("snooze:"):
         try:
-            _, recordatorio_id, minutos = callback_data.split(":", 2)
+            partes = callback_data.split(":")
+            en_resumen = partes[3:] == ["r"]
             return aplazar_recordatorio_chat(
                 chat_id,
-                int(recordatorio_id),
-                int(minutos),
-                id_callback,
+                int(partes[1]),
+                int(partes[2]),
+                None if en_resumen else id_callback,
             )
-        except (TypeError, ValueError):
+        except (IndexError, TypeError, ValueError):
             return "No pude interpretar el aplazamiento solicitado."
 
     if callback_data.startswith("snooze_custom:"):
         try:
-            recordatorio_id = int(callback_data.split(":", 1)[1])
+            partes = callback_data.split(":")
+            en_resumen = partes[2:] == ["r"]
             return iniciar_aplazamiento_personalizado(
                 chat_id,
-                recordatorio_id,
+                int(partes[1]),
                 nombre_usuario,
                 tipo=tipo,
-                message_id=id_callback,
+                message_id=None if en_resumen else id_callback,
             )
         except (TypeError, ValueError):
             return "No pude identificar el recordatorio que deseas aplazar."
@@ -18,7 +18,8 @@ try:
 except ImportError:  # Permite ejecutar migraciones antes de instalar dependencias.
     websocket = None
 
-from services import enviar_mensaje_con_grid
+import metricas
+from services import PRIORIDAD_AVISOS, enviar_mensaje_con_grid, prioridad
 
 
 load_dotenv()
@@ -52,7 +53,7 @@ def _db():
         return None
     client = getattr(_db_local, "client", None)
     if client is None:
-        client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        client = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
         _db_local.client = client
     return client
 
@@ -849,11 +850,12 @@ class MonitorCriptoAlertas:
                 "texto": "🛑 Detener esta alerta",
                 "data": f"crypto_stop:{alerta['id']}",
             }]]
-        return enviar_mensaje_con_grid(
-            alerta["chat_id"],
-            _mensaje_alerta(alerta, ticker, lado, repeticion=repeticion),
-            filas,
-        )
+        with prioridad(PRIORIDAD_AVISOS):
+            return enviar_mensaje_con_grid(
+                alerta["chat_id"],
+                _mensaje_alerta(alerta, ticker, lado, repeticion=repeticion),
+                filas,
+            )
 
     def verificar_una_vez(self):
         alertas = listar_alertas_activas()
@@ -0,0 +1,127 @@
+"""Despacho concurrente de envíos que conserva el orden dentro de cada chat."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+REMINDER_DISPATCH_WORKERS = max(
+    1, int(os.getenv("REMINDER_DISPATCH_WORKERS", "8"))
+)
+
+
+class DespachadorPorChat:
+    """
+    Ejecuta un lote de envíos con un pool de hilos acotado.
+
+    Los elementos se agrupan por chat: cada grupo se procesa en orden dentro de
+    un solo hilo y los grupos de chats distintos avanzan en paralelo. Así una
+    ráfaga de miles de recordatorios no espera en serie las llamadas HTTP de
+    cada envío, pero un usuario nunca recibe sus avisos desordenados.
+    """
+
+    def __init__(self, trabajadores=REMINDER_DISPATCH_WORKERS, reloj=time.monotonic):
+        self.trabajadores = max(1, int(trabajadores))
+        self._reloj = reloj
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._totales = {"ciclos": 0, "enviados": 0, "errores": 0}
+        self._ultimo_ciclo = {}
+
+    def _obtener_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.trabajadores,
+                    thread_name_prefix="reminder-dispatch",
+                )
+            return self._executor
+
+    def detener(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+    @property
+    def pendientes(self):
+        """Elementos del ciclo en curso que aún no se han procesado."""
+        with self._lock:
+            return self._pendientes
+
+    def _drenar(self, indices, elementos, funcion, resultados, contadores):
+        for indice in indices:
+            try:
+                resultados[indice] = funcion(elementos[indice])
+                clave = "errores" if resultados[indice] is False else "enviados"
+            except Exception as exc:
+                print(f"[ERROR] Despacho de {elementos[indice].get('id')}: {exc}")
+                clave = "errores"
+            with self._lock:
+                self._pendientes -= 1
+                contadores[clave] += 1
+
+    def despachar(self, elementos, funcion, clave=lambda e: e.get("chat_id")):
+        """
+        Aplica ``funcion`` a cada elemento y bloquea hasta terminar el lote.
+
+        Devuelve los resultados en el mismo orden que ``elementos`` (None para
+        los que lanzaron excepción). Un elemento cuenta como error si
+        ``funcion`` lanza una excepción o devuelve False.
+        """
+        elementos = list(elementos)
+        resultados = [None] * len(elementos)
+        if not elementos:
+            return resultados
+
+        grupos = {}
+        for indice, elemento in enumerate(elementos):
+            grupos.setdefault(clave(elemento), []).append(indice)
+
+        contadores = {"enviados": 0, "errores": 0}
+        with self._lock:
+            self._pendientes += len(elementos)
+        inicio = self._reloj()
+
+        if self.trabajadores == 1 or len(grupos) == 1:
+            for indices in grupos.values():
+                self._drenar(indices, elementos, funcion, resultados, contadores)
+        else:
+            executor = self._obtener_executor()
+            futuros = [
+                executor.submit(
+                    self._drenar, indices, elementos, funcion, resultados, contadores
+                )
+                for indices in grupos.values()
+            ]
+            wait(futuros)
+
+        duracion = max(self._reloj() - inicio, 1e-9)
+        ciclo = {
+            "elementos": len(elementos),
+            "chats": len(grupos),
+            "enviados": contadores["enviados"],
+            "errores": contadores["errores"],
+            "duracion_s": round(duracion, 3),
+            "por_segundo": round(contadores["enviados"] / duracion, 2),
+        }
+        with self._lock:
+            self._ultimo_ciclo = ciclo
+            self._totales["ciclos"] += 1
+            self._totales["enviados"] += contadores["enviados"]
+            self._totales["errores"] += contadores["errores"]
+        return resultados
+
+    def estadisticas(self):
+        """Totales acumulados, último ciclo y backlog actual."""
+        with self._lock:
+            return {
+                **self._totales,
+                "pendientes": self._pendientes,
+                "trabajadores": self.trabajadores,
+                "ultimo_ciclo": dict(self._ultimo_ciclo),
+            }
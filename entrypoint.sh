@@ -7,6 +7,12 @@ echo "🚀 Starting ARV Reminder Bot (Standalone SSL Mode)..."
 echo "📦 initializing database..."
 python3 setup_supabase.py
 
+# 1.1 Scheduler-only container: deliveries and crypto monitor, no web server.
+if [ "$1" = "worker" ]; then
+    echo "⏰ Starting reminder worker..."
+    exec python3 -m reminders --worker
+fi
+
 # 2. SSL Certificate Generation (Self-Signed)
 # Telegram REQUIRES the certificate to be sent if we use self-signed.
 # We generate them in /tmp or app directory.
@@ -55,9 +61,23 @@ echo ""
 
 # 4. Start Gunicorn with SSL
 # Bind to 0.0.0.0:8443 (Telegram-supported port)
-echo "🌟 Starting Gunicorn Server on port 8443 (HTTPS)..."
+# More than one worker is only safe with WEB_ONLY=true and a separate
+# reminder worker; otherwise every process would deliver the same reminders.
+WEB_WORKERS="${WEB_WORKERS:-1}"
+case "$WEB_ONLY" in
+    true|y|1) ;;
+    *)
+        if [ "$WEB_WORKERS" != "1" ]; then
+            echo "⚠️ WARNING: WEB_WORKERS=$WEB_WORKERS requires WEB_ONLY=true. Using 1 worker."
+            WEB_WORKERS=1
+        fi
+        ;;
+esac
+# services.varios_procesos_editan() reads the effective worker count.
+export WEB_WORKERS
+echo "🌟 Starting Gunicorn Server on port 8443 (HTTPS) with $WEB_WORKERS worker(s)..."
 exec gunicorn --bind 0.0.0.0:8443 \
-              --workers 1 \
+              --workers "$WEB_WORKERS" \
               --threads 8 \
               --certfile "$CERT_FILE" \
               --keyfile "$KEY_FILE" \
@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 # CORRECCION: El archivo se llama gestionar_actualizaciones.py
 from gestionar_actualizaciones import insertar_actualizaciones_desde_archivo, registrar_chats_si_no_existen, obtener_chats_para_actualizacion, actualizar_id_ultima_actualizacion_para_chat, obtener_ultima_actualizacion
-from services import enviar_telegram
+from services import PRIORIDAD_MASIVA, enviar_telegram, prioridad
 import json
 
 # Cargar variables de entorno
@@ -37,12 +37,13 @@ if __name__ == "__main__":
              print(f"📨 Enviando notificaciones a {len(chats)} usuarios...")
              
              # 5. Enviar mensajes (Simulando lo que hace reminders.py pero manual)
-             for chat_id in chats:
-                try:
-                    enviar_telegram(chat_id, tipo="texto", mensaje=msg, formato="Markdown")
-                    actualizar_id_ultima_actualizacion_para_chat(chat_id, ultima["id"])
-                    print(f"   -> Enviado a {chat_id}")
-                except Exception as e:
-                    print(f"   ❌ Error enviando a {chat_id}: {e}")
+             with prioridad(PRIORIDAD_MASIVA):
+                 for chat_id in chats:
+                    try:
+                        enviar_telegram(chat_id, tipo="texto", mensaje=msg, formato="Markdown")
+                        actualizar_id_ultima_actualizacion_para_chat(chat_id, ultima["id"])
+                        print(f"   -> Enviado a {chat_id}")
+                    except Exception as e:
+                        print(f"   ❌ Error enviando a {chat_id}: {e}")
 
     print("🏁 Proceso finalizado.")
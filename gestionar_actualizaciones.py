@@ -2,6 +2,7 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client, Client
+import metricas
 
 load_dotenv()
 
@@ -15,7 +16,7 @@ def inicializar_supabase():
         print("Faltan las credenciales de Supabase.")
         return False
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
         return True
     except Exception as e:
         print(f"Error al inicializar Supabase: {e}")
@@ -145,7 +146,7 @@ def eliminar_actualizacion_por_id():
 def actualizar_id_ultima_actualizacion_para_chat(chat_id: str, nuevo_id: int):
     """Actualiza el campo id_ultima_actualizacion para un chat dado"""
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
         supabase.table("chats_avisados_actualizaciones") \
             .update({"id_ultima_actualizacion": nuevo_id}) \
             .eq("chat_id", chat_id) \
@@ -157,7 +158,7 @@ def actualizar_id_ultima_actualizacion_para_chat(chat_id: str, nuevo_id: int):
 def obtener_ultima_actualizacion():
     """Obtiene la última actualización registrada en la tabla actualizaciones_info"""
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
         respuesta = supabase.table("actualizaciones_info") \
             .select("*") \
             .order("id", desc=True) \
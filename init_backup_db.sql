@@ -16,7 +16,8 @@ CREATE TABLE IF NOT EXISTS recordatorios (
     repetir BOOLEAN DEFAULT FALSE,
     intervalo_repeticion TEXT,
     intervalos INTEGER DEFAULT 0,
-    repeticion_creada BOOLEAN DEFAULT FALSE
+    repeticion_creada BOOLEAN DEFAULT FALSE,
+    actualizado_en TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS chats_info (
@@ -25,7 +26,8 @@ CREATE TABLE IF NOT EXISTS chats_info (
     nombre TEXT,
     tipo TEXT,
     zona_horaria TEXT,
-    creado_en TIMESTAMPTZ DEFAULT NOW()
+    creado_en TIMESTAMPTZ DEFAULT NOW(),
+    actualizado_en TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS chats_id_estados (
@@ -35,7 +37,8 @@ CREATE TABLE IF NOT EXISTS chats_id_estados (
     estado_2 TEXT,
     estado_3 TEXT,
     estado_4 TEXT,
-    estado_5 TEXT
+    estado_5 TEXT,
+    actualizado_en TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS reportes (
@@ -44,19 +47,22 @@ CREATE TABLE IF NOT EXISTS reportes (
     usuario TEXT,
     descripcion TEXT,
     fecha_hora TIMESTAMPTZ DEFAULT NOW(),
-    estado TEXT DEFAULT 'pendiente'
+    estado TEXT DEFAULT 'pendiente',
+    actualizado_en TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS actualizaciones_info (
     id SERIAL PRIMARY KEY,
     titulo TEXT,
     descripcion TEXT,
-    fecha_hora TIMESTAMPTZ DEFAULT NOW()
+    fecha_hora TIMESTAMPTZ DEFAULT NOW(),
+    actualizado_en TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS chats_avisados_actualizaciones (
     chat_id TEXT PRIMARY KEY,
-    id_ultima_actualizacion INTEGER
+    id_ultima_actualizacion INTEGER,
+    actualizado_en TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS cripto_premium_users (
@@ -96,5 +102,13 @@ CREATE TABLE IF NOT EXISTS _backup_metadata (
     id SERIAL PRIMARY KEY,
     tabla TEXT UNIQUE NOT NULL,
     registros_copiados INTEGER DEFAULT 0,
-    ultimo_backup TIMESTAMPTZ DEFAULT NOW()
+    ultimo_backup TIMESTAMPTZ DEFAULT NOW(),
+    -- Backup incremental: mayor actualizado_en copiado y última revisión de bajas
+    marca_agua TEXT,
+    ultima_conciliacion TIMESTAMPTZ,
+    registros_eliminados INTEGER DEFAULT 0,
+    -- Segundos que tardó la última copia de la tabla
+    duracion_segundos REAL,
+    -- Filas|clave máxima|mayor actualizado_en de Supabase en la última copia
+    huella TEXT
 );
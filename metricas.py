@@ -0,0 +1,289 @@
+"""Métricas del proceso en memoria, expuestas en formato de texto de Prometheus."""
+
+from __future__ import annotations
+
+import bisect
+import hmac
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Puerto del endpoint de métricas del worker (`python -m reminders --worker`),
+# que no levanta Flask. 0 lo desactiva.
+REMINDER_METRICS_PORT = int(os.getenv("REMINDER_METRICS_PORT", "0") or 0)
+# Token que Prometheus envía como ``Authorization: Bearer <token>``. Sin él,
+# ``/metrics`` de la app web (pública por el webhook) responde 404.
+REMINDER_METRICS_TOKEN = os.getenv("REMINDER_METRICS_TOKEN", "")
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+_REGISTRO = []
+
+
+def _formatear(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar(valor):
+    """Escapa un valor de etiqueta como exige el formato de texto de Prometheus."""
+    return (
+        str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _etiquetas(nombres, valores):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        _REGISTRO.append(self)
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas.get(n, "")) for n in self.etiquetas)
+
+    def exponer(self):
+        lineas = [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} {self.tipo}",
+        ]
+        lineas.extend(self._muestras())
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores = {}
+
+    def inc(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def valor(self, **etiquetas):
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0)
+
+    def total(self):
+        """Suma de todas las combinaciones de etiquetas."""
+        with self._lock:
+            return sum(self._valores.values())
+
+    def _muestras(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [
+            f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_formatear(v)}"
+            for clave, v in valores
+        ]
+
+
+class Medidor(Contador):
+    tipo = "gauge"
+
+    def fijar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = valor
+
+
+class Histograma(_Metrica):
+    """Histograma con límites fijos (``le``), acumulado al exponerse."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, limites):
+        super().__init__(nombre, ayuda)
+        self.limites = tuple(sorted(limites)) + (float("inf"),)
+        self._cubetas = [0] * len(self.limites)
+        self._suma = 0.0
+        self._cuenta = 0
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            self._cubetas[indice] += 1
+            self._suma += valor
+            self._cuenta += 1
+
+    @property
+    def cuenta(self):
+        with self._lock:
+            return self._cuenta
+
+    def _muestras(self):
+        with self._lock:
+            cubetas, suma, cuenta = list(self._cubetas), self._suma, self._cuenta
+        lineas, acumulado = [], 0
+        for limite, n in zip(self.limites, cubetas):
+            acumulado += n
+            lineas.append(
+                f'{self.nombre}_bucket{{le="{_formatear(limite)}"}} {acumulado}'
+            )
+        lineas.append(f"{self.nombre}_sum {_formatear(suma)}")
+        lineas.append(f"{self.nombre}_count {cuenta}")
+        return lineas
+
+
+def _contar_peticion_supabase(peticion):
+    # /rest/v1/<tabla> o /rest/v1/rpc/<función>
+    recurso = peticion.url.path.split("/rest/v1/", 1)[-1]
+    PETICIONES_SUPABASE.inc(operacion=f"{peticion.method} {recurso}")
+
+
+def instrumentar_supabase(cliente):
+    """
+    Cuenta en ``PETICIONES_SUPABASE`` cada petición HTTP que ``cliente``
+    (de ``supabase.create_client``) haga a PostgREST, lecturas, escrituras y
+    RPC por igual. Devuelve el mismo cliente.
+    """
+    ganchos = cliente.postgrest.session.event_hooks["request"]
+    if _contar_peticion_supabase not in ganchos:
+        ganchos.append(_contar_peticion_supabase)
+    return cliente
+
+
+def autorizado(cabecera, token=None):
+    """
+    Comprueba la cabecera ``Authorization`` contra ``REMINDER_METRICS_TOKEN``.
+    Sin token configurado no autoriza nada.
+    """
+    token = REMINDER_METRICS_TOKEN if token is None else token
+    if not token:
+        return False
+    return hmac.compare_digest(cabecera or "", f"Bearer {token}")
+
+
+def exponer():
+    """Todas las métricas registradas en formato de texto de Prometheus."""
+    lineas = []
+    for metrica in _REGISTRO:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+# --- Scheduler de recordatorios ---
+
+RETRASO_ENTREGA = Histograma(
+    "arv_reminder_delivery_lag_seconds",
+    "Segundos entre fecha_hora y la confirmación de Telegram del primer envío.",
+    (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600),
+)
+DURACION_CICLO = Histograma(
+    "arv_reminder_cycle_duration_seconds",
+    "Duración de cada ciclo de entregas (recarga, verificación, envío y acuse).",
+    (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 120),
+)
+LLAMADAS_BD_CICLO = Histograma(
+    "arv_reminder_cycle_db_requests",
+    "Peticiones a Supabase durante cada ciclo de entregas.",
+    (0, 1, 2, 5, 10, 20, 50, 100, 500),
+)
+LLAMADAS_TELEGRAM_CICLO = Histograma(
+    "arv_reminder_cycle_telegram_requests",
+    "Peticiones a la API de Telegram (con reintentos) durante cada ciclo de entregas.",
+    (0, 1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+CICLOS = Contador("arv_reminder_cycles_total", "Ciclos de entregas ejecutados.")
+ENVIOS_TELEGRAM = Contador(
+    "arv_reminder_telegram_sends_total",
+    "Mensajes de recordatorio enviados a Telegram por resultado.",
+    ("resultado",),
+)
+PETICIONES_SUPABASE = Contador(
+    "arv_supabase_requests_total",
+    "Peticiones HTTP a Supabase (PostgREST) por método y tabla o RPC; solo "
+    "clientes creados con instrumentar_supabase.",
+    ("operacion",),
+)
+EN_COLA = Medidor(
+    "arv_reminder_queue_size", "Recordatorios cargados en la cola de vencimientos."
+)
+VENCIDOS_CICLO = Medidor(
+    "arv_reminder_due_backlog", "Recordatorios vencidos que atendió el último ciclo."
+)
+ULTIMO_CICLO = Medidor(
+    "arv_reminder_last_cycle_timestamp_seconds",
+    "Epoch del último ciclo de entregas terminado.",
+)
+
+# --- Telegram ---
+
+PETICIONES_TELEGRAM = Contador(
+    "arv_telegram_requests_total",
+    "Peticiones HTTP a la API de Telegram por método, incluidos los reintentos, "
+    "de los clientes síncrono y asíncrono de services.",
+    ("metodo",),
+)
+
+EDICIONES_TELEGRAM = Contador(
+    "arv_telegram_edits_total",
+    "Ediciones de mensajes pedidas a services, por resultado (enviada u omitida "
+    "por no cambiar el contenido).",
+    ("resultado",),
+)
+PROPORCION_EDICIONES_OMITIDAS = Medidor(
+    "arv_telegram_edit_skip_ratio",
+    "Fracción de ediciones omitidas localmente desde el arranque del proceso.",
+)
+
+# --- Jobs de mantenimiento ---
+
+EJECUCIONES_TAREA = Contador(
+    "arv_job_runs_total",
+    "Ejecuciones de jobs de mantenimiento por resultado (ok, error, omitida).",
+    ("tarea", "resultado"),
+)
+DURACION_TAREA = Medidor(
+    "arv_job_last_duration_seconds",
+    "Duración de la última ejecución de cada job de mantenimiento.",
+    ("tarea",),
+)
+TAREAS_EN_CURSO = Medidor(
+    "arv_jobs_running", "Jobs de mantenimiento en ejecución o en cola."
+)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        # Puerto interno: el token es opcional, pero si existe se exige.
+        if REMINDER_METRICS_TOKEN and not autorizado(self.headers.get("Authorization")):
+            self.send_error(401)
+            return
+        cuerpo = exponer().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TIPO_CONTENIDO)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir(puerto=REMINDER_METRICS_PORT):
+    """Expone ``/metrics`` en un hilo daemon; para procesos sin Flask."""
+    servidor = ThreadingHTTPServer(("0.0.0.0", puerto), _ManejadorMetricas)
+    threading.Thread(
+        target=servidor.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    print(f"Métricas disponibles en :{puerto}/metrics")
+    return servidor
@@ -0,0 +1,301 @@
+"""Reparto de las entregas entre varios workers con arrendamientos en Postgres."""
+
+from __future__ import annotations
+
+import math
+import os
+import socket
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import psycopg2
+except ImportError:  # El reparto es opcional.
+    psycopg2 = None
+
+
+# Postgres donde viven los arrendamientos (p. ej. el contenedor postgres_backup).
+REMINDER_LEASE_DSN = os.getenv("REMINDER_LEASE_DSN", "")
+REMINDER_PARTITIONS = max(1, int(os.getenv("REMINDER_PARTITIONS", "16")))
+REMINDER_LEASE_SECONDS = max(5, int(os.getenv("REMINDER_LEASE_SECONDS", "30")))
+REMINDER_NODE_ID = (
+    os.getenv("REMINDER_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+)
+
+ESQUEMA_ARRENDAMIENTOS = """
+CREATE TABLE IF NOT EXISTS reminder_leases (
+    particion INTEGER PRIMARY KEY,
+    nodo TEXT,
+    expira_en TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS reminder_lease_nodes (
+    nodo TEXT PRIMARY KEY,
+    expira_en TIMESTAMPTZ NOT NULL
+);
+"""
+
+
+def particion_de(chat_id, particiones=REMINDER_PARTITIONS):
+    """Partición estable de un chat (crc32: igual en todos los procesos)."""
+    return zlib.crc32(str(chat_id).encode("utf-8")) % particiones
+
+
+class ArrendamientoParticiones:
+    """
+    Reclama y renueva particiones de ``chat_id`` en una tabla de Postgres.
+
+    Cada nodo publica un latido en ``reminder_lease_nodes`` y se queda con
+    ``ceil(particiones / nodos_activos)`` particiones: renueva las suyas,
+    toma las vencidas o libres y suelta las que le sobran cuando aparece otro
+    nodo. Si un nodo muere, sus arrendamientos caducan a los ``duracion``
+    segundos y los demás los absorben.
+
+    Localmente una partición solo cuenta como propia hasta ``duracion``
+    segundos después de empezar la última renovación exitosa; si Postgres no
+    responde, el nodo deja de entregar antes de que otro pueda reclamarla.
+
+    Una partición sobrante deja de ser propia en el acto, pero en Postgres se
+    sigue renovando hasta que terminan los ciclos de entrega (``entregando``)
+    que empezaron cuando aún lo era: sus envíos y acuses ya están en Supabase
+    cuando el nuevo dueño relee la ventana.
+    """
+
+    def __init__(
+        self,
+        dsn,
+        particiones=REMINDER_PARTITIONS,
+        nodo=REMINDER_NODE_ID,
+        duracion=REMINDER_LEASE_SECONDS,
+        reloj=time.monotonic,
+        al_cambiar=None,
+    ):
+        self.dsn = dsn
+        self.particiones = max(1, int(particiones))
+        self.nodo = nodo
+        self.duracion = duracion
+        self.al_cambiar = al_cambiar
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._propias = frozenset()
+        self._vigente_hasta = 0.0
+        # Cada vez que se sueltan particiones sube la generación; un ciclo de
+        # entrega anota la generación en que empezó.
+        self._generacion = 0
+        self._ciclos = Counter()
+        self._ciclo_terminado = threading.Condition(self._lock)
+        self._soltando = {}  # partición -> generación en que dejó de ser propia
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def propias(self):
+        """Particiones que este nodo puede entregar ahora mismo."""
+        with self._lock:
+            if self._reloj() >= self._vigente_hasta:
+                return frozenset()
+            return self._propias
+
+    def posee(self, particion):
+        return particion in self.propias
+
+    def posee_chat(self, chat_id):
+        return self.posee(particion_de(chat_id, self.particiones))
+
+    def _conectar(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(self.dsn, connect_timeout=10)
+            with self._conn, self._conn.cursor() as cursor:
+                cursor.execute(ESQUEMA_ARRENDAMIENTOS)
+        return self._conn
+
+    def _cerrar(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    def _fijar(self, propias, vigente_hasta):
+        with self._lock:
+            anteriores = self._propias
+            self._propias = frozenset(propias)
+            self._vigente_hasta = vigente_hasta
+            for particion in anteriores - self._propias:
+                self._soltando.setdefault(particion, self._generacion + 1)
+            if anteriores - self._propias:
+                self._generacion += 1
+            for particion in self._propias:
+                self._soltando.pop(particion, None)
+        if anteriores != self._propias and self.al_cambiar:
+            self.al_cambiar(anteriores, self._propias)
+
+    @contextmanager
+    def entregando(self):
+        """
+        Envuelve un ciclo de entrega, desde que filtra por ``posee_chat`` hasta
+        que sus acuses están escritos. Mientras dure, las particiones que se
+        dejen de poseer no se sueltan en Postgres.
+        """
+        with self._lock:
+            generacion = self._generacion
+            self._ciclos[generacion] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._ciclos[generacion] -= 1
+                if not self._ciclos[generacion]:
+                    del self._ciclos[generacion]
+                self._ciclo_terminado.notify_all()
+
+    def _liberables(self):
+        """Particiones soltadas localmente sin ciclos anteriores en curso."""
+        with self._lock:
+            primero = min(self._ciclos, default=None)
+            return {
+                particion for particion, generacion in self._soltando.items()
+                if primero is None or primero >= generacion
+            }
+
+    def renovar(self):
+        """
+        Un latido: renueva, reclama o suelta particiones en una transacción.
+
+        Devuelve el conjunto de particiones propias, o None si Postgres falló
+        (se conservan las actuales hasta que caduquen localmente).
+        """
+        inicio = self._reloj()
+        try:
+            conn = self._conectar()
+            with conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO reminder_lease_nodes (nodo, expira_en)
+                    VALUES (%s, NOW() + %s * INTERVAL '1 second')
+                    ON CONFLICT (nodo) DO UPDATE SET expira_en = EXCLUDED.expira_en
+                    """,
+                    (self.nodo, self.duracion),
+                )
+                cursor.execute(
+                    "DELETE FROM reminder_lease_nodes "
+                    "WHERE expira_en < NOW() - INTERVAL '1 hour'"
+                )
+                cursor.execute(
+                    "SELECT COUNT(*) FROM reminder_lease_nodes WHERE expira_en > NOW()"
+                )
+                activos = max(1, cursor.fetchone()[0])
+                cuota = math.ceil(self.particiones / activos)
+
+                cursor.execute(
+                    """
+                    INSERT INTO reminder_leases (particion)
+                    SELECT generate_series(0, %s - 1)
+                    ON CONFLICT (particion) DO NOTHING
+                    """,
+                    (self.particiones,),
+                )
+                cursor.execute(
+                    """
+                    SELECT particion, nodo, nodo IS NOT NULL AND expira_en > NOW()
+                    FROM reminder_leases
+                    WHERE particion < %s
+                    ORDER BY particion
+                    FOR UPDATE
+                    """,
+                    (self.particiones,),
+                )
+                filas = cursor.fetchall()
+                mias = [p for p, nodo, vigente in filas if vigente and nodo == self.nodo]
+                libres = [p for p, nodo, vigente in filas if not vigente]
+
+                conservar = mias[:cuota] + libres[:max(0, cuota - len(mias))]
+                sobrantes = mias[cuota:]
+                if sobrantes:
+                    # Dejar de entregarlas antes de que otro nodo pueda tomarlas.
+                    self._fijar(set(self.propias) & set(conservar), self._vigente_hasta)
+                liberables = self._liberables() & set(sobrantes)
+                retenidas = [p for p in sobrantes if p not in liberables]
+                if liberables:
+                    cursor.execute(
+                        """
+                        UPDATE reminder_leases SET nodo = NULL, expira_en = NOW()
+                        WHERE particion = ANY(%s) AND nodo = %s
+                        """,
+                        (sorted(liberables), self.nodo),
+                    )
+
+                cursor.execute(
+                    """
+                    UPDATE reminder_leases
+                    SET nodo = %s, expira_en = NOW() + %s * INTERVAL '1 second'
+                    WHERE particion = ANY(%s)
+                    """,
+                    (self.nodo, self.duracion, conservar + retenidas),
+                )
+        except Exception as e:
+            print(f"[WARN] Arrendamiento de particiones ({self.nodo}): {e}")
+            self._cerrar()
+            return None
+
+        self._fijar(conservar, inicio + self.duracion)
+        with self._lock:
+            for particion in set(self._soltando) - set(retenidas):
+                del self._soltando[particion]
+        return frozenset(conservar)
+
+    def liberar(self):
+        """
+        Suelta todas las particiones para que otro nodo las tome sin esperar,
+        tras aguardar (como mucho ``duracion`` segundos) los ciclos en curso.
+        """
+        self._fijar((), 0.0)
+        with self._lock:
+            self._ciclo_terminado.wait_for(lambda: not self._ciclos, self.duracion)
+            self._soltando.clear()
+        try:
+            conn = self._conectar()
+            with conn, conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE reminder_leases SET nodo = NULL, expira_en = NOW() "
+                    "WHERE nodo = %s",
+                    (self.nodo,),
+                )
+                cursor.execute(
+                    "DELETE FROM reminder_lease_nodes WHERE nodo = %s", (self.nodo,)
+                )
+        except Exception as e:
+            print(f"[WARN] No se pudieron liberar las particiones de {self.nodo}: {e}")
+        finally:
+            self._cerrar()
+
+    def iniciar(self):
+        """Primer latido síncrono y luego uno cada tercio de ``duracion``."""
+        if psycopg2 is None:
+            print("[WARN] psycopg2 no está instalado; reparto de particiones deshabilitado.")
+            return False
+        self._stop.clear()
+        self.renovar()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"reminder-lease-{self.nodo}",
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def detener(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.liberar()
+
+    def _run(self):
+        while not self._stop.wait(self.duracion / 3):
+            self.renovar()
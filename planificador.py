@@ -0,0 +1,230 @@
+"""Cola en memoria de recordatorios ordenada por su vencimiento en UTC."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import select
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+except ImportError:  # LISTEN/NOTIFY es opcional.
+    psycopg2 = None
+
+
+def marca_tiempo_utc(valor):
+    """
+    Convierte ``fecha_hora`` de Supabase a segundos epoch UTC.
+
+    Las fechas sin zona se interpretan como UTC, igual que el resto del bot.
+    Devuelve None si el valor está vacío o no es una fecha válida.
+    """
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        fecha = valor
+    else:
+        try:
+            fecha = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+        except (TypeError, ValueError):
+            return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return fecha.timestamp()
+
+
+def iso_utc(marca):
+    """Formatea segundos epoch como ISO 8601 en UTC para filtros de Supabase."""
+    return datetime.fromtimestamp(marca, tz=timezone.utc).isoformat()
+
+
+class ColaVencimientos:
+    """
+    Min-heap de recordatorios indexado por ``id``.
+
+    Reprogramar un ``id`` invalida su entrada anterior sin recorrer el heap:
+    las entradas obsoletas se descartan al llegar a la cima. El hilo que
+    entrega recordatorios duerme en ``esperar`` hasta el siguiente vencimiento
+    o hasta que otro hilo programe algo más próximo.
+    """
+
+    def __init__(self, reloj=time.time):
+        self._reloj = reloj
+        self._heap = []
+        self._vigentes = {}
+        self._secuencia = itertools.count()
+        self._condicion = threading.Condition()
+        self._avisado = False
+
+    def __len__(self):
+        with self._condicion:
+            return len(self._vigentes)
+
+    def __contains__(self, recordatorio_id):
+        with self._condicion:
+            return recordatorio_id in self._vigentes
+
+    def programar(self, recordatorio, vencimiento=None):
+        """
+        Agrega o reprograma un recordatorio.
+
+        ``vencimiento`` permite forzar otra hora (p. ej. el siguiente reenvío de
+        un aviso constante); si se omite se usa ``fecha_hora``. Devuelve False
+        si el recordatorio no tiene una fecha válida.
+        """
+        if vencimiento is None:
+            vencimiento = marca_tiempo_utc(recordatorio.get("fecha_hora"))
+        if vencimiento is None or recordatorio.get("id") is None:
+            return False
+        recordatorio_id = recordatorio["id"]
+        with self._condicion:
+            orden = next(self._secuencia)
+            self._vigentes[recordatorio_id] = (vencimiento, orden, recordatorio)
+            anterior = self._heap[0][0] if self._heap else None
+            heapq.heappush(self._heap, (vencimiento, orden, recordatorio_id))
+            if anterior is None or vencimiento < anterior:
+                self._avisado = True
+                self._condicion.notify_all()
+        return True
+
+    def cancelar(self, recordatorio_id):
+        """Retira un recordatorio; su entrada en el heap queda obsoleta."""
+        with self._condicion:
+            return self._vigentes.pop(recordatorio_id, None) is not None
+
+    def _limpiar_cima(self):
+        while self._heap:
+            vencimiento, orden, recordatorio_id = self._heap[0]
+            vigente = self._vigentes.get(recordatorio_id)
+            if vigente and vigente[1] == orden:
+                return
+            heapq.heappop(self._heap)
+
+    def proximo_vencimiento(self):
+        """Marca de tiempo del siguiente recordatorio o None si está vacía."""
+        with self._condicion:
+            self._limpiar_cima()
+            return self._heap[0][0] if self._heap else None
+
+    def extraer_vencidos(self, ahora=None):
+        """Retira y devuelve, en orden de vencimiento, los recordatorios ya vencidos."""
+        ahora = self._reloj() if ahora is None else ahora
+        vencidos = []
+        with self._condicion:
+            while True:
+                self._limpiar_cima()
+                if not self._heap or self._heap[0][0] > ahora:
+                    break
+                _, _, recordatorio_id = heapq.heappop(self._heap)
+                _, _, recordatorio = self._vigentes.pop(recordatorio_id)
+                vencidos.append(recordatorio)
+        return vencidos
+
+    def esperar(self, limite=None):
+        """
+        Bloquea hasta el siguiente vencimiento, hasta ``limite`` (epoch) o
+        hasta que ``programar``/``despertar`` adelanten el trabajo.
+        """
+        with self._condicion:
+            self._limpiar_cima()
+            objetivo = self._heap[0][0] if self._heap else None
+            if limite is not None:
+                objetivo = limite if objetivo is None else min(objetivo, limite)
+            if self._avisado:
+                self._avisado = False
+                return
+            espera = None if objetivo is None else objetivo - self._reloj()
+            if espera is not None and espera <= 0:
+                return
+            self._condicion.wait(espera)
+            self._avisado = False
+
+    def despertar(self):
+        """Interrumpe la espera actual (nuevo trabajo o detención)."""
+        with self._condicion:
+            self._avisado = True
+            self._condicion.notify_all()
+
+
+class EscuchaNotificacionesPostgres:
+    """
+    Escucha un canal LISTEN/NOTIFY de Postgres en un hilo propio.
+
+    Los payloads JSON recibidos juntos se entregan en una sola llamada a
+    ``al_recibir(lista)``. Tras cada (re)conexión se llama ``al_conectar``
+    para que el consumidor recupere lo que pudo perderse mientras no escuchaba.
+    """
+
+    def __init__(self, dsn, canal, al_recibir, al_conectar=None):
+        self.dsn = dsn
+        self.canal = canal
+        self.al_recibir = al_recibir
+        self.al_conectar = al_conectar
+        self.conectado = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if psycopg2 is None:
+            print("[WARN] psycopg2 no está instalado; LISTEN/NOTIFY deshabilitado.")
+            return False
+        if not self.canal.replace("_", "").isalnum():
+            raise ValueError(f"Canal inválido: {self.canal}")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"pg-listen-{self.canal}",
+            daemon=True,
+        )
+        self._thread.start()
+        return True
+
+    def detener(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn, connect_timeout=10)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f"LISTEN {self.canal}")
+                self.conectado = True
+                backoff = 1
+                print(f"Escuchando notificaciones de Postgres en '{self.canal}'")
+                if self.al_conectar:
+                    self.al_conectar()
+                while not self._stop.is_set():
+                    listos, _, _ = select.select([conn], [], [], 5)
+                    if not listos:
+                        continue
+                    conn.poll()
+                    payloads = []
+                    while conn.notifies:
+                        aviso = conn.notifies.pop(0)
+                        try:
+                            payloads.append(json.loads(aviso.payload))
+                        except ValueError:
+                            print(f"[WARN] Notificación inválida: {aviso.payload!r}")
+                    if payloads:
+                        self.al_recibir(payloads)
+            except Exception as exc:
+                if not self._stop.is_set():
+                    print(f"[WARN] LISTEN '{self.canal}' interrumpido: {exc}")
+            finally:
+                self.conectado = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60)
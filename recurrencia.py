@@ -0,0 +1,64 @@
+"""Cálculo de la siguiente ocurrencia de un recordatorio repetible."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from dateutil.relativedelta import relativedelta
+
+
+# Símbolos de `intervalo_repeticion` con duración fija.
+_PASOS_FIJOS = {
+    "s": "seconds",
+    "x": "minutes",
+    "h": "hours",
+    "d": "days",
+    "w": "weeks",
+}
+# Símbolos de calendario: cuántos meses vale cada unidad.
+_MESES_POR_UNIDAD = {"m": 1, "a": 12}
+
+
+def delta_repeticion(simbolo, num):
+    """Intervalo entre ocurrencias, o None si el símbolo no es válido."""
+    if num <= 0:
+        return None
+    if simbolo in _PASOS_FIJOS:
+        return timedelta(**{_PASOS_FIJOS[simbolo]: num})
+    if simbolo in _MESES_POR_UNIDAD:
+        return relativedelta(months=num * _MESES_POR_UNIDAD[simbolo])
+    return None
+
+
+def siguiente_ocurrencia(fecha, simbolo, num, ahora=None):
+    """
+    Salta directamente a la primera ocurrencia posterior a ``ahora``.
+
+    Devuelve ``(siguiente, omitidas)``: ``omitidas`` cuenta las ocurrencias que
+    vencieron entre ``fecha`` y ``ahora`` (p. ej. mientras el bot estuvo caído)
+    y que no se enviarán. Con ``fecha`` al día, ``omitidas`` es 0 y
+    ``siguiente`` es ``fecha`` más un intervalo. Los intervalos de meses y años
+    se cuentan desde ``fecha`` para no arrastrar recortes de fin de mes
+    (31 ene → 28 feb → 31 mar). Devuelve ``(None, 0)`` si el intervalo no es
+    válido.
+    """
+    delta = delta_repeticion(simbolo, num)
+    if delta is None:
+        return None, 0
+    if ahora is None:
+        ahora = datetime.now(timezone.utc)
+    if fecha.tzinfo is None and ahora.tzinfo is not None:
+        ahora = ahora.astimezone(timezone.utc).replace(tzinfo=None)
+    elif fecha.tzinfo is not None and ahora.tzinfo is None:
+        ahora = ahora.replace(tzinfo=timezone.utc)
+
+    if isinstance(delta, timedelta):
+        pasos = 1 if ahora < fecha else (ahora - fecha) // delta + 1
+        return fecha + delta * pasos, pasos - 1
+
+    meses = num * _MESES_POR_UNIDAD[simbolo]
+    transcurridos = (ahora.year - fecha.year) * 12 + ahora.month - fecha.month
+    pasos = max(1, transcurridos // meses)
+    while fecha + relativedelta(months=meses * pasos) <= ahora:
+        pasos += 1
+    return fecha + relativedelta(months=meses * pasos), pasos - 1
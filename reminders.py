@@ -1,5 +1,4 @@
-from datetime import timedelta
-from dateutil.relativedelta import relativedelta
+from datetime import timezone
 # MIGRACIÓN: Supabase es la única fuente de verdad
 import supabase_db
 from supabase_db import (
@@ -10,6 +9,7 @@ from supabase_db import (
 )
 import json
 from datetime import datetime
+import queue
 import time
 import threading
 import schedule, os, requests
@@ -22,136 +22,631 @@ from gestionar_actualizaciones import (
     obtener_ultima_actualizacion
 )
 
-from services import enviar_telegram, enviar_mensaje_con_grid
+from services import (
+    PRIORIDAD_AVISOS, PRIORIDAD_MASIVA, TELEGRAM_MAX_MESSAGE_LENGTH,
+    calentar_conexiones, chat_bloqueado, longitud_telegram,
+    enviar_telegram, enviar_mensaje_con_grid, prioridad,
+)
 import conversations  # Para pedir zona y actualizar recordatorios
+from despacho import DespachadorPorChat
+from tareas import EjecutorTareas
+from recurrencia import siguiente_ocurrencia
+from particiones import ArrendamientoParticiones, REMINDER_LEASE_DSN
+from bitacora import BitacoraEntregas, FALLIDO, REMINDER_LEDGER_PATH
+import metricas
+from planificador import (
+    ColaVencimientos,
+    EscuchaNotificacionesPostgres,
+    marca_tiempo_utc,
+    iso_utc,
+)
 
 
 TEST_USER_ID = os.environ.get("TELEGRAM_TEST_USER_ID") 
 URL_MONITOR = os.environ.get("URL_MONITOR","") 
 
+# Ventana de recordatorios que se mantiene cargada en memoria.
+REMINDER_LOOKAHEAD_SECONDS = max(
+    60, int(os.getenv("REMINDER_LOOKAHEAD_SECONDS", "900"))
+)
+# Lectura incremental: solo filas nuevas o que entran a la ventana.
+REMINDER_REFRESH_SECONDS = max(
+    10, int(os.getenv("REMINDER_REFRESH_SECONDS", "120"))
+)
+# Relectura completa de la ventana para recoger ediciones hechas fuera del bot.
+REMINDER_RESYNC_SECONDS = max(
+    60, int(os.getenv("REMINDER_RESYNC_SECONDS", "600"))
+)
+# Reenvío de avisos constantes mientras no se detengan.
+REMINDER_CONSTANT_INTERVAL_SECONDS = max(
+    10, int(os.getenv("REMINDER_CONSTANT_INTERVAL_SECONDS", "60"))
+)
+# Espera antes de reintentar si Supabase no confirmó el estado al vencer.
+REMINDER_RETRY_SECONDS = 30
+# Conexión directa a Postgres de Supabase para LISTEN/NOTIFY (opcional).
+REMINDER_NOTIFY_DSN = os.getenv("REMINDER_NOTIFY_DSN", "")
+REMINDER_NOTIFY_CHANNEL = "recordatorios_cambios"
+
+# Modo resumen: con al menos este número de avisos vencidos a la vez en un
+# chat se envían en un solo mensaje (0 lo desactiva).
+REMINDER_DIGEST_MIN_ITEMS = max(0, int(os.getenv("REMINDER_DIGEST_MIN_ITEMS", "0")))
+# Máximo de avisos por mensaje de resumen (3 botones por aviso).
+REMINDER_DIGEST_MAX_ITEMS = 10
+
+
+def _texto_omitidas(omitidas):
+    return (
+        f"⚠️ Te perdiste {omitidas} "
+        f"{'repetición' if omitidas == 1 else 'repeticiones'} "
+        "mientras el bot estuvo fuera de línea."
+    )
+
+
+def _texto_resumen(entradas):
+    """Mensaje de resumen con las entradas ya formateadas de cada aviso."""
+    mensaje = f"⏰ *{len(entradas)} RECORDATORIOS*\n"
+    for numero, entrada in enumerate(entradas, start=1):
+        mensaje += f"\n*{numero}.* {entrada}"
+    return mensaje
+
+
+def partir_por_longitud(entradas, limite=TELEGRAM_MAX_MESSAGE_LENGTH):
+    """
+    Reparte ``entradas`` en grupos consecutivos cuyo ``_texto_resumen`` cabe
+    en ``limite``. Una entrada que no cabe ni sola queda en un grupo propio.
+    """
+    grupos, actual = [], []
+    for entrada in entradas:
+        if actual and longitud_telegram(_texto_resumen(actual + [entrada])) > limite:
+            grupos.append(actual)
+            actual = []
+        actual.append(entrada)
+    if actual:
+        grupos.append(actual)
+    return grupos
+
+
+def agrupar_en_resumenes(recordatorios, minimo=REMINDER_DIGEST_MIN_ITEMS,
+                         maximo=REMINDER_DIGEST_MAX_ITEMS):
+    """
+    Sustituye los avisos vencidos de un mismo chat por elementos de resumen
+    ``{"id", "chat_id", "resumen": [...]}`` cuando son al menos ``minimo``.
+
+    Los avisos constantes siempre van solos: su mensaje se edita al detenerlos.
+    Cada resumen ocupa el lugar del primero de sus avisos para conservar el
+    orden dentro del chat.
+    """
+    if minimo < 2:
+        return list(recordatorios)
+    por_chat = {}
+    for recordatorio in recordatorios:
+        if not recordatorio.get("aviso_constante"):
+            por_chat.setdefault(recordatorio.get("chat_id"), []).append(recordatorio)
+
+    resultado = []
+    emitidos = set()
+    for recordatorio in recordatorios:
+        chat_id = recordatorio.get("chat_id")
+        grupo = por_chat.get(chat_id, [])
+        if recordatorio.get("aviso_constante") or len(grupo) < minimo:
+            resultado.append(recordatorio)
+        elif chat_id not in emitidos:
+            emitidos.add(chat_id)
+            for inicio in range(0, len(grupo), maximo):
+                parte = grupo[inicio:inicio + maximo]
+                resultado.append({
+                    "id": f"resumen:{parte[0]['id']}",
+                    "chat_id": chat_id,
+                    "resumen": parte,
+                })
+    return resultado
+
+
 class AdministradorRecordatorios:
-    def __init__(self):
+    def __init__(self, reloj=time.time, arrendamiento=None, bitacora=None):
         self.activo = False
         self.hilo = None
+        self.hilo_entregas = None
         self.job_corregir = None  # aquí guardaremos el Job de corrección
+        # Agenda propia: reiniciar el administrador no duplica los jobs.
+        # schedule no es thread-safe: solo el hilo de _ejecutar la toca, y los
+        # jobs que corren en self.tareas le encargan sus cancelaciones.
+        self.agenda = schedule.Scheduler()
+        self._cancelaciones = queue.SimpleQueue()
+        self.tareas = EjecutorTareas()
+        self._reloj = reloj
+        self.cola = ColaVencimientos(reloj=reloj)
+        self.despachador = DespachadorPorChat()
+        self._confirmaciones = supabase_db.LoteConfirmaciones(
+            al_confirmar=self._al_confirmar_entregas
+        )
+        # Bitácora local de envíos (exactamente una vez entre reinicios).
+        self.bitacora = bitacora
+        self._bitacora_reconciliada = False
+        self._horizonte = None  # epoch UTC hasta donde está cargada la cola
+        self._ultimo_id = 0
+        self._proxima_recarga = 0.0
+        self._proxima_resincronizacion = 0.0
+        self.escucha = None
+        # Con varios workers, solo se entregan los chats de particiones propias.
+        self.arrendamiento = arrendamiento
 
     def iniciar(self):
         """Inicia el administrador de recordatorios en un hilo separado"""
         if not self.activo:
             self.activo = True
+            supabase_db.suscribir_cambios_recordatorios(self._al_cambiar_recordatorio)
+            if self.bitacora is None and REMINDER_LEDGER_PATH:
+                try:
+                    self.bitacora = BitacoraEntregas(REMINDER_LEDGER_PATH)
+                except Exception as e:
+                    print(f"[WARN] Bitácora de entregas deshabilitada: {e}")
+            if self.arrendamiento is None and REMINDER_LEASE_DSN:
+                self.arrendamiento = ArrendamientoParticiones(REMINDER_LEASE_DSN)
+            if self.arrendamiento:
+                # Al ganar o perder particiones se relee la ventana completa.
+                self.arrendamiento.al_cambiar = (
+                    lambda anteriores, nuevas: self._forzar_resincronizacion()
+                )
+                self.arrendamiento.iniciar()
+            if REMINDER_NOTIFY_DSN:
+                self.escucha = EscuchaNotificacionesPostgres(
+                    REMINDER_NOTIFY_DSN,
+                    REMINDER_NOTIFY_CHANNEL,
+                    self._al_notificar_postgres,
+                    al_conectar=self._forzar_resincronizacion,
+                )
+                self.escucha.iniciar()
             self.hilo = threading.Thread(target=self._ejecutar)
             self.hilo.daemon = True
             self.hilo.start()
+            self.hilo_entregas = threading.Thread(
+                target=self._bucle_entregas,
+                name="reminder-delivery",
+                daemon=True,
+            )
+            self.hilo_entregas.start()
             print("Administrador de recordatorios iniciado")
 
     def detener(self):
         """Detiene el administrador de recordatorios"""
         self.activo = False
+        supabase_db.cancelar_suscripcion_recordatorios(self._al_cambiar_recordatorio)
+        if self.escucha:
+            self.escucha.detener()
+        if self.arrendamiento:
+            self.arrendamiento.detener()
+        self.cola.despertar()
         if self.hilo:
             self.hilo.join(timeout=1.0)
+        if self.hilo_entregas:
+            self.hilo_entregas.join(timeout=1.0)
+        self.despachador.detener()
+        self.agenda.clear()
+        self.job_corregir = None
+        self.tareas.detener()
         print("Administrador de recordatorios detenido")
 
     def _ejecutar(self):
         """Método principal que se ejecuta en el hilo"""
 
         # --- CORRECCIÓN INICIAL ---
-        primero_ok = self.corregir_recordatorios()
+        primero_ok = self._si_coordinador(self.corregir_recordatorios)
         if not primero_ok:
             # si había chats sin zona, programamos chequeo periódico
-            self.job_corregir = schedule.every(1).minutes.do(self._job_corregir)
+            self.job_corregir = self.agenda.every(1).minutes.do(
+                self.tareas.lanzar, "zonas_horarias", self._job_corregir, limite=60
+            )
             print("Programada corrección periódica de zonas horarias")
 
         # --- PROGRAMACIÓN NORMAL ---
-        verificar_recordatorios_ahora()
-        schedule.every(1).minutes.do(self.verificar_recordatorios)
-        schedule.every(5).minutes.do(self.verificar_actualizaciones)
+        # Los recordatorios los entrega _bucle_entregas; aquí solo mantenimiento.
+        # Cada job corre en self.tareas: este bucle solo los encola.
+        self.agenda.every(5).minutes.do(
+            self.tareas.lanzar, "actualizaciones",
+            self._si_coordinador, self.verificar_actualizaciones, limite=300,
+        )
 
         # --- BACKUP AUTOMÁTICO: Supabase → Docker Postgres cada 30 min ---
         try:
             from backup_db import ejecutar_backup
-            schedule.every(30).minutes.do(ejecutar_backup)
+            self.agenda.every(30).minutes.do(
+                self.tareas.lanzar, "backup",
+                self._si_coordinador, ejecutar_backup, limite=1800,
+            )
             print("Backup automático programado cada 30 minutos")
         except ImportError:
             print("[WARN] backup_db no disponible. Backup deshabilitado.")
 
         # Bucle principal
         while self.activo:
-            schedule.run_pending()
+            self._aplicar_cancelaciones()
+            self.agenda.run_pending()
             time.sleep(1)
 
+    def _aplicar_cancelaciones(self):
+        """Cancela en el hilo de la agenda los jobs pedidos desde otros hilos."""
+        while True:
+            try:
+                job = self._cancelaciones.get_nowait()
+            except queue.Empty:
+                return
+            self.agenda.cancel_job(job)
+
     def _job_corregir(self):
         """
         Job intermedio que ejecuta corregir_recordatorios y se anula
         si ya no quedan chats sin zona horaria.
         """
-        hecho = self.corregir_recordatorios()
+        hecho = self._si_coordinador(self.corregir_recordatorios)
         if hecho and self.job_corregir:
-            schedule.cancel_job(self.job_corregir)
+            # Corre en self.tareas: la agenda lo cancela en su propio hilo.
+            self._cancelaciones.put(self.job_corregir)
             print("Corrección de zonas completada. Job cancelado.")
             self.job_corregir = None
 
-    def verificar_recordatorios(self):
-        """Verifica si hay recordatorios pendientes y los envía"""
-        print(f"[{datetime.now().isoformat()}] Verificando recordatorios (Fuente: Supabase)...")
-        # LECTURA DIRECTA DE SUPABASE (ya filtra por fecha vencida)
-        pendientes = supabase_db.obtener_recordatorios_pendientes()
-        
-        # Filtro adicional de fecha (Supabase ya filtra parcialmente)
-        ahora_utc = datetime.utcnow()
-        
-        for recordatorio in pendientes:
-            # Validar fecha vencida
+    def _si_coordinador(self, funcion):
+        """
+        Ejecuta un job de mantenimiento solo en el nodo dueño de la partición 0,
+        para que varios workers no dupliquen avisos de actualización o backups.
+        """
+        if self.arrendamiento is None or self.arrendamiento.posee(0):
+            return funcion()
+        return None
+
+    def _me_corresponde(self, recordatorio):
+        return self.arrendamiento is None or self.arrendamiento.posee_chat(
+            recordatorio.get("chat_id")
+        )
+
+    def _bucle_entregas(self):
+        """Duerme hasta el siguiente vencimiento (o recarga) y entrega lo vencido."""
+        while self.activo:
             try:
-                fecha_str = recordatorio.get("fecha_hora")
-                if not fecha_str: continue
-                
-                fecha_dt = datetime.fromisoformat(fecha_str)
-                # Asumimos que recordatorios en DB local se guardan normalizados si es posible,
-                # pero 'fecha_hora' suele venir en ISO. 
-                # Comparar con UTC actual.
-                
-                # Si 'fecha_dt' no tiene tzinfo, asumimos que es comparable con nuestra referencia
-                # La logica original usaba 'hora_utc_servidor_segun_zona_host' pero aqui simplificamos.
-                # Si la fecha del recordatorio <= ahora, se envía.
-                
-                # Hack simple: si fecha_dt es naive, asumirla UTC para comparar con utcnow
-                if fecha_dt.tzinfo is None:
-                     if fecha_dt > ahora_utc:
-                         continue # Aún no toca
+                self._ciclo_entregas()
+            except Exception as e:
+                print(f"[ERROR] Ciclo de entrega de recordatorios: {e}")
+                self._proxima_recarga = self._reloj() + REMINDER_RETRY_SECONDS
+            if self.activo:
+                self.cola.esperar(
+                    limite=min(self._proxima_recarga, self._proxima_resincronizacion)
+                )
+
+    def _escuchando_cambios(self):
+        return bool(self.escucha and self.escucha.conectado)
+
+    def _forzar_resincronizacion(self):
+        """Tras (re)conectar LISTEN se relee la ventana por si hubo cambios perdidos."""
+        self._proxima_resincronizacion = 0.0
+        self.cola.despertar()
+
+    def _al_cambiar_recordatorio(self, evento, registro):
+        """
+        Aplica a la cola un cambio hecho en este proceso (o recibido por
+        NOTIFY) para que un alta o un aplazamiento venza a su hora exacta.
+        """
+        recordatorio_id = registro.get("id")
+        if recordatorio_id is None:
+            return
+        if evento == "eliminado" or not self._me_corresponde(registro):
+            self.cola.cancelar(recordatorio_id)
+            return
+
+        vencimiento = marca_tiempo_utc(registro.get("fecha_hora"))
+        if vencimiento is None:
+            self.cola.cancelar(recordatorio_id)
+        elif not registro.get("notificado"):
+            if self._horizonte is not None and vencimiento > self._horizonte:
+                # Fuera de la ventana: la carga incremental lo recogerá.
+                self.cola.cancelar(recordatorio_id)
+            else:
+                self.cola.programar(registro, vencimiento)
+        elif registro.get("aviso_constante") and not registro.get("aviso_detenido"):
+            if recordatorio_id not in self.cola:
+                self.cola.programar(
+                    registro, self._reloj() + REMINDER_CONSTANT_INTERVAL_SECONDS
+                )
+        else:
+            self.cola.cancelar(recordatorio_id)
+
+    def _al_notificar_postgres(self, eventos):
+        """Procesa en lote los avisos de ``arv_notificar_recordatorio``."""
+        eliminados = {e.get("id") for e in eventos if e.get("op") == "DELETE"}
+        for recordatorio_id in eliminados:
+            self.cola.cancelar(recordatorio_id)
+        ids = sorted(
+            {e.get("id") for e in eventos if e.get("id") is not None} - eliminados
+        )
+        if not ids:
+            return
+        filas = supabase_db.obtener_recordatorios_por_ids(ids)
+        if filas is None:
+            self._forzar_resincronizacion()
+            return
+        for fila in filas:
+            self._al_cambiar_recordatorio("guardado", fila)
+
+    def _ciclo_entregas(self):
+        """Recarga la ventana si corresponde y entrega los recordatorios vencidos."""
+        inicio = time.monotonic()
+        peticiones_bd = metricas.PETICIONES_SUPABASE.total()
+        peticiones_telegram = metricas.PETICIONES_TELEGRAM.total()
+        vencidos = []
+        try:
+            if self.bitacora and not self._bitacora_reconciliada:
+                self._reconciliar_bitacora()
+            ahora = self._reloj()
+            if (
+                self._proxima_resincronizacion == float("inf")
+                and not self._escuchando_cambios()
+            ):
+                # Se perdió la conexión LISTEN: volver a la relectura periódica.
+                self._proxima_resincronizacion = ahora + REMINDER_RESYNC_SECONDS
+            if self._horizonte is None or ahora >= self._proxima_resincronizacion:
+                self._cargar_ventana(completa=True)
+            elif ahora >= self._proxima_recarga:
+                self._cargar_ventana()
+
+            vencidos = self.cola.extraer_vencidos(self._reloj())
+            if vencidos:
+                self._entregar(vencidos)
+        finally:
+            # Las peticiones se cuentan por proceso: incluyen las del webhook
+            # que coincidan con el ciclo.
+            metricas.CICLOS.inc()
+            metricas.DURACION_CICLO.observar(time.monotonic() - inicio)
+            metricas.LLAMADAS_BD_CICLO.observar(
+                metricas.PETICIONES_SUPABASE.total() - peticiones_bd
+            )
+            metricas.LLAMADAS_TELEGRAM_CICLO.observar(
+                metricas.PETICIONES_TELEGRAM.total() - peticiones_telegram
+            )
+            metricas.VENCIDOS_CICLO.fijar(len(vencidos))
+            metricas.EN_COLA.fijar(len(self.cola))
+            metricas.ULTIMO_CICLO.fijar(time.time())
+
+    def _al_confirmar_entregas(self, ids):
+        if self.bitacora:
+            self.bitacora.confirmar(ids)
+
+    def _reconciliar_bitacora(self):
+        """
+        Tras un reinicio, acusa en Supabase los envíos que la bitácora registra
+        pero que no llegaron a marcarse como notificados. Se reintenta en cada
+        ciclo hasta que Supabase responda.
+
+        Los ``fallido`` no se acusan: siguen pendientes en Supabase y la entrega
+        normal los reenvía. Un ``intento`` sin resultado (caída durante el
+        envío) se acusa sin reenviar: ante la duda se prefiere no duplicar.
+        """
+        pendientes = self.bitacora.pendientes()
+        if pendientes:
+            filas = supabase_db.obtener_recordatorios_por_ids(
+                sorted({p["id"] for p in pendientes})
+            )
+            if filas is None:
+                return False
+            por_id = {f["id"]: f for f in filas}
+            resueltos, acusados = [], 0
+            for pendiente in pendientes:
+                if pendiente["estado"] == FALLIDO:
+                    continue
+                fila = por_id.get(pendiente["id"])
+                if (
+                    fila
+                    and not fila.get("notificado")
+                    and marca_tiempo_utc(fila.get("fecha_hora"))
+                    == marca_tiempo_utc(pendiente["fecha_hora"])
+                ):
+                    _, nueva_dt, _ = self._preparar_aviso(fila, "UTC")
+                    self._registrar_envio(fila, nueva_dt, self._confirmaciones)
+                    acusados += 1
                 else:
-                    if fecha_dt > datetime.now(fecha_dt.tzinfo):
-                        continue
+                    # Ya acusado, aplazado desde entonces o eliminado.
+                    resueltos.append(pendiente["id"])
+            self.bitacora.confirmar(resueltos)
+            for siguiente in self._confirmaciones.confirmar():
+                self._programar_si_en_ventana(siguiente)
+            print(
+                f"Bitácora reconciliada: {acusados} envíos acusados en Supabase, "
+                f"{len(resueltos)} ya resueltos, "
+                f"{len(pendientes) - acusados - len(resueltos)} fallidos por reenviar"
+            )
+        self.bitacora.purgar()
+        self._bitacora_reconciliada = True
+        return True
 
-            except Exception as e:
-                print(f"Error procesando fecha recordatorio {recordatorio.get('id')}: {e}")
+    def _cargar_ventana(self, completa=False):
+        """
+        Carga en la cola los recordatorios que vencen antes del nuevo horizonte.
+
+        La carga completa lee toda la ventana; la incremental solo pide las filas
+        que entraron a la ventana desde el horizonte anterior o que se crearon
+        después del último ``id`` visto.
+        """
+        ahora = self._reloj()
+        horizonte = int(ahora + REMINDER_LOOKAHEAD_SECONDS)
+
+        if completa or self._horizonte is None:
+            registros = supabase_db.obtener_recordatorios_pendientes(
+                hasta=iso_utc(horizonte)
+            )
+            if registros is None:
+                # Ni horizonte ni resincronización avanzan: la relectura
+                # completa sigue pendiente y se repite en el siguiente intento.
+                self._proxima_resincronizacion = ahora + REMINDER_RETRY_SECONDS
+                self._proxima_recarga = ahora + REMINDER_RETRY_SECONDS
+                return 0
+            self._proxima_resincronizacion = ahora + (
+                # Con NOTIFY activo solo se relee al reconectar.
+                float("inf") if self._escuchando_cambios()
+                else REMINDER_RESYNC_SECONDS
+            )
+            if self.bitacora and self._bitacora_reconciliada:
+                self.bitacora.purgar()
+        else:
+            registros = supabase_db.obtener_recordatorios_nuevos_en_ventana(
+                desde_fecha=iso_utc(self._horizonte),
+                hasta=iso_utc(horizonte),
+                desde_id=self._ultimo_id,
+            )
+            if registros is None:
+                # No avanzar el horizonte: la siguiente recarga repite el tramo.
+                self._proxima_recarga = ahora + REMINDER_RETRY_SECONDS
+                return 0
+
+        for recordatorio in registros:
+            if self._me_corresponde(recordatorio):
+                self.cola.programar(recordatorio)
+            try:
+                self._ultimo_id = max(self._ultimo_id, int(recordatorio["id"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        self._horizonte = horizonte
+        # Con NOTIFY activo la recarga solo hace avanzar la ventana.
+        self._proxima_recarga = ahora + (
+            REMINDER_LOOKAHEAD_SECONDS // 2 if self._escuchando_cambios()
+            else REMINDER_REFRESH_SECONDS
+        )
+        print(
+            f"[{datetime.now().isoformat()}] Ventana de recordatorios "
+            f"{'completa' if completa else 'incremental'}: "
+            f"{len(registros)} leídos, {len(self.cola)} en cola"
+        )
+        return len(registros)
+
+    def _sigue_pendiente(self, recordatorio, ahora):
+        """
+        Decide con el estado actual de Supabase si un recordatorio vencido se
+        envía (True), se reprograma porque cambió su fecha, o se descarta.
+        """
+        vencimiento = marca_tiempo_utc(recordatorio.get("fecha_hora"))
+        if vencimiento is None:
+            return False
+        if vencimiento > ahora:
+            # Aplazado o editado desde que entró a la cola.
+            if self._horizonte is not None and vencimiento <= self._horizonte:
+                self.cola.programar(recordatorio, vencimiento)
+            return False
+        if not recordatorio.get("notificado"):
+            return True
+        return bool(
+            recordatorio.get("aviso_constante")
+            and not recordatorio.get("aviso_detenido")
+        )
+
+    def _entregar(self, vencidos):
+        """
+        Confirma el estado de los vencidos con una sola lectura y los envía en
+        paralelo por chat, respetando el orden de vencimiento dentro de cada uno.
+
+        Con arrendamiento, una partición que se deje de poseer a mitad del
+        ciclo no se suelta hasta que sus acuses están escritos.
+        """
+        if self.arrendamiento is None:
+            return self._entregar_vencidos(vencidos)
+        with self.arrendamiento.entregando():
+            return self._entregar_vencidos(vencidos)
+
+    def _entregar_vencidos(self, vencidos):
+        ahora = self._reloj()
+        actuales = supabase_db.obtener_recordatorios_por_ids(
+            [r["id"] for r in vencidos]
+        )
+        if actuales is None:
+            # Supabase no respondió: se reintenta más tarde sin perderlos.
+            for recordatorio in vencidos:
+                self.cola.programar(recordatorio, ahora + REMINDER_RETRY_SECONDS)
+            return 0
+
+        por_id = {r["id"]: r for r in actuales}
+        por_enviar = []
+        for vencido in vencidos:
+            recordatorio = por_id.get(vencido["id"])
+            if not recordatorio or not self._me_corresponde(recordatorio):
+                # Su partición pasó a otro nodo: ese nodo lo entrega.
+                continue
+            if not self._sigue_pendiente(recordatorio, ahora):
+                continue
+            if chat_bloqueado(recordatorio.get("chat_id")):
+                # Telegram lo rechazaría: se acusa sin enviar y, si es
+                # constante, no se reprograma.
+                _, nueva_dt, _ = self._preparar_aviso(recordatorio, "UTC")
+                self._registrar_envio(recordatorio, nueva_dt, self._confirmaciones)
+                print(f"Recordatorio {recordatorio['id']} omitido: el chat bloqueó al bot")
                 continue
+            por_enviar.append(recordatorio)
+        if not por_enviar:
+            for siguiente in self._confirmaciones.confirmar():
+                self._programar_si_en_ventana(siguiente)
+            return 0
+
+        self.despachador.despachar(
+            agrupar_en_resumenes(por_enviar),
+            lambda e: (
+                self._enviar_resumen(e["resumen"], lote=self._confirmaciones)
+                if "resumen" in e
+                else self._enviar_recordatorio(e, lote=self._confirmaciones)
+            ),
+        )
+        for recordatorio in por_enviar:
+            if recordatorio.get("aviso_constante"):
+                self.cola.programar(
+                    recordatorio, self._reloj() + REMINDER_CONSTANT_INTERVAL_SECONDS
+                )
+        # Un UPDATE in_ por columna y un INSERT multi-fila para todo el ciclo.
+        for siguiente in self._confirmaciones.confirmar():
+            self._programar_si_en_ventana(siguiente)
 
-            self._enviar_recordatorio(recordatorio)
+        ciclo = self.despachador.estadisticas()["ultimo_ciclo"]
+        print(
+            f"[{datetime.now().isoformat()}] Despacho: {ciclo['enviados']} enviados "
+            f"a {ciclo['chats']} chats en {ciclo['duracion_s']}s "
+            f"({ciclo['por_segundo']}/s), {ciclo['errores']} errores, "
+            f"{len(self.cola)} en cola"
+        )
+        return len(por_enviar)
 
-    def _enviar_recordatorio(self, recordatorio):
-        """Envía un recordatorio al usuario y, si es repetible, crea el siguiente."""
+    def _programar_si_en_ventana(self, recordatorio):
+        vencimiento = marca_tiempo_utc(recordatorio.get("fecha_hora"))
+        if vencimiento is None:
+            return False
+        if self._horizonte is not None and vencimiento > self._horizonte:
+            return False
+        return self.cola.programar(recordatorio, vencimiento)
+
+    def verificar_recordatorios(self):
+        """Relee la ventana y envía en el acto los recordatorios ya vencidos."""
+        print(f"[{datetime.now().isoformat()}] Verificando recordatorios (Fuente: Supabase)...")
+        self._cargar_ventana(completa=True)
+        vencidos = self.cola.extraer_vencidos(self._reloj())
+        if vencidos:
+            self._entregar(vencidos)
+
+    def _enviar_recordatorio(self, recordatorio, lote=None):
+        """
+        Envía un recordatorio al usuario y, si es repetible, crea el siguiente.
+
+        Con ``lote`` (``supabase_db.LoteConfirmaciones``) el acuse y la siguiente
+        ocurrencia se registran ahí para escribirse en bloque y devuelve si
+        Telegram confirmó el envío (el despachador cuenta los False como
+        errores); sin lote se escriben al momento y devuelve el siguiente
+        creado o None. Solo se acusa lo que Telegram confirmó: un primer envío
+        rechazado vuelve a la cola para reintentarse.
+        """
+        siguiente = None
+        enviado = False
         try:
             chat_id = recordatorio["chat_id"]
             print("Buscando ", chat_id, " en las conversaciones... (Envio de recordatorio)")
             conversaciones = conversations.inicializar_conversaciones(chat_id=chat_id, nombre_usuario=recordatorio.get("usuario",""))
             
             aviso_constante = bool(recordatorio.get("aviso_constante", False))
-            repetir = bool(recordatorio.get("repetir", False))
-            repeticion_creada = bool(recordatorio.get("repeticion_creada", False))
-            simbolo = recordatorio.get("intervalo_repeticion", "")
-            num = int(recordatorio.get("intervalos", 0))
             zona_horaria = conversaciones.get(chat_id,{}).get("datos",{}).get("zona_horaria","")
-
-            # Formatear fecha si existe
-            fecha_hora_str = ""
-            if recordatorio.get("fecha_hora"):
-                try:
-                    recordatorio_fecha_hora_utc = recordatorio["fecha_hora"]
-                    recordatorio_fecha_hora_local =  utilidades.convertir_fecha_utc_a_local(fecha_utc=datetime.fromisoformat(recordatorio_fecha_hora_utc), zona_horaria=zona_horaria)
-                    # dt = datetime.fromisoformat(recordatorio_fecha_hora_local)
-                    fecha_hora_str = f" (programado para {recordatorio_fecha_hora_local.strftime('%d/%m/%Y a las %H:%M')})"
-                except Exception as e:
-                    print("Error al convertir fecha hora en local:", str(e))
+            fecha_hora_str, nueva_dt, omitidas = self._preparar_aviso(
+                recordatorio, zona_horaria
+            )
 
             # Crear mensaje
             mensaje = "⏰ *RECORDATORIO*\n\n"
@@ -160,6 +655,8 @@ class AdministradorRecordatorios:
             mensaje += f"📝 *Tarea:* {recordatorio['nombre_tarea']}\n"
             mensaje += f"📋 *Descripción:* {recordatorio['descripcion']}\n"
             mensaje += fecha_hora_str
+            if omitidas:
+                mensaje += "\n\n" + _texto_omitidas(omitidas)
 
             # Enviar con opciones de aplazamiento para avisos normales y constantes.
             recordatorio_id = recordatorio["id"]
@@ -181,12 +678,24 @@ class AdministradorRecordatorios:
                     {"texto": "🛑 Detener avisos", "data": "parar"}
                 ])
 
-            ret = enviar_mensaje_con_grid(
-                chat_id,
-                mensaje,
-                filas_aplazamiento,
-                formato="Markdown",
-            )
+            # Primer envío de esta ocurrencia: queda en la bitácora antes de
+            # salir; los reenvíos de avisos constantes no pasan por ella.
+            primer_envio = self.bitacora is not None and not recordatorio.get("notificado")
+            if primer_envio and not self.bitacora.registrar_intento(recordatorio):
+                print(f"Recordatorio {recordatorio_id} ya enviado según la bitácora; solo se acusa")
+                siguiente = self._registrar_envio(recordatorio, nueva_dt, lote)
+                return True if lote is not None else siguiente
+
+            with prioridad(PRIORIDAD_AVISOS):
+                ret = enviar_mensaje_con_grid(
+                    chat_id,
+                    mensaje,
+                    filas_aplazamiento,
+                    formato="Markdown",
+                )
+            enviado = self._medir_envio(ret, [] if recordatorio.get("notificado") else [recordatorio])
+            if primer_envio:
+                self.bitacora.registrar_resultado(recordatorio, enviado)
 
             # RECORDATORIOS DE AVISO CONSTANTE, SE EDITARAN ESOS MENSAJES CUANDO SE DETENGAN 
             try:
@@ -205,58 +714,13 @@ class AdministradorRecordatorios:
             except Exception as e: 
                 print("Error al guardar datos de mensaje en enviar recordatorio:", str(e))
 
-            # Marcar como notificado directamente en Supabase
-            supabase_db.marcar_como_notificado(recordatorio["id"])
-
-            # Si debe repetirse, crear siguiente
-            if repetir and recordatorio.get("fecha_hora") and simbolo and num > 0 and not repeticion_creada:
-                try:
-                    original_dt = datetime.fromisoformat(recordatorio["fecha_hora"])
-
-                    # Elegir tipo de delta
-                    if simbolo == "s":
-                        delta = timedelta(seconds=num)
-                    elif simbolo == "x":
-                        delta = timedelta(minutes=num)
-                    elif simbolo == "h":
-                        delta = timedelta(hours=num)
-                    elif simbolo == "d":
-                        delta = timedelta(days=num)
-                    elif simbolo == "w":
-                        delta = timedelta(weeks=num)
-                    elif simbolo == "m":
-                        delta = relativedelta(months=num)
-                    elif simbolo == "a":
-                        delta = relativedelta(years=num)
-                    else:
-                        delta = None
-
-                    if delta:
-                        nueva_dt = original_dt + delta
-                        nuevo = {
-                            "chat_id":           chat_id,
-                            "usuario":           recordatorio["usuario"],
-                            "nombre_tarea":      recordatorio["nombre_tarea"],
-                            "descripcion":       recordatorio["descripcion"],
-                            "fecha_hora":        nueva_dt.isoformat(),
-                            "creado_en":         datetime.now().isoformat(),
-                            "es_formato_utc":    True,
-                            "repetir":           True,
-                            "intervalos":        num,
-                            "intervalo_repeticion": simbolo,
-                            "aviso_constante":   aviso_constante,
-                            "aviso_detenido":    False, # Resetear estado
-                            "notificado":        False  # Resetear estado
-                        }
-                        # GUARDAR NUEVO RECORDATORIO DIRECTAMENTE EN SUPABASE
-                        supabase_db.guardar_recordatorio(nuevo)
-                        
-                        # Marcar el original como repetición creada
-                        supabase_db.marcar_como_repetido(recordatorio["id"])
-                           
-                        print(f"Siguiente recordatorio programado para {nueva_dt.isoformat()}")
-                except Exception as e:
-                    print(f"Error al crear siguiente recordatorio repetido: {e}")
+            if enviado:
+                siguiente = self._registrar_envio(recordatorio, nueva_dt, lote)
+            elif not recordatorio.get("notificado"):
+                # Sin acuse sigue pendiente en Supabase: se reintenta.
+                self.cola.programar(recordatorio, self._reloj() + REMINDER_RETRY_SECONDS)
+                print(f"Recordatorio {recordatorio_id} no llegó a {chat_id}; se reintentará")
+                return enviado if lote is not None else siguiente
 
             # Limpiar recordatorios finalizados
             # eliminar_recordatorios_finalizados() # Desactivar limpieza agresiva si estamos offline
@@ -265,6 +729,218 @@ class AdministradorRecordatorios:
         except Exception as e:
             print(f"Error al enviar recordatorio: {e}")
 
+        return enviado if lote is not None else siguiente
+
+    def _enviar_resumen(self, recordatorios, lote=None):
+        """
+        Envía varios recordatorios vencidos de un mismo chat en un solo mensaje,
+        con una fila de botones de aplazamiento por aviso. Si el texto pasa del
+        límite de Telegram se reparte en varios mensajes.
+
+        Los botones llevan el sufijo ``:r`` para que el aplazamiento responda
+        con un mensaje nuevo en vez de reemplazar el resumen completo. Devuelve
+        False si algún aviso no llegó a Telegram.
+        """
+        try:
+            chat_id = recordatorios[0]["chat_id"]
+            conversaciones = conversations.inicializar_conversaciones(
+                chat_id=chat_id,
+                nombre_usuario=recordatorios[0].get("usuario", ""),
+            )
+            zona_horaria = conversaciones.get(chat_id, {}).get("datos", {}).get("zona_horaria", "")
+
+            if self.bitacora is not None:
+                por_enviar = []
+                for recordatorio in recordatorios:
+                    if self.bitacora.registrar_intento(recordatorio):
+                        por_enviar.append(recordatorio)
+                    else:
+                        # Ya enviado según la bitácora: solo se acusa.
+                        _, nueva_dt, _ = self._preparar_aviso(recordatorio, zona_horaria)
+                        self._registrar_envio(recordatorio, nueva_dt, lote)
+                recordatorios = por_enviar
+                if not recordatorios:
+                    return True
+
+            entradas, siguientes = [], {}
+            for recordatorio in recordatorios:
+                fecha_hora_str, nueva_dt, omitidas = self._preparar_aviso(
+                    recordatorio, zona_horaria
+                )
+                siguientes[recordatorio["id"]] = nueva_dt
+                entrada = f"📝 *{recordatorio['nombre_tarea']}*"
+                if recordatorio.get("descripcion"):
+                    entrada += f": {recordatorio['descripcion']}"
+                entrada += fecha_hora_str
+                if omitidas:
+                    entrada += "\n" + _texto_omitidas(omitidas)
+                entradas.append(entrada)
+
+            # Las descripciones no tienen largo máximo: el resumen se parte
+            # para no pasar del límite de un mensaje de Telegram.
+            inicio, enviados = 0, True
+            for grupo in partir_por_longitud(entradas):
+                parte = recordatorios[inicio:inicio + len(grupo)]
+                inicio += len(grupo)
+                if len(parte) == 1:
+                    enviados &= self._enviar_por_separado(parte, lote)
+                else:
+                    enviados &= self._enviar_parte_resumen(chat_id, parte, grupo, siguientes, lote)
+            return enviados
+
+        except Exception as e:
+            print(f"Error al enviar resumen de recordatorios: {e}")
+            return False
+
+    def _enviar_parte_resumen(self, chat_id, recordatorios, entradas, siguientes, lote):
+        """
+        Envía un mensaje de resumen y acusa sus avisos. Si Telegram lo rechaza,
+        los avisos salen uno por uno en lugar de darse por notificados.
+        """
+        filas_aplazamiento = []
+        for numero, recordatorio in enumerate(recordatorios, start=1):
+            recordatorio_id = recordatorio["id"]
+            filas_aplazamiento.append([
+                {"texto": f"{numero}. ⏳ 5 min", "data": f"snooze:{recordatorio_id}:5:r"},
+                {"texto": f"{numero}. ⏳ 20 min", "data": f"snooze:{recordatorio_id}:20:r"},
+                {"texto": f"{numero}. 🕒", "data": f"snooze_custom:{recordatorio_id}:r"},
+            ])
+
+        with prioridad(PRIORIDAD_AVISOS):
+            ret = enviar_mensaje_con_grid(
+                chat_id,
+                _texto_resumen(entradas),
+                filas_aplazamiento,
+                formato="Markdown",
+            )
+        if not self._medir_envio(ret, recordatorios):
+            print(f"Resumen para {chat_id} rechazado; se envían sus {len(recordatorios)} avisos por separado")
+            return self._enviar_por_separado(recordatorios, lote)
+
+        for recordatorio in recordatorios:
+            if self.bitacora is not None:
+                self.bitacora.registrar_resultado(recordatorio, True)
+            self._registrar_envio(recordatorio, siguientes[recordatorio["id"]], lote)
+        print(f"Resumen de {len(recordatorios)} recordatorios enviado a {chat_id}")
+        return True
+
+    def _enviar_por_separado(self, recordatorios, lote):
+        """
+        Envía con ``_enviar_recordatorio`` avisos que el resumen ya anotó en la
+        bitácora; devuelve False si alguno falló.
+        """
+        enviados = True
+        for recordatorio in recordatorios:
+            if self.bitacora is not None:
+                # Un intento fallido puede repetirse: así no se toma por enviado.
+                self.bitacora.registrar_resultado(recordatorio, False)
+            enviados &= self._enviar_recordatorio(recordatorio, lote=lote) is not False
+        return enviados
+
+    def _medir_envio(self, ret, primeros_envios):
+        """
+        Cuenta el envío a Telegram y, si se confirmó, registra el retraso de
+        cada recordatorio respecto a su ``fecha_hora`` (solo primeros envíos:
+        los reenvíos de avisos constantes llegan tarde a propósito).
+        """
+        enviado = bool(getattr(ret, "ok", False))
+        metricas.ENVIOS_TELEGRAM.inc(resultado="ok" if enviado else "error")
+        if enviado:
+            ahora = self._reloj()
+            for recordatorio in primeros_envios:
+                vencimiento = marca_tiempo_utc(recordatorio.get("fecha_hora"))
+                if vencimiento is not None:
+                    metricas.RETRASO_ENTREGA.observar(max(0.0, ahora - vencimiento))
+        return enviado
+
+    def _preparar_aviso(self, recordatorio, zona_horaria):
+        """
+        Devuelve ``(fecha_hora_str, nueva_dt, omitidas)``: la fecha local para el
+        mensaje y, si es repetible, su siguiente ocurrencia futura.
+        """
+        repetir = bool(recordatorio.get("repetir", False))
+        repeticion_creada = bool(recordatorio.get("repeticion_creada", False))
+        simbolo = recordatorio.get("intervalo_repeticion", "")
+        num = int(recordatorio.get("intervalos", 0))
+
+        # Formatear fecha si existe
+        fecha_hora_str = ""
+        if recordatorio.get("fecha_hora"):
+            try:
+                recordatorio_fecha_hora_utc = recordatorio["fecha_hora"]
+                recordatorio_fecha_hora_local =  utilidades.convertir_fecha_utc_a_local(fecha_utc=datetime.fromisoformat(recordatorio_fecha_hora_utc), zona_horaria=zona_horaria)
+                # dt = datetime.fromisoformat(recordatorio_fecha_hora_local)
+                fecha_hora_str = f" (programado para {recordatorio_fecha_hora_local.strftime('%d/%m/%Y a las %H:%M')})"
+            except Exception as e:
+                print("Error al convertir fecha hora en local:", str(e))
+
+        # Siguiente ocurrencia: si el bot estuvo caído salta directo a la
+        # primera futura y las intermedias se resumen en este mismo aviso.
+        nueva_dt, omitidas = None, 0
+        if repetir and recordatorio.get("fecha_hora") and not repeticion_creada:
+            try:
+                nueva_dt, omitidas = siguiente_ocurrencia(
+                    datetime.fromisoformat(recordatorio["fecha_hora"]),
+                    simbolo,
+                    num,
+                    ahora=datetime.fromtimestamp(self._reloj(), tz=timezone.utc),
+                )
+            except Exception as e:
+                print(f"Error al calcular la siguiente repetición: {e}")
+        return fecha_hora_str, nueva_dt, omitidas
+
+    def _registrar_envio(self, recordatorio, nueva_dt, lote=None):
+        """
+        Marca el recordatorio como notificado y, si ``nueva_dt``, crea la
+        siguiente ocurrencia (en ``lote`` o al momento). Devuelve la creada o None.
+        """
+        siguiente = None
+        chat_id = recordatorio["chat_id"]
+        aviso_constante = bool(recordatorio.get("aviso_constante", False))
+        simbolo = recordatorio.get("intervalo_repeticion", "")
+        num = int(recordatorio.get("intervalos", 0))
+
+        # Marcar como notificado (en bloque si hay lote)
+        if lote is not None:
+            lote.notificado(recordatorio["id"])
+        else:
+            supabase_db.marcar_como_notificado(recordatorio["id"])
+
+        # Si debe repetirse, crear la siguiente ocurrencia futura
+        if nueva_dt:
+            try:
+                nuevo = {
+                    "chat_id":           chat_id,
+                    "usuario":           recordatorio["usuario"],
+                    "nombre_tarea":      recordatorio["nombre_tarea"],
+                    "descripcion":       recordatorio["descripcion"],
+                    "fecha_hora":        nueva_dt.isoformat(),
+                    "creado_en":         datetime.now().isoformat(),
+                    "es_formato_utc":    True,
+                    "repetir":           True,
+                    "intervalos":        num,
+                    "intervalo_repeticion": simbolo,
+                    "aviso_constante":   aviso_constante,
+                    "aviso_detenido":    False, # Resetear estado
+                    "notificado":        False  # Resetear estado
+                }
+                if lote is not None:
+                    # Se inserta y se marca el original al confirmar el lote
+                    lote.repeticion(recordatorio["id"], nuevo)
+                else:
+                    # GUARDAR NUEVO RECORDATORIO DIRECTAMENTE EN SUPABASE
+                    nuevo_id = supabase_db.guardar_recordatorio(nuevo)
+                    if nuevo_id:
+                        siguiente = dict(nuevo, id=nuevo_id, repeticion_creada=False)
+
+                    # Marcar el original como repetición creada
+                    supabase_db.marcar_como_repetido(recordatorio["id"])
+
+                print(f"Siguiente recordatorio programado para {nueva_dt.isoformat()}")
+            except Exception as e:
+                print(f"Error al crear siguiente recordatorio repetido: {e}")
+        return siguiente
+
     def verificar_actualizaciones(self):
         """Verifica y envía actualizaciones de bot a los chats correspondientes y realiza un ping al servidor monitor para mantenerlo vivo"""
         ping_otro_servidor()
@@ -293,10 +969,13 @@ class AdministradorRecordatorios:
                     print(f"Actualización enviada a {TEST_USER_ID}")
                     return
 
-            for chat_id in chats:                
-                enviar_telegram(chat_id, tipo="texto", mensaje=msg, formato="Markdown")
-                actualizar_id_ultima_actualizacion_para_chat(chat_id, ultima["id"])
-                print(f"Actualización enviada a {chat_id}")
+            # Difusión masiva: cede el paso a respuestas y recordatorios.
+            with prioridad(PRIORIDAD_MASIVA):
+                for chat_id in chats:
+                    if not chat_bloqueado(chat_id):
+                        enviar_telegram(chat_id, tipo="texto", mensaje=msg, formato="Markdown")
+                    actualizar_id_ultima_actualizacion_para_chat(chat_id, ultima["id"])
+                    print(f"Actualización enviada a {chat_id}")
 
         except Exception as e:
             print(f"Error al verificar actualizaciones: {e}")
@@ -328,11 +1007,12 @@ class AdministradorRecordatorios:
         
 
         if chats_pendientes:
-            for chat in chats_pendientes:
-                conversations.pedir_zona_horaria_y_actualizar_recordatorios(
-                    chat_id=chat["chat_id"], 
-                    nombre_usuario=chat.get("nombre") or ""
-                )
+            with prioridad(PRIORIDAD_MASIVA):
+                for chat in chats_pendientes:
+                    conversations.pedir_zona_horaria_y_actualizar_recordatorios(
+                        chat_id=chat["chat_id"], 
+                        nombre_usuario=chat.get("nombre") or ""
+                    )
             return False
         return True
 
@@ -370,11 +1050,72 @@ def aceptable_en_modo_tester(chat_id):
 
     return True    
 
-if __name__ == "__main__":
+def ejecutar_worker(detener=None, espera_reintento=30):
+    """
+    Proceso dedicado a las entregas: administrador de recordatorios y monitor
+    de criptoalertas, sin servidor web. Es el único dueño de los envíos cuando
+    la app corre con ``WEB_ONLY=true`` y varios workers de gunicorn.
+
+    Bloquea hasta SIGINT/SIGTERM (o hasta que se active ``detener``).
+    """
+    import signal
+    from crypto_alerts import (
+        iniciar_monitor_criptoalertas,
+        detener_monitor_criptoalertas,
+    )
+
+    detener = detener or threading.Event()
+    calentar_conexiones()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, lambda s, f: detener.set())
+        signal.signal(signal.SIGTERM, lambda s, f: detener.set())
+
+    # A diferencia de la app web no hay modo mantenimiento: se espera a Supabase.
+    while not supabase_db.inicializar_supabase():
+        print(f"Supabase no disponible; reintentando en {espera_reintento} s...")
+        if detener.wait(espera_reintento):
+            return
+
+    if not REMINDER_NOTIFY_DSN:
+        print(
+            "[WARN] Worker sin REMINDER_NOTIFY_DSN: los aplazamientos hechos desde "
+            "la app web se verán en la siguiente relectura de la ventana."
+        )
+    servidor_metricas = (
+        metricas.servir(metricas.REMINDER_METRICS_PORT)
+        if metricas.REMINDER_METRICS_PORT else None
+    )
     iniciar_administrador()
-    # Mantener el hilo vivo
+    iniciar_monitor_criptoalertas()
+    print("Worker de recordatorios en ejecución")
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
+        detener.wait()
+    finally:
+        detener_monitor_criptoalertas()
         detener_administrador()
+        if servidor_metricas:
+            servidor_metricas.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+    # `python -m reminders` carga este archivo como __main__; se usa el módulo
+    # importado para compartir la misma instancia que conversations y routes.
+    import reminders as modulo
+
+    parser = argparse.ArgumentParser(description="Administrador de recordatorios")
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Proceso de entregas y criptoalertas separado de la app web",
+    )
+    if parser.parse_args().worker:
+        modulo.ejecutar_worker()
+    else:
+        modulo.iniciar_administrador()
+        # Mantener el hilo vivo
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            modulo.detener_administrador()
@@ -0,0 +1,334 @@
+"""
+restaurar_db.py — Restauración: Docker Postgres de backup → Supabase.
+
+Lee cada tabla del backup con un cursor del lado del servidor (nunca la carga
+completa en memoria) y la sube a Supabase en lotes de UPSERT por su clave, con
+varios lotes en vuelo a la vez. Los IDs se conservan, así que repetir o
+reanudar la restauración no duplica filas. El avance de cada tabla se guarda en
+un archivo de puntos de control: si el proceso se interrumpe, la siguiente
+ejecución sigue desde la última clave confirmada.
+
+    python restaurar_db.py
+    python restaurar_db.py --tablas recordatorios --trabajadores 16
+
+Usa SUPABASE_KEY_SERVICE_ROLE (RLS bloquea la clave anónima) y las variables
+BACKUP_PG_* del backup, o ``--dsn``.
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import metricas
+from backup_db import CLAVES_TABLAS, TABLAS_A_RESPALDAR, _get_pg_connection
+
+logger = logging.getLogger("restaurar_db")
+
+# Filas por UPSERT; PostgREST acepta cuerpos grandes, pero mil mantiene cada
+# petición por debajo de un segundo.
+RESTORE_BATCH_SIZE = int(os.getenv("RESTORE_BATCH_SIZE", "1000"))
+# Lotes subiéndose a la vez (cada hilo con su cliente de Supabase).
+RESTORE_WORKERS = max(1, int(os.getenv("RESTORE_WORKERS", "8")))
+RESTORE_CHECKPOINT_PATH = os.getenv("RESTORE_CHECKPOINT_PATH", "restauracion.json")
+RESTORE_RETRIES = 3
+# Código de Postgres (vía PostgREST) para una columna que no existe.
+COLUMNA_INEXISTENTE = "42703"
+
+
+def _crear_cliente_supabase():
+    from supabase import create_client
+
+    url = os.getenv("SUPABASE_URL")
+    clave = os.getenv("SUPABASE_KEY_SERVICE_ROLE") or os.getenv("SUPABASE_KEY")
+    if not url or not clave:
+        raise RuntimeError("Faltan SUPABASE_URL o SUPABASE_KEY_SERVICE_ROLE")
+    return metricas.instrumentar_supabase(create_client(url, clave))
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+class PuntosControl:
+    """
+    Avance de la restauración por tabla, en un JSON que se reescribe de forma
+    atómica: ``{tabla: {"ultima_clave", "filas", "completa"}}``.
+    """
+
+    def __init__(self, ruta=RESTORE_CHECKPOINT_PATH):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._datos = {}
+        if ruta and os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                self._datos = json.load(f)
+
+    def tabla(self, tabla):
+        with self._lock:
+            return dict(self._datos.get(tabla, {}))
+
+    def avanzar(self, tabla, ultima_clave, filas, completa=False):
+        with self._lock:
+            self._datos[tabla] = {
+                "ultima_clave": ultima_clave,
+                "filas": filas,
+                "completa": completa,
+            }
+            if not self.ruta:
+                return
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._datos, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.ruta)
+
+    def borrar(self):
+        with self._lock:
+            self._datos = {}
+            if self.ruta and os.path.exists(self.ruta):
+                os.remove(self.ruta)
+
+
+class _AvanceContiguo:
+    """
+    Los lotes terminan en desorden; el punto de control solo avanza hasta el
+    último lote cuyos anteriores también terminaron.
+    """
+
+    def __init__(self, ultima_clave, filas):
+        self.ultima_clave = ultima_clave
+        self.filas = filas
+        self._siguiente = 0
+        self._terminados = {}
+
+    def terminar(self, numero, ultima_clave, filas):
+        """Registra el lote ``numero``; devuelve True si el avance se movió."""
+        self._terminados[numero] = (ultima_clave, filas)
+        movido = False
+        while self._siguiente in self._terminados:
+            ultima, n = self._terminados.pop(self._siguiente)
+            self.ultima_clave = ultima
+            self.filas += n
+            self._siguiente += 1
+            movido = True
+        return movido
+
+
+def _columnas_backup(conn, tabla):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = %s AND table_schema = 'public'
+            ORDER BY ordinal_position
+        """, (tabla,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _columnas_destino(cliente, tabla, columnas):
+    """
+    Las de ``columnas`` que existen en la tabla de Supabase. Prueba primero
+    todas en una sola lectura y, si alguna falta, una por una.
+    """
+    def existen(nombres):
+        try:
+            cliente.table(tabla).select(",".join(nombres)).limit(1).execute()
+            return True
+        except Exception as e:
+            if getattr(e, "code", None) == COLUMNA_INEXISTENTE:
+                return False
+            raise
+
+    if existen(columnas):
+        return list(columnas)
+    return [c for c in columnas if existen([c])]
+
+
+def _subir_lote(clientes, crear_cliente, tabla, clave, lote):
+    cliente = getattr(clientes, "cliente", None)
+    if cliente is None:
+        cliente = clientes.cliente = crear_cliente()
+    for intento in range(RESTORE_RETRIES):
+        try:
+            cliente.table(tabla).upsert(
+                lote, on_conflict=clave, returning="minimal"
+            ).execute()
+            return
+        except Exception as e:
+            if intento == RESTORE_RETRIES - 1:
+                raise
+            espera = 2 ** intento
+            logger.warning(f"Restaurar [{tabla}]: Lote falló ({e}). Reintentando en {espera}s...")
+            time.sleep(espera)
+
+
+def restaurar_tabla(conn, tabla, puntos, trabajadores=None, lote_tamano=None,
+                    crear_cliente=_crear_cliente_supabase):
+    """
+    Sube una tabla del backup a Supabase desde su último punto de control.
+    Devuelve las filas restauradas en total; lanza la excepción del primer
+    lote que agote sus reintentos, con el avance ya guardado.
+    """
+    clave = CLAVES_TABLAS[tabla]
+    lote_tamano = lote_tamano or RESTORE_BATCH_SIZE
+    trabajadores = trabajadores or RESTORE_WORKERS
+    estado = puntos.tabla(tabla)
+    if estado.get("completa"):
+        logger.info(f"Restaurar [{tabla}]: Ya restaurada ({estado.get('filas', 0)} filas)")
+        return estado.get("filas", 0)
+
+    # El backup puede tener columnas que Supabase aún no (p. ej.
+    # ``actualizado_en`` si no se ejecutó setup_supabase.py): solo se suben
+    # las que existen en ambos lados.
+    columnas_backup = _columnas_backup(conn, tabla)
+    columnas = _columnas_destino(crear_cliente(), tabla, columnas_backup)
+    if clave not in columnas:
+        raise RuntimeError(
+            f"Restaurar [{tabla}]: Supabase no tiene la columna clave {clave}; "
+            "ejecuta setup_supabase.py antes de restaurar"
+        )
+    omitidas = [c for c in columnas_backup if c not in columnas]
+    if omitidas:
+        logger.warning(
+            f"Restaurar [{tabla}]: Supabase no tiene {', '.join(omitidas)}; se omiten "
+            "(setup_supabase.py las crea)"
+        )
+    cols = ", ".join(f'"{c}"' for c in columnas)
+    avance = _AvanceContiguo(estado.get("ultima_clave"), estado.get("filas", 0))
+    lock = threading.Lock()
+    en_vuelo = threading.BoundedSemaphore(trabajadores * 2)
+    errores = []
+    clientes = threading.local()
+
+    def al_terminar(numero, ultima_clave, filas, futuro):
+        en_vuelo.release()
+        if futuro.exception() is not None:
+            with lock:
+                errores.append(futuro.exception())
+            return
+        with lock:
+            if avance.terminar(numero, ultima_clave, filas):
+                puntos.avanzar(tabla, avance.ultima_clave, avance.filas)
+
+    # Cursor con nombre: Postgres entrega las filas por bloques de ``itersize``.
+    cursor = conn.cursor(name=f"restaurar_{tabla}")
+    cursor.itersize = lote_tamano
+    if avance.ultima_clave is None:
+        cursor.execute(f'SELECT {cols} FROM {tabla} ORDER BY "{clave}"')
+    else:
+        cursor.execute(
+            f'SELECT {cols} FROM {tabla} WHERE "{clave}" > %s ORDER BY "{clave}"',
+            (avance.ultima_clave,),
+        )
+    logger.info(f"Restaurar [{tabla}]: Desde clave {avance.ultima_clave!r}")
+
+    executor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="restore")
+    numero = 0
+    try:
+        while not errores:
+            filas = cursor.fetchmany(lote_tamano)
+            if not filas:
+                break
+            lote = [
+                {c: _valor_json(v) for c, v in zip(columnas, fila)} for fila in filas
+            ]
+            en_vuelo.acquire()
+            futuro = executor.submit(_subir_lote, clientes, crear_cliente, tabla, clave, lote)
+            futuro.add_done_callback(
+                lambda f, n=numero, u=lote[-1][clave], k=len(lote): al_terminar(n, u, k, f)
+            )
+            numero += 1
+    finally:
+        executor.shutdown(wait=True)
+        cursor.close()
+        conn.rollback()
+
+    if errores:
+        logger.error(
+            f"Restaurar [{tabla}]: Detenida en clave {avance.ultima_clave!r} "
+            f"tras {avance.filas} filas: {errores[0]}"
+        )
+        raise errores[0]
+    puntos.avanzar(tabla, avance.ultima_clave, avance.filas, completa=True)
+    logger.info(f"Restaurar [{tabla}]: {avance.filas} filas restauradas")
+    return avance.filas
+
+
+def ajustar_secuencias(cliente, tablas):
+    """
+    Los IDs restaurados no mueven las secuencias de Supabase: se adelantan al
+    máximo de cada tabla para que las altas nuevas no choquen.
+    """
+    for tabla in tablas:
+        if CLAVES_TABLAS[tabla] != "id":
+            continue
+        sql = (
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+            f"GREATEST((SELECT MAX(id) FROM {tabla}), 1))"
+        )
+        try:
+            cliente.rpc("exec_sql", {"sql": sql}).execute()
+        except Exception as e:
+            logger.warning(f"Restaurar [{tabla}]: Ajusta la secuencia a mano ({e}): {sql}")
+
+
+def ejecutar_restauracion(conn, tablas=None, puntos=None, trabajadores=None,
+                          lote_tamano=None, crear_cliente=_crear_cliente_supabase):
+    """Restaura ``tablas`` (todas por defecto) en el orden del backup."""
+    tablas = [t for t in TABLAS_A_RESPALDAR if tablas is None or t in tablas]
+    puntos = puntos or PuntosControl()
+    inicio = time.monotonic()
+    total = 0
+    for tabla in tablas:
+        total += restaurar_tabla(
+            conn, tabla, puntos, trabajadores, lote_tamano, crear_cliente
+        )
+    ajustar_secuencias(crear_cliente(), tablas)
+    logger.info(
+        f"=== Restauración completada: {total} filas en "
+        f"{time.monotonic() - inicio:.1f}s ==="
+    )
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--tablas", nargs="+", choices=TABLAS_A_RESPALDAR)
+    parser.add_argument("--trabajadores", type=int, default=RESTORE_WORKERS)
+    parser.add_argument("--lote", type=int, default=RESTORE_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=RESTORE_CHECKPOINT_PATH)
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="Descarta los puntos de control y empieza de cero.")
+    parser.add_argument("--dsn", default="", help="DSN del Postgres de backup.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.dsn:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+    else:
+        conn = _get_pg_connection()
+    if not conn:
+        raise SystemExit("Sin conexión al Postgres de backup")
+
+    puntos = PuntosControl(args.checkpoint)
+    if args.reiniciar:
+        puntos.borrar()
+    try:
+        ejecutar_restauracion(conn, args.tablas, puntos, args.trabajadores, args.lote)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
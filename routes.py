@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 
 import json, os
-from flask import Blueprint, request
+from flask import Blueprint, Response, request
 import threading
 from collections import defaultdict
 from supabase_db import leer_modo_tester
 from services import enviar_telegram, responder_callback_query
 from conversations import procesar_mensaje, procesar_callback, mostrar_ayuda
 from reminders import ping_otro_servidor
+import metricas
 
 routes = Blueprint('routes', __name__)
 TEST_USER_ID = os.environ.get("TELEGRAM_TEST_USER_ID")
@@ -23,6 +24,17 @@ def monitor_activo():
     ping_otro_servidor()
     return "ok", 200
 
+@routes.route("/metrics", methods=["GET"])
+def metricas_prometheus():
+    # Solo las del proceso que atiende la petición; con WEB_ONLY el scheduler
+    # vive en el worker (REMINDER_METRICS_PORT). La app es pública por el
+    # webhook: sin REMINDER_METRICS_TOKEN el endpoint no existe.
+    if not metricas.REMINDER_METRICS_TOKEN:
+        return "Not Found", 404
+    if not metricas.autorizado(request.headers.get("Authorization")):
+        return "Unauthorized", 401
+    return Response(metricas.exponer(), content_type=metricas.TIPO_CONTENIDO)
+
 @routes.route("/webhook", methods=["POST"])
 def telegram_webhook():
     data = request.get_json()
@@ -1,33 +1,757 @@
 import os
+import asyncio
+import contextvars
 import requests, json
 from dotenv import load_dotenv
 import re
+import threading
+import time
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
 from html import escape
+from requests.adapters import HTTPAdapter
 import traceback
 
+import metricas
+from archivos_telegram import CacheArchivosTelegram, TELEGRAM_FILE_CACHE_PATH
+
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 BASE_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
 
+# Conexiones keep-alive reutilizables hacia api.telegram.org.
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "16"))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "15"))
+# Los documentos e imágenes suben el archivo completo.
+TELEGRAM_UPLOAD_TIMEOUT = 60
+# Largo máximo de un mensaje, en unidades UTF-16 (``longitud_telegram``).
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+# Conexiones que se abren al arrancar para que el primer envío no pague TLS.
+TELEGRAM_WARMUP_CONNECTIONS = int(os.getenv("TELEGRAM_WARMUP_CONNECTIONS", "2"))
+
+# Límites de envío de Telegram: ~30 mensajes/s en total y ~1/s por chat.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = 3
+# Reintentos de un fallo transitorio (5xx, 429, red): un 429 espera su
+# ``retry_after``; el resto, 0.5 s, 1 s, 2 s...
+TELEGRAM_MAX_RETRIES = 3
+TELEGRAM_RETRY_BASE_SECONDS = 0.5
+# Tiempo que el scheduler deja de escribir a un chat que bloqueó al bot.
+TELEGRAM_BLOCKED_TTL_SECONDS = int(os.getenv("TELEGRAM_BLOCKED_TTL_SECONDS", "86400"))
+# Cliente asíncrono: un solo event loop de fondo con hasta este número de
+# conexiones; TELEGRAM_ASYNC=true lo usa también para las funciones síncronas.
+TELEGRAM_ASYNC = os.getenv("TELEGRAM_ASYNC", "false").lower() == "true"
+TELEGRAM_ASYNC_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_ASYNC_MAX_CONNECTIONS", "100"))
+# Mensajes cuyo último contenido mostrado se recuerda para omitir ediciones
+# que lo dejarían igual. La caché es local: con otro proceso editando los
+# mismos mensajes (WEB_ONLY con su worker aparte, varios workers de gunicorn o
+# de recordatorios) quedaría vieja, así que solo se usa con un único proceso.
+def varios_procesos_editan(entorno=os.environ):
+    return (
+        entorno.get("WEB_ONLY", "false").lower() in ("true", "y", "1")
+        or entorno.get("WEB_WORKERS", "1").strip() not in ("", "1")
+        or bool(entorno.get("REMINDER_LEASE_DSN"))
+    )
+
+
+TELEGRAM_EDIT_CACHE_SIZE = (
+    0 if varios_procesos_editan()
+    else int(os.getenv("TELEGRAM_EDIT_CACHE_SIZE", "5000"))
+)
+# No son mensajes: no cuentan contra los límites ni esperan turno.
+METODOS_SIN_LIMITE = {"answerCallbackQuery", "getMe"}
+# Repetirlos tras un timeout de lectura no puede duplicar un mensaje.
+METODOS_IDEMPOTENTES = {
+    "editMessageText", "editMessageReplyMarkup", "deleteMessage",
+    "answerCallbackQuery", "getMe",
+}
+
+# Clases de respuesta de ``clasificar_respuesta``.
+RESPUESTA_OK = "ok"
+FALLO_TRANSITORIO = "transitorio"  # 5xx o 429: se reintenta
+FALLO_FORMATO = "formato"          # parse_mode con entidades inválidas
+FALLO_CHAT = "chat"                # el chat ya no acepta mensajes del bot
+FALLO_PERMANENTE = "permanente"    # cualquier otro 4xx: repetir no sirve
+
+_ERRORES_FORMATO = ("can't parse entities", "unsupported parse_mode")
+_ERRORES_CHAT = (
+    "bot was blocked by the user", "user is deactivated", "bot was kicked",
+    "chat not found", "bot can't initiate conversation",
+)
+
+# Carriles del limitador, de mayor a menor prioridad.
+PRIORIDAD_INTERACTIVA = 0  # Respuestas a mensajes y botones
+PRIORIDAD_AVISOS = 1       # Recordatorios y criptoalertas
+PRIORIDAD_MASIVA = 2       # Notas de actualización y difusiones
+
+# Cada hilo, y cada tarea del loop asíncrono, tiene su propio valor.
+_carril = contextvars.ContextVar("carril_telegram", default=PRIORIDAD_INTERACTIVA)
+
+
+@contextmanager
+def prioridad(carril):
+    """Los envíos hechos en este hilo dentro del bloque usan ``carril``."""
+    token = _carril.set(carril)
+    try:
+        yield
+    finally:
+        _carril.reset(token)
+
+
+def prioridad_actual():
+    return _carril.get()
+
+
+class LimitadorTelegram:
+    """
+    Cubetas de fichas global y por chat, con carriles de prioridad.
+
+    Cada envío toma una ficha global (``por_segundo``) y una de su chat
+    (``por_chat`` por segundo, con ráfagas de ``rafaga_chat``). Mientras un
+    carril más prioritario espere una ficha global, los de menor prioridad no
+    la toman: las respuestas interactivas salen antes que los recordatorios y
+    alertas, y estos antes que las difusiones masivas. ``pausar`` aplica el
+    ``retry_after`` de un 429.
+    """
+
+    CARRILES = 3
+    MAX_CHATS = 10000
+
+    def __init__(self, por_segundo=TELEGRAM_GLOBAL_RATE, por_chat=TELEGRAM_CHAT_RATE,
+                 rafaga_chat=TELEGRAM_CHAT_BURST, reloj=time.monotonic):
+        self.por_segundo = float(por_segundo)
+        self.por_chat = float(por_chat)
+        self.rafaga_chat = float(rafaga_chat)
+        self._reloj = reloj
+        self._cond = threading.Condition()
+        self._fichas = self.por_segundo
+        self._actualizado = reloj()
+        self._chats = {}
+        self._pausa_hasta = 0.0
+        self._pausa_chats = {}
+        self._esperando = [0] * self.CARRILES
+
+    def _recargar(self, ahora):
+        transcurrido = ahora - self._actualizado
+        self._fichas = min(self.por_segundo, self._fichas + transcurrido * self.por_segundo)
+        self._actualizado = ahora
+
+    def _cubeta_chat(self, chat_id, ahora):
+        cubeta = self._chats.get(chat_id)
+        if cubeta is None:
+            if len(self._chats) >= self.MAX_CHATS:
+                self._podar(ahora)
+            cubeta = self._chats[chat_id] = [self.rafaga_chat, ahora]
+        cubeta[0] = min(self.rafaga_chat, cubeta[0] + (ahora - cubeta[1]) * self.por_chat)
+        cubeta[1] = ahora
+        return cubeta
+
+    def _podar(self, ahora):
+        # Una cubeta que ya se habría llenado equivale a no tenerla.
+        for chat_id, (fichas, desde) in list(self._chats.items()):
+            if fichas + (ahora - desde) * self.por_chat >= self.rafaga_chat:
+                del self._chats[chat_id]
+        for chat_id, hasta in list(self._pausa_chats.items()):
+            if hasta <= ahora:
+                del self._pausa_chats[chat_id]
+
+    def _tomar(self, chat_id, carril):
+        """
+        Con el lock tomado, intenta llevarse las fichas del envío. Devuelve
+        ``(espera, en_cola)``: 0 si las tomó; si no, los segundos a esperar y
+        si la espera es por la cubeta global (la única que ordena carriles).
+        """
+        ahora = self._reloj()
+        self._recargar(ahora)
+        espera = max(self._pausa_hasta, self._pausa_chats.get(chat_id, 0)) - ahora
+        cubeta = None
+        if espera <= 0 and chat_id is not None:
+            cubeta = self._cubeta_chat(chat_id, ahora)
+            if cubeta[0] < 1:
+                espera = (1 - cubeta[0]) / self.por_chat
+        if espera > 0:
+            # Bloqueado por su chat o por un 429: no frena a otros carriles.
+            return espera, False
+        if self._fichas >= 1 and not any(self._esperando[:carril]):
+            self._fichas -= 1
+            if cubeta is not None:
+                cubeta[0] -= 1
+            return 0, False
+        return max(1 - self._fichas, 1) / self.por_segundo, True
+
+    def _encolar(self, carril, en_cola, nuevo):
+        if nuevo != en_cola:
+            self._esperando[carril] += 1 if nuevo else -1
+        return nuevo
+
+    def adquirir(self, chat_id=None, carril=PRIORIDAD_INTERACTIVA):
+        """Bloquea hasta que el envío puede salir; devuelve los segundos de espera."""
+        carril = min(max(int(carril), 0), self.CARRILES - 1)
+        inicio = self._reloj()
+        en_cola = False
+        with self._cond:
+            try:
+                while True:
+                    espera, global_ = self._tomar(chat_id, carril)
+                    if not espera:
+                        return self._reloj() - inicio
+                    en_cola = self._encolar(carril, en_cola, global_)
+                    self._cond.wait(espera)
+            finally:
+                self._encolar(carril, en_cola, False)
+                self._cond.notify_all()
+
+    async def adquirir_async(self, chat_id=None, carril=PRIORIDAD_INTERACTIVA):
+        """Como ``adquirir``, pero cede el event loop mientras espera."""
+        carril = min(max(int(carril), 0), self.CARRILES - 1)
+        en_cola = False
+        try:
+            while True:
+                with self._cond:
+                    espera, global_ = self._tomar(chat_id, carril)
+                    en_cola = self._encolar(carril, en_cola, bool(espera) and global_)
+                if not espera:
+                    return
+                await asyncio.sleep(espera)
+        finally:
+            with self._cond:
+                self._encolar(carril, en_cola, False)
+                self._cond.notify_all()
+
+    def pausar(self, segundos, chat_id=None):
+        """Detiene los envíos a ``chat_id`` (o todos) y vacía la cubeta global."""
+        with self._cond:
+            hasta = self._reloj() + max(0.0, float(segundos))
+            if chat_id is None:
+                self._pausa_hasta = max(self._pausa_hasta, hasta)
+            else:
+                self._pausa_chats[chat_id] = max(self._pausa_chats.get(chat_id, 0), hasta)
+            self._fichas = min(self._fichas, 0.0)
+            self._cond.notify_all()
+
+
+def _chat_de_peticion(kwargs):
+    cuerpo = kwargs.get("json") or kwargs.get("data") or {}
+    chat_id = cuerpo.get("chat_id")
+    return None if chat_id is None else str(chat_id)
+
+
+def clasificar_respuesta(ret):
+    """Clase de una respuesta de la API (``RESPUESTA_OK``, ``FALLO_*``)."""
+    if ret.status_code == 200:
+        return RESPUESTA_OK
+    if ret.status_code == 429 or ret.status_code >= 500:
+        return FALLO_TRANSITORIO
+    descripcion = _descripcion(ret)
+    if any(error in descripcion for error in _ERRORES_FORMATO):
+        return FALLO_FORMATO
+    if ret.status_code == 403 or any(error in descripcion for error in _ERRORES_CHAT):
+        return FALLO_CHAT
+    return FALLO_PERMANENTE
+
+
+# chat_id -> instante (monotónico) en que Telegram lo reportó inaccesible.
+_chats_bloqueados = {}
+_lock_bloqueados = threading.Lock()
+
+
+def marcar_chat_bloqueado(chat_id):
+    if chat_id is None:
+        return
+    with _lock_bloqueados:
+        nuevo = str(chat_id) not in _chats_bloqueados
+        _chats_bloqueados[str(chat_id)] = time.monotonic()
+    if nuevo:
+        print(f"[WARN] Chat {chat_id} bloqueó al bot o ya no existe; se pausan sus envíos")
+
+
+def desbloquear_chat(chat_id):
+    with _lock_bloqueados:
+        _chats_bloqueados.pop(str(chat_id), None)
+
+
+def chat_bloqueado(chat_id):
+    """
+    True si Telegram reportó el chat como inaccesible en las últimas
+    ``TELEGRAM_BLOCKED_TTL_SECONDS``. Pasado ese tiempo se vuelve a intentar,
+    y cualquier envío correcto al chat lo desbloquea.
+    """
+    with _lock_bloqueados:
+        desde = _chats_bloqueados.get(str(chat_id))
+        if desde is None:
+            return False
+        if time.monotonic() - desde < TELEGRAM_BLOCKED_TTL_SECONDS:
+            return True
+        del _chats_bloqueados[str(chat_id)]
+        return False
+
+
+def _huella(valor):
+    contenido = json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=16).digest()
+
+
+class CacheEdiciones:
+    """
+    LRU acotada de ``(chat_id, message_id)`` a las huellas del último texto y
+    teclado mostrados por el bot en ese mensaje.
+
+    Telegram responde 400 "message is not modified" a una edición idéntica;
+    con esta caché se omite sin salir a la red. Se guarda el contenido pedido
+    por quien llama (no el reenviado sin ``parse_mode``), así que repetir una
+    edición que tuvo que degradarse también se omite. Solo se recuerda lo que
+    Telegram confirmó; una edición fallida borra la entrada del mensaje.
+    """
+
+    def __init__(self, capacidad=TELEGRAM_EDIT_CACHE_SIZE):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._mensajes = OrderedDict()
+
+    @staticmethod
+    def _clave(payload, message_id=None):
+        message_id = message_id or payload.get("message_id")
+        if payload.get("chat_id") is None or message_id is None:
+            return None
+        return str(payload["chat_id"]), str(message_id)
+
+    @staticmethod
+    def _contenido(metodo, payload):
+        """``(texto, teclado)``; el texto es None si el método solo toca el teclado."""
+        teclado = _huella(payload.get("reply_markup"))
+        if metodo == "editMessageReplyMarkup":
+            return None, teclado
+        texto = {
+            k: v for k, v in payload.items()
+            if k not in ("chat_id", "message_id", "reply_markup")
+        }
+        return _huella(texto), teclado
+
+    def sin_cambios(self, metodo, payload):
+        clave = self._clave(payload)
+        if clave is None or self.capacidad <= 0:
+            return False
+        texto, teclado = self._contenido(metodo, payload)
+        with self._lock:
+            actual = self._mensajes.get(clave)
+            if actual is None:
+                return False
+            self._mensajes.move_to_end(clave)
+            return texto in (None, actual[0]) and teclado == actual[1]
+
+    def recordar(self, metodo, payload, message_id=None):
+        clave = self._clave(payload, message_id)
+        if clave is None or self.capacidad <= 0:
+            return
+        texto, teclado = self._contenido(metodo, payload)
+        with self._lock:
+            if texto is None:
+                texto = self._mensajes.get(clave, (None, None))[0]
+            self._mensajes[clave] = (texto, teclado)
+            self._mensajes.move_to_end(clave)
+            while len(self._mensajes) > self.capacidad:
+                self._mensajes.popitem(last=False)
+
+    def olvidar(self, chat_id, message_id):
+        with self._lock:
+            self._mensajes.pop((str(chat_id), str(message_id)), None)
+
+
+cache_ediciones = CacheEdiciones()
+
+
+def _edicion_omitida(metodo, payload):
+    """True si la edición dejaría el mensaje igual; cuenta la proporción omitida."""
+    omitida = cache_ediciones.sin_cambios(metodo, payload)
+    metricas.EDICIONES_TELEGRAM.inc(resultado="omitida" if omitida else "enviada")
+    metricas.PROPORCION_EDICIONES_OMITIDAS.fijar(
+        metricas.EDICIONES_TELEGRAM.valor(resultado="omitida")
+        / metricas.EDICIONES_TELEGRAM.total()
+    )
+    return omitida
+
+
+def _respuesta(status_code, contenido, reason="OK", headers=None, url=None):
+    """``requests.Response`` armada a mano: el tipo que esperan los llamadores."""
+    ret = requests.Response()
+    ret.status_code = status_code
+    ret.reason = reason
+    ret.headers.update(headers or {"Content-Type": "application/json"})
+    ret.url = url
+    ret._content = contenido
+    return ret
+
+
+def _respuesta_sin_cambios(payload):
+    """Respuesta 200 local con la forma de la de Telegram, para quien la lea."""
+    return _respuesta(200, json.dumps({
+        "ok": True,
+        "result": {
+            "message_id": payload["message_id"],
+            "chat": {"id": payload["chat_id"]},
+            "text": payload.get("text"),
+        },
+    }).encode("utf-8"))
+
+
+def _recordar_contenido(metodo, payload, ret):
+    """Guarda lo que quedó a la vista tras un envío o una edición."""
+    if ret.status_code == 200:
+        message_id = None
+        if metodo == "sendMessage":
+            try:
+                message_id = ret.json()["result"]["message_id"]
+            except (ValueError, KeyError, TypeError):
+                return
+        cache_ediciones.recordar(metodo, payload, message_id)
+    elif metodo != "sendMessage" and "not modified" in str(_descripcion(ret)):
+        # Telegram confirma que el mensaje ya muestra este contenido.
+        cache_ediciones.recordar(metodo, payload)
+    elif metodo != "sendMessage":
+        _olvidar_edicion(payload)
+
+
+def _olvidar_edicion(payload):
+    """Tras una edición fallida no se sabe qué muestra el mensaje."""
+    if payload.get("message_id") is not None:
+        cache_ediciones.olvidar(payload.get("chat_id"), payload["message_id"])
+
+
+def _descripcion(ret):
+    try:
+        return str(ret.json().get("description", "")).lower()
+    except (ValueError, AttributeError):
+        return ""
+
+
+def _tras_respuesta(ret, chat_id):
+    """Clasifica ``ret`` y marca o desmarca su chat como bloqueado."""
+    clase = clasificar_respuesta(ret)
+    if clase == FALLO_CHAT:
+        marcar_chat_bloqueado(chat_id)
+    elif clase == RESPUESTA_OK and chat_id is not None:
+        desbloquear_chat(chat_id)
+    return clase
+
+
+def _retry_after(respuesta, por_defecto=1.0):
+    try:
+        return float(respuesta.json().get("parameters", {}).get("retry_after", por_defecto))
+    except (ValueError, AttributeError):
+        return por_defecto
+
+
+class ClienteTelegram:
+    """
+    Sesión HTTP compartida con la API de Telegram.
+
+    Monta un ``HTTPAdapter`` con un pool de hasta ``tamano_pool`` conexiones
+    keep-alive: cada hilo toma una conexión libre (urllib3 protege el pool con
+    un lock) en lugar de hacer TCP + TLS en cada llamada. Si todas están
+    ocupadas se abre una extra que se cierra al terminar. Toda llamada lleva
+    timeout de conexión y de lectura.
+
+    Los mensajes pasan antes por ``limitador`` con el carril del hilo
+    (``prioridad``). Solo los fallos transitorios se repiten, hasta
+    ``TELEGRAM_MAX_RETRIES`` veces: un 429 pausa ese chat ``retry_after``
+    segundos, un 5xx o un error de red espera con retroceso exponencial. Un
+    timeout de lectura solo se repite en métodos idempotentes, porque el
+    mensaje pudo haber llegado. Los chats que bloquearon al bot quedan
+    marcados (``chat_bloqueado``).
+    """
+
+    def __init__(self, base_url=BASE_URL, tamano_pool=TELEGRAM_POOL_SIZE,
+                 timeout=(TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_READ_TIMEOUT),
+                 limitador=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limitador = limitador or LimitadorTelegram()
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamano_pool)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+
+    def post(self, metodo, timeout=None, carril=None, **kwargs):
+        """POST a ``/<metodo>`` de la API; ``kwargs`` van a ``requests`` (json, data, files)."""
+        url = f"{self.base_url}/{metodo}"
+        limitado = metodo not in METODOS_SIN_LIMITE
+        chat_id = _chat_de_peticion(kwargs)
+        carril = prioridad_actual() if carril is None else carril
+        for intento in range(TELEGRAM_MAX_RETRIES + 1):
+            ultimo = intento == TELEGRAM_MAX_RETRIES
+            espera = TELEGRAM_RETRY_BASE_SECONDS * 2 ** intento
+            if limitado:
+                self.limitador.adquirir(chat_id, carril)
+            metricas.PETICIONES_TELEGRAM.inc(metodo=metodo)
+            try:
+                ret = self.sesion.post(url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                entregado_quizas = (
+                    isinstance(e, requests.ReadTimeout) and metodo not in METODOS_IDEMPOTENTES
+                )
+                if ultimo or entregado_quizas:
+                    raise
+                print(f"[WARN] Telegram {metodo}: {e}; reintento en {espera:.1f}s")
+                time.sleep(espera)
+            else:
+                clase = _tras_respuesta(ret, chat_id)
+                if clase != FALLO_TRANSITORIO or ultimo:
+                    return ret
+                if ret.status_code == 429:
+                    espera = _retry_after(ret)
+                    print(f"[WARN] Telegram 429 en {metodo} para {chat_id}; reintento en {espera:.0f}s")
+                    if limitado:
+                        self.limitador.pausar(espera, chat_id)
+                    else:
+                        time.sleep(espera)
+                else:
+                    print(f"[WARN] Telegram {ret.status_code} en {metodo}; reintento en {espera:.1f}s")
+                    time.sleep(espera)
+            for archivo in (kwargs.get("files") or {}).values():
+                archivo.seek(0)
+        return ret
+
+    def calentar(self, conexiones=TELEGRAM_WARMUP_CONNECTIONS):
+        """Abre ``conexiones`` en paralelo con ``getMe`` y las deja en el pool."""
+        def abrir():
+            try:
+                self.post("getMe")
+            except requests.RequestException as e:
+                print(f"[WARN] No se pudo precalentar la conexión con Telegram: {e}")
+
+        hilos = [threading.Thread(target=abrir, daemon=True) for _ in range(conexiones)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join(self.timeout[0] + self.timeout[1])
+
+    def cerrar(self):
+        self.sesion.close()
+
+
+class ClienteTelegramAsync:
+    """
+    Cliente de Telegram sobre ``httpx.AsyncClient`` en un único event loop de
+    fondo (hilo ``telegram-async``): cientos de llamadas pueden estar en
+    vuelo a la vez sin un hilo por llamada. Comparte con ``ClienteTelegram``
+    el limitador, la clasificación de respuestas y la política de reintentos,
+    y devuelve ``requests.Response`` para que los llamadores no cambien.
+
+    Desde corrutinas: ``await cliente.post_async(...)``. Desde código
+    síncrono, ``programar(corrutina)`` devuelve un
+    ``concurrent.futures.Future`` sin esperar, y ``post`` (misma firma que
+    ``ClienteTelegram.post``) bloquea hasta la respuesta. El loop y la sesión
+    se crean con la primera llamada.
+    """
+
+    def __init__(self, base_url=BASE_URL, max_conexiones=TELEGRAM_ASYNC_MAX_CONNECTIONS,
+                 timeout=(TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_READ_TIMEOUT),
+                 limitador=None):
+        self.base_url = base_url
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.limitador = limitador or LimitadorTelegram()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._hilo = None
+        self._http = None
+
+    def _asegurar_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._hilo = threading.Thread(
+                    target=self._loop.run_forever, name="telegram-async", daemon=True
+                )
+                self._hilo.start()
+            return self._loop
+
+    def _sesion(self):
+        # Solo se llama desde el loop: no necesita lock.
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.max_conexiones,
+                max_keepalive_connections=self.max_conexiones,
+            ))
+        return self._http
+
+    async def post_async(self, metodo, timeout=None, carril=None, **kwargs):
+        """
+        POST a ``/<metodo>``; ``kwargs`` son json, data o files como en
+        ``requests``. Sin ``carril`` se usa el de la tarea (ver ``programar``).
+        """
+        import httpx
+
+        carril = prioridad_actual() if carril is None else carril
+
+        conexion, lectura = timeout or self.timeout
+        limites = httpx.Timeout(connect=conexion, read=lectura, write=lectura, pool=None)
+        url = f"{self.base_url}/{metodo}"
+        limitado = metodo not in METODOS_SIN_LIMITE
+        chat_id = _chat_de_peticion(kwargs)
+        for intento in range(TELEGRAM_MAX_RETRIES + 1):
+            ultimo = intento == TELEGRAM_MAX_RETRIES
+            espera = TELEGRAM_RETRY_BASE_SECONDS * 2 ** intento
+            if limitado:
+                await self.limitador.adquirir_async(chat_id, carril)
+            metricas.PETICIONES_TELEGRAM.inc(metodo=metodo)
+            try:
+                crudo = await self._sesion().post(url, timeout=limites, **kwargs)
+            except httpx.TransportError as e:
+                entregado_quizas = (
+                    isinstance(e, httpx.ReadTimeout) and metodo not in METODOS_IDEMPOTENTES
+                )
+                if ultimo or entregado_quizas:
+                    raise
+                print(f"[WARN] Telegram {metodo}: {e!r}; reintento en {espera:.1f}s")
+            else:
+                ret = _respuesta(
+                    crudo.status_code, crudo.content, crudo.reason_phrase,
+                    crudo.headers, str(crudo.request.url),
+                )
+                if _tras_respuesta(ret, chat_id) != FALLO_TRANSITORIO or ultimo:
+                    return ret
+                if ret.status_code == 429:
+                    espera = _retry_after(ret)
+                    print(f"[WARN] Telegram 429 en {metodo} para {chat_id}; reintento en {espera:.0f}s")
+                    if limitado:
+                        self.limitador.pausar(espera, chat_id)
+                        espera = 0
+                else:
+                    print(f"[WARN] Telegram {ret.status_code} en {metodo}; reintento en {espera:.1f}s")
+            await asyncio.sleep(espera)
+            for archivo in (kwargs.get("files") or {}).values():
+                archivo.seek(0)
+        return ret
+
+    def programar(self, corrutina, carril=None):
+        """
+        Ejecuta ``corrutina`` en el loop de fondo; devuelve un Future sin
+        esperar. La tarea envía en ``carril`` o, si no se indica, en el carril
+        de quien la programa (``prioridad``), no en el del hilo del loop.
+        """
+        carril = prioridad_actual() if carril is None else carril
+        return asyncio.run_coroutine_threadsafe(
+            _en_carril(corrutina, carril), self._asegurar_loop()
+        )
+
+    def post(self, metodo, timeout=None, carril=None, **kwargs):
+        """Fachada síncrona: bloquea este hilo, no el loop, hasta la respuesta."""
+        if threading.current_thread() is self._hilo:
+            raise RuntimeError("post() bloquearía el loop de Telegram; usa post_async()")
+        return self.programar(
+            self.post_async(metodo, timeout=timeout, **kwargs), carril
+        ).result()
+
+    def calentar(self, conexiones=TELEGRAM_WARMUP_CONNECTIONS):
+        """Abre ``conexiones`` en paralelo con ``getMe`` y las deja en el pool."""
+        futuros = [self.programar(self.post_async("getMe")) for _ in range(conexiones)]
+        for futuro in futuros:
+            try:
+                futuro.result(self.timeout[0] + self.timeout[1])
+            except Exception as e:
+                print(f"[WARN] No se pudo precalentar la conexión con Telegram: {e!r}")
+
+    def cerrar(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result()
+            self._http = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._hilo.join()
+        loop.close()
+
+
+async def _en_carril(corrutina, carril):
+    # Corre dentro de la tarea: el carril solo vale para su contexto.
+    _carril.set(carril)
+    return await corrutina
+
+
+# Un solo limitador para ambos clientes: los envíos síncronos y asíncronos
+# cuentan contra las mismas cubetas global y por chat.
+limitador_telegram = LimitadorTelegram()
+cliente_telegram_async = ClienteTelegramAsync(limitador=limitador_telegram)
+cliente_telegram = (
+    cliente_telegram_async if TELEGRAM_ASYNC
+    else ClienteTelegram(limitador=limitador_telegram)
+)
+
+
+def calentar_conexiones():
+    """Precalienta el pool de Telegram en segundo plano al arrancar el proceso."""
+    threading.Thread(
+        target=cliente_telegram.calentar, name="telegram-warmup", daemon=True
+    ).start()
+
 
 def responder_callback_query(callback_query_id, texto=None):
     """Confirma inmediatamente a Telegram que se recibió la pulsación."""
     payload = {"callback_query_id": callback_query_id}
     if texto:
         payload["text"] = texto
-    return requests.post(
-        f"{BASE_URL}/answerCallbackQuery",
-        json=payload,
-        timeout=10,
-    )
+    return cliente_telegram.post("answerCallbackQuery", json=payload)
+
+
+def _teclado(filas_botones):
+    return {
+        "inline_keyboard": [
+            [{"text": b["texto"], "callback_data": b["data"]} for b in fila]
+            for fila in filas_botones
+        ]
+    }
+
+
+def _post_con_formato(metodo, payload, files=None, **kwargs):
+    """
+    Envía ``payload`` y, si Telegram rechaza las entidades de su
+    ``parse_mode``, lo repite una sola vez como texto plano. Los demás fallos
+    se devuelven tal cual: los transitorios ya los reintentó el cliente.
+    """
+    if metodo == "editMessageText" and _edicion_omitida(metodo, payload):
+        return _respuesta_sin_cambios(payload)
+    cuerpo = {"data": payload, "files": files} if files else {"json": payload}
+    try:
+        ret = cliente_telegram.post(metodo, **cuerpo, **kwargs)
+        if payload.get("parse_mode") and clasificar_respuesta(ret) == FALLO_FORMATO:
+            print(f"[WARN] Telegram rechazó el formato {payload['parse_mode']} en {metodo}; se envía sin formato")
+            sin_formato = {k: v for k, v in payload.items() if k != "parse_mode"}
+            for archivo in (files or {}).values():
+                archivo.seek(0)
+            cuerpo = {"data": sin_formato, "files": files} if files else {"json": sin_formato}
+            ret = cliente_telegram.post(metodo, **cuerpo, **kwargs)
+    except Exception:
+        _olvidar_edicion(payload)
+        raise
+    if not files:
+        _recordar_contenido(metodo, payload, ret)
+    return ret
 
 
 def contiene_url(texto):
     """Detecta si el texto contiene una URL"""
     return bool(re.search(r"https?://\S+", texto or ""))
 
+def longitud_telegram(texto):
+    """Largo de ``texto`` como lo cuenta Telegram (unidades UTF-16)."""
+    return len((texto or "").encode("utf-16-le")) // 2
+
+def _formato_edicion(formato, *textos):
+    """Las ediciones con enlaces van sin Markdown: sus URL rompen las entidades."""
+    if formato and formato.lower().startswith("markdown") and any(map(contiene_url, textos)):
+        return None
+    return formato
+
 def markdown_a_html(texto):
     """Convierte texto básico con enlaces Markdown a HTML escapado"""
     if not texto:
@@ -41,7 +765,7 @@ def markdown_a_html(texto):
 
     return texto
 
-def enviar_telegram(chat_id, tipo="texto", counter_recursivity=0, **kwargs):
+def enviar_telegram(chat_id, tipo="texto", **kwargs):
     
     ret = None
     try:
@@ -89,13 +813,9 @@ def enviar_telegram(chat_id, tipo="texto", counter_recursivity=0, **kwargs):
         else:
             raise ValueError("Tipo de mensaje no soportado.")
         
-        # Reintento si falla
+        # Los reintentos y el envío sin formato ya ocurrieron más abajo.
         if ret.status_code != 200:
-            if counter_recursivity < 2:
-                nuevos_kwargs = {k: v for k, v in kwargs.items() if k != "formato"}
-                return enviar_telegram(chat_id=chat_id, tipo=tipo, counter_recursivity=counter_recursivity + 1, **nuevos_kwargs)
-            else:
-                return ret
+            return ret
 
         # Guardado opcional
         guardar_datos = kwargs.pop("func_guardado_data", None)
@@ -107,17 +827,15 @@ def enviar_telegram(chat_id, tipo="texto", counter_recursivity=0, **kwargs):
     return ret
 
 def enviar_mensaje_texto(chat_id, mensaje, formato=None):
-    url = f"{BASE_URL}/sendMessage"
     payload = {
         "chat_id": chat_id,
         "text": mensaje
     }
     if formato:
         payload["parse_mode"] = formato
-    return requests.post(url, json=payload)
+    return _post_con_formato("sendMessage", payload)
 
 def enviar_mensaje_con_botones(chat_id, mensaje, botones, formato=None):
-    url = f"{BASE_URL}/sendMessage"
     keyboard = {
         "inline_keyboard": [[{"text": b["texto"], "callback_data": b["data"]}] for b in botones]
     }
@@ -128,37 +846,20 @@ def enviar_mensaje_con_botones(chat_id, mensaje, botones, formato=None):
     }
     if formato:
         payload["parse_mode"] = formato
-    return requests.post(url, json=payload)
+    return _post_con_formato("sendMessage", payload)
 
-def enviar_mensaje_con_grid(
-    chat_id, mensaje, filas_botones, formato=None, counter_recursivity=0
-):
+def enviar_mensaje_con_grid(chat_id, mensaje, filas_botones, formato=None):
     """Envía un mensaje con botones organizados en filas personalizadas (grid).
     
     filas_botones: lista de listas de botones.
     Cada sublista = una fila. Cada botón: {"texto": str, "data": str}
     Ejemplo: [[btn1, btn2], [btn3, btn4], [btn_cancel]]
     """
-    url = f"{BASE_URL}/sendMessage"
-    keyboard = {
-        "inline_keyboard": [
-            [{"text": b["texto"], "callback_data": b["data"]} for b in fila]
-            for fila in filas_botones
-        ]
-    }
+    keyboard = _teclado(filas_botones)
     payload = {"chat_id": chat_id, "text": mensaje, "reply_markup": keyboard}
     if formato:
         payload["parse_mode"] = formato
-    ret = requests.post(url, json=payload)
-    if ret.status_code != 200 and formato and counter_recursivity < 2:
-        return enviar_mensaje_con_grid(
-            chat_id,
-            mensaje,
-            filas_botones,
-            formato=None,
-            counter_recursivity=counter_recursivity + 1,
-        )
-    return ret
+    return _post_con_formato("sendMessage", payload)
 
 def editar_mensaje_con_grid(
     chat_id,
@@ -166,16 +867,9 @@ def editar_mensaje_con_grid(
     mensaje,
     filas_botones,
     formato=None,
-    counter_recursivity=0,
 ):
     """Edita texto + botones grid de un mensaje existente."""
-    url = f"{BASE_URL}/editMessageText"
-    keyboard = {
-        "inline_keyboard": [
-            [{"text": b["texto"], "callback_data": b["data"]} for b in fila]
-            for fila in filas_botones
-        ]
-    }
+    keyboard = _teclado(filas_botones)
     payload = {
         "chat_id": chat_id,
         "message_id": message_id,
@@ -184,41 +878,76 @@ def editar_mensaje_con_grid(
     }
     if formato:
         payload["parse_mode"] = formato
-    ret = requests.post(url, json=payload)
-    if ret.status_code != 200 and formato and counter_recursivity < 2:
-        return editar_mensaje_con_grid(
-            chat_id,
-            message_id,
-            mensaje,
-            filas_botones,
-            formato=None,
-            counter_recursivity=counter_recursivity + 1,
+    return _post_con_formato("editMessageText", payload)
+
+_cache_archivos = None
+_lock_cache_archivos = threading.Lock()
+
+
+def obtener_cache_archivos():
+    """``CacheArchivosTelegram`` del proceso (se abre al primer envío), o None si está desactivada."""
+    global _cache_archivos
+    if not TELEGRAM_FILE_CACHE_PATH:
+        return None
+    with _lock_cache_archivos:
+        if _cache_archivos is None:
+            try:
+                _cache_archivos = CacheArchivosTelegram(TELEGRAM_FILE_CACHE_PATH)
+            except Exception as e:
+                print(f"[WARN] Caché de archivos de Telegram deshabilitada: {e}")
+                return None
+        return _cache_archivos
+
+
+def _file_id_subido(ret, campo):
+    try:
+        resultado = ret.json()["result"][campo]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if campo == "photo":
+        # Telegram devuelve varios tamaños; el último es el original.
+        resultado = resultado[-1] if resultado else {}
+    return resultado.get("file_id")
+
+
+def _enviar_archivo(metodo, campo, chat_id, ruta, caption, formato):
+    """
+    Envía ``ruta`` por ``file_id`` si ese contenido ya se subió antes; si no
+    (o Telegram ya no reconoce el ``file_id``) lo sube y guarda el nuevo.
+    """
+    data = {
+        "chat_id": chat_id,
+        "caption": caption
+    }
+    if formato:
+        data["parse_mode"] = formato
+
+    cache = obtener_cache_archivos()
+    file_id, huella = cache.buscar(ruta, campo) if cache else (None, None)
+    if file_id:
+        ret = _post_con_formato(metodo, {**data, campo: file_id})
+        if clasificar_respuesta(ret) != FALLO_PERMANENTE:
+            return ret
+        print(f"[WARN] Telegram rechazó el file_id de {ruta}; se sube de nuevo")
+        cache.olvidar(ruta, campo)
+
+    with open(ruta, "rb") as archivo:
+        ret = _post_con_formato(
+            metodo, data, files={campo: archivo},
+            timeout=(TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_UPLOAD_TIMEOUT),
         )
+    if cache and huella and ret.status_code == 200:
+        nuevo = _file_id_subido(ret, campo)
+        if nuevo:
+            cache.guardar(ruta, campo, huella, nuevo)
     return ret
 
+
 def enviar_documento(chat_id, ruta, caption="", formato=None):
-    url = f"{BASE_URL}/sendDocument"
-    with open(ruta, "rb") as doc:
-        files = {"document": doc}
-        data = {
-            "chat_id": chat_id,
-            "caption": caption
-        }
-        if formato:
-            data["parse_mode"] = formato
-        return requests.post(url, data=data, files=files)
+    return _enviar_archivo("sendDocument", "document", chat_id, ruta, caption, formato)
 
 def enviar_imagen(chat_id, ruta, caption="", formato=None):
-    url = f"{BASE_URL}/sendPhoto"
-    with open(ruta, "rb") as img:
-        files = {"photo": img}
-        data = {
-            "chat_id": chat_id,
-            "caption": caption
-        }
-        if formato:
-            data["parse_mode"] = formato
-        return requests.post(url, data=data, files=files)
+    return _enviar_archivo("sendPhoto", "photo", chat_id, ruta, caption, formato)
 
 def guardar_diccionario(diccionario):
     nombre_archivo = "mi_diccionario.json"
@@ -229,12 +958,10 @@ def guardar_diccionario(diccionario):
     except Exception as e:
         print(f"Ocurrió un error al guardar el diccionario: {e}")
 
-def editar_mensaje_texto(chat_id, message_id, nuevo_texto, formato=None, guardar_datos=None, counter_recursivity=0):
+def editar_mensaje_texto(chat_id, message_id, nuevo_texto, formato=None, guardar_datos=None):
     try:
-        if formato and formato.lower().startswith("markdown") and contiene_url(nuevo_texto):
-            formato = None
+        formato = _formato_edicion(formato, nuevo_texto)
 
-        url = f"{BASE_URL}/editMessageText"
         payload = {
             "chat_id": chat_id,
             "message_id": message_id,
@@ -244,17 +971,7 @@ def editar_mensaje_texto(chat_id, message_id, nuevo_texto, formato=None, guardar
         if formato:
             payload["parse_mode"] = formato
 
-        ret = requests.post(url, json=payload)
-
-        if ret.status_code != 200 and counter_recursivity < 2:
-            return editar_mensaje_texto(
-                chat_id=chat_id,
-                message_id=message_id,
-                nuevo_texto=nuevo_texto,
-                formato=None,
-                guardar_datos=guardar_datos,
-                counter_recursivity=counter_recursivity + 1
-            )
+        ret = _post_con_formato("editMessageText", payload)
 
         if guardar_datos:
             guardar_datos(chat_id, ret)
@@ -267,7 +984,7 @@ def editar_mensaje_texto(chat_id, message_id, nuevo_texto, formato=None, guardar
         return None
 
 
-def editar_mensaje_con_botones(chat_id, message_id, nuevo_mensaje, nuevos_botones, formato=None, guardar_datos=None, counter_recursivity=0):
+def editar_mensaje_con_botones(chat_id, message_id, nuevo_mensaje, nuevos_botones, formato=None, guardar_datos=None):
     """
     Edita el texto y los botones de un mensaje previamente enviado por el bot.
 
@@ -279,20 +996,9 @@ def editar_mensaje_con_botones(chat_id, message_id, nuevo_mensaje, nuevos_botone
     - formato: (Opcional) "HTML" o "MarkdownV2" para aplicar formato.
     """
     try:
-        contiene_enlace = False
+        textos_botones = [b.get("texto", "") for b in nuevos_botones] if isinstance(nuevos_botones, list) else []
+        formato = _formato_edicion(formato, nuevo_mensaje, *textos_botones)
 
-        if contiene_url(nuevo_mensaje):
-            contiene_enlace = True
-        elif isinstance(nuevos_botones, list):
-            for b in nuevos_botones:
-                if contiene_url(b.get("texto", "")):
-                    contiene_enlace = True
-                    break
-
-        if formato and formato.lower().startswith("markdown") and contiene_enlace:
-            formato = None
-
-        url = f"{BASE_URL}/editMessageText"
         keyboard = {
             "inline_keyboard": [[{"text": b["texto"], "callback_data": b["data"]}] for b in nuevos_botones]
         }
@@ -307,18 +1013,7 @@ def editar_mensaje_con_botones(chat_id, message_id, nuevo_mensaje, nuevos_botone
         if formato:
             payload["parse_mode"] = formato
 
-        ret = requests.post(url, json=payload)
-
-        if ret.status_code != 200 and counter_recursivity < 2:
-            return editar_mensaje_con_botones(
-                chat_id=chat_id,
-                message_id=message_id,
-                nuevo_mensaje=nuevo_mensaje,
-                nuevos_botones=nuevos_botones,
-                formato=None,
-                guardar_datos=guardar_datos,
-                counter_recursivity=counter_recursivity + 1
-            )
+        ret = _post_con_formato("editMessageText", payload)
 
         if guardar_datos:
             guardar_datos(chat_id, ret)
@@ -340,7 +1035,6 @@ def editar_botones_mensaje(chat_id, message_id, nuevos_botones, guardar_datos=No
     - nuevos_botones: Lista de botones con estructura [{"texto": "Aceptar", "data": "accion_aceptar"}, ...].
     """
     try:
-        url = f"{BASE_URL}/editMessageReplyMarkup"
         keyboard = {
             "inline_keyboard": [[{"text": b["texto"], "callback_data": b["data"]}] for b in nuevos_botones]
         }
@@ -351,7 +1045,14 @@ def editar_botones_mensaje(chat_id, message_id, nuevos_botones, guardar_datos=No
             "reply_markup": keyboard
         }
 
-        ret = requests.post(url, json=payload)
+        if _edicion_omitida("editMessageReplyMarkup", payload):
+            return _respuesta_sin_cambios(payload)
+        try:
+            ret = cliente_telegram.post("editMessageReplyMarkup", json=payload)
+        except Exception:
+            _olvidar_edicion(payload)
+            raise
+        _recordar_contenido("editMessageReplyMarkup", payload, ret)
 
         if guardar_datos:
             guardar_datos(chat_id, ret)
@@ -365,9 +1066,104 @@ def editar_botones_mensaje(chat_id, message_id, nuevos_botones, guardar_datos=No
 
 
 def eliminar_mensaje(chat_id, message_id):
-    url = f"{BASE_URL}/deleteMessage"
+    cache_ediciones.olvidar(chat_id, message_id)
     payload = {
         "chat_id": chat_id,
         "message_id": message_id
     }
-    return requests.post(url, json=payload)
+    return cliente_telegram.post("deleteMessage", json=payload)
+
+
+# --- Variantes asíncronas (loop compartido de cliente_telegram_async) ---
+#
+# Se usan dentro de corrutinas, o desde código síncrono con ``ejecutar_async``
+# para dejar varias llamadas en vuelo y esperar sus Future después:
+#
+#     futuros = [ejecutar_async(editar_mensaje_async(chat_id, m, texto)) for m in ids]
+#     concurrent.futures.wait(futuros)
+
+def ejecutar_async(corrutina, carril=None):
+    """
+    Programa ``corrutina`` en el loop de Telegram, en ``carril`` o en el del
+    hilo que llama; devuelve un ``concurrent.futures.Future``.
+    """
+    return cliente_telegram_async.programar(corrutina, carril)
+
+
+async def _post_con_formato_async(metodo, payload, carril=None):
+    """Versión asíncrona de ``_post_con_formato`` (sin archivos)."""
+    if metodo == "editMessageText" and _edicion_omitida(metodo, payload):
+        return _respuesta_sin_cambios(payload)
+    try:
+        ret = await cliente_telegram_async.post_async(metodo, carril=carril, json=payload)
+        if payload.get("parse_mode") and clasificar_respuesta(ret) == FALLO_FORMATO:
+            print(f"[WARN] Telegram rechazó el formato {payload['parse_mode']} en {metodo}; se envía sin formato")
+            sin_formato = {k: v for k, v in payload.items() if k != "parse_mode"}
+            ret = await cliente_telegram_async.post_async(metodo, carril=carril, json=sin_formato)
+    except Exception:
+        _olvidar_edicion(payload)
+        raise
+    _recordar_contenido(metodo, payload, ret)
+    return ret
+
+
+async def enviar_mensaje_async(chat_id, mensaje, filas_botones=None, formato=None,
+                               carril=None):
+    """``enviar_mensaje_texto`` / ``enviar_mensaje_con_grid`` en una corrutina."""
+    payload = {"chat_id": chat_id, "text": mensaje}
+    if filas_botones:
+        payload["reply_markup"] = _teclado(filas_botones)
+    if formato:
+        payload["parse_mode"] = formato
+    return await _post_con_formato_async("sendMessage", payload, carril)
+
+
+async def editar_mensaje_async(chat_id, message_id, mensaje, filas_botones=None,
+                               formato=None, carril=None):
+    """``editar_mensaje_texto`` / ``editar_mensaje_con_grid`` en una corrutina."""
+    textos_botones = [b["texto"] for fila in filas_botones or [] for b in fila]
+    formato = _formato_edicion(formato, mensaje, *textos_botones)
+    payload = {"chat_id": chat_id, "message_id": message_id, "text": mensaje}
+    if filas_botones:
+        payload["reply_markup"] = _teclado(filas_botones)
+    if formato:
+        payload["parse_mode"] = formato
+    return await _post_con_formato_async("editMessageText", payload, carril)
+
+
+def editar_mensajes_texto(ediciones, formato=None):
+    """
+    Aplica ``ediciones`` (tuplas ``(chat_id, message_id, texto)``) con el
+    cliente configurado: si ``cliente_telegram`` es el asíncrono quedan todas
+    en vuelo a la vez sobre su loop; si no, van una tras otra por
+    ``editar_mensaje_texto``. Devuelve las respuestas en el mismo orden, con
+    None en las que fallaron.
+    """
+    if not isinstance(cliente_telegram, ClienteTelegramAsync):
+        return [editar_mensaje_texto(*edicion, formato=formato) for edicion in ediciones]
+    futuros = [
+        cliente_telegram.programar(editar_mensaje_async(*edicion, formato=formato))
+        for edicion in ediciones
+    ]
+    respuestas = []
+    for futuro in futuros:
+        try:
+            respuestas.append(futuro.result())
+        except Exception as e:
+            print(f"[ERROR] editar_mensajes_texto - {e!r}")
+            respuestas.append(None)
+    return respuestas
+
+
+async def eliminar_mensaje_async(chat_id, message_id):
+    cache_ediciones.olvidar(chat_id, message_id)
+    return await cliente_telegram_async.post_async(
+        "deleteMessage", json={"chat_id": chat_id, "message_id": message_id}
+    )
+
+
+async def responder_callback_query_async(callback_query_id, texto=None):
+    payload = {"callback_query_id": callback_query_id}
+    if texto:
+        payload["text"] = texto
+    return await cliente_telegram_async.post_async("answerCallbackQuery", json=payload)
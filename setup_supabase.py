@@ -333,6 +333,209 @@ def crear_tablas_criptoalertas(supabase: Client):
         return False
 
 
+def crear_notificacion_cambios_recordatorios(supabase: Client):
+    """
+    Instala un trigger que publica cada alta, edición o baja de `recordatorios`
+    en el canal LISTEN/NOTIFY `recordatorios_cambios`. El planificador lo usa
+    para despertar en otros procesos sin consultar periódicamente.
+    """
+    try:
+        sql = """
+        CREATE OR REPLACE FUNCTION arv_notificar_recordatorio()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            PERFORM pg_notify(
+                'recordatorios_cambios',
+                json_build_object(
+                    'id', COALESCE(NEW.id, OLD.id),
+                    'op', TG_OP
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$;
+
+        DROP TRIGGER IF EXISTS trg_recordatorios_notificar ON recordatorios;
+        CREATE TRIGGER trg_recordatorios_notificar
+            AFTER INSERT OR DELETE
+               OR UPDATE OF fecha_hora, notificado, aviso_constante, aviso_detenido
+            ON recordatorios
+            FOR EACH ROW EXECUTE FUNCTION arv_notificar_recordatorio();
+        """
+        supabase.rpc("exec_sql", {"sql": sql}).execute()
+        print("✅ Notificación de cambios de recordatorios instalada.")
+        return True
+    except Exception as e:
+        print(f"❌ Error al instalar la notificación de cambios: {e}")
+        return False
+
+
+def crear_funcion_entregar_recordatorios(supabase: Client):
+    """
+    Crea la RPC `arv_entregar_recordatorios(p_ids)`: en una sola transacción
+    marca como notificados los IDs recibidos y, para los repetibles, inserta la
+    primera ocurrencia futura (`arv_siguiente_ocurrencia`) y marca el original
+    con `repeticion_creada`.
+
+    Los originales se bloquean con FOR UPDATE y solo se repiten si aún no
+    tenían `repeticion_creada`, así que repetir la llamada no duplica filas.
+    """
+    try:
+        sql = """
+        -- Primera ocurrencia posterior a p_ahora (salta las perdidas en una
+        -- caída). Meses y años se cuentan desde la fecha original.
+        CREATE OR REPLACE FUNCTION arv_siguiente_ocurrencia(
+            p_fecha TIMESTAMP, p_simbolo TEXT, p_n INTEGER, p_ahora TIMESTAMP
+        )
+        RETURNS TIMESTAMP
+        LANGUAGE plpgsql
+        IMMUTABLE
+        AS $$
+        DECLARE
+            paso INTERVAL;
+            meses INTEGER;
+            k BIGINT;
+        BEGIN
+            IF p_simbolo IN ('m', 'a') THEN
+                meses := p_n * CASE p_simbolo WHEN 'a' THEN 12 ELSE 1 END;
+                paso := make_interval(months => meses);
+                k := GREATEST(1, (
+                    (EXTRACT(YEAR FROM p_ahora) - EXTRACT(YEAR FROM p_fecha)) * 12
+                    + EXTRACT(MONTH FROM p_ahora) - EXTRACT(MONTH FROM p_fecha)
+                )::BIGINT / meses);
+                WHILE p_fecha + paso * k <= p_ahora LOOP
+                    k := k + 1;
+                END LOOP;
+                RETURN p_fecha + paso * k;
+            END IF;
+
+            paso := CASE p_simbolo
+                WHEN 's' THEN make_interval(secs => p_n)
+                WHEN 'x' THEN make_interval(mins => p_n)
+                WHEN 'h' THEN make_interval(hours => p_n)
+                WHEN 'd' THEN make_interval(days => p_n)
+                WHEN 'w' THEN make_interval(weeks => p_n)
+            END;
+            k := GREATEST(1, FLOOR(
+                EXTRACT(EPOCH FROM (p_ahora - p_fecha)) / EXTRACT(EPOCH FROM paso)
+            )::BIGINT + 1);
+            RETURN p_fecha + paso * k;
+        END;
+        $$;
+
+        CREATE OR REPLACE FUNCTION arv_entregar_recordatorios(p_ids BIGINT[])
+        RETURNS SETOF recordatorios
+        LANGUAGE sql
+        AS $$
+            WITH origen AS (
+                SELECT r.*,
+                       (COALESCE(r.repetir, FALSE)
+                        AND NOT COALESCE(r.repeticion_creada, FALSE)
+                        AND r.fecha_hora IS NOT NULL
+                        AND COALESCE(r.intervalos, 0) > 0
+                        AND r.intervalo_repeticion IN ('s', 'x', 'h', 'd', 'w', 'm', 'a')
+                       ) AS se_repite
+                FROM recordatorios r
+                WHERE r.id = ANY(p_ids)
+                ORDER BY r.id
+                FOR UPDATE
+            ),
+            marcados AS (
+                UPDATE recordatorios r
+                SET notificado = TRUE,
+                    repeticion_creada = COALESCE(r.repeticion_creada, FALSE) OR o.se_repite
+                FROM origen o
+                WHERE r.id = o.id
+            ),
+            nuevos AS (
+                INSERT INTO recordatorios (
+                    chat_id, usuario, nombre_tarea, descripcion, fecha_hora,
+                    creado_en, es_formato_utc, notificado, aviso_constante,
+                    aviso_detenido, repetir, intervalo_repeticion, intervalos,
+                    repeticion_creada
+                )
+                SELECT o.chat_id, o.usuario, o.nombre_tarea, o.descripcion,
+                       arv_siguiente_ocurrencia(
+                           o.fecha_hora, o.intervalo_repeticion, o.intervalos,
+                           timezone('utc', now())
+                       ),
+                       timezone('utc', now()), TRUE, FALSE, o.aviso_constante,
+                       FALSE, TRUE, o.intervalo_repeticion, o.intervalos, FALSE
+                FROM origen o
+                WHERE o.se_repite
+                ORDER BY o.id
+                RETURNING *
+            )
+            SELECT * FROM nuevos;
+        $$;
+
+        -- Que PostgREST publique la función sin reiniciar
+        NOTIFY pgrst, 'reload schema';
+        """
+        supabase.rpc("exec_sql", {"sql": sql}).execute()
+        print("✅ Función 'arv_entregar_recordatorios' instalada.")
+        return True
+    except Exception as e:
+        print(f"❌ Error al instalar 'arv_entregar_recordatorios': {e}")
+        return False
+
+
+
+def crear_marcas_actualizacion(supabase: Client):
+    """
+    Añade `actualizado_en` a las tablas respaldadas y un trigger que la renueva
+    en cada UPDATE. `backup_db.py` la usa como marca de agua para copiar solo
+    las filas nuevas o modificadas.
+    """
+    try:
+        sql = """
+        CREATE OR REPLACE FUNCTION arv_tocar_actualizado_en()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            NEW.actualizado_en := NOW();
+            RETURN NEW;
+        END;
+        $$;
+
+        DO $$
+        DECLARE
+            tabla TEXT;
+        BEGIN
+            FOREACH tabla IN ARRAY ARRAY[
+                'recordatorios', 'chats_info', 'chats_id_estados',
+                'actualizaciones_info', 'chats_avisados_actualizaciones',
+                'reportes', 'cripto_premium_users', 'cripto_alertas'
+            ] LOOP
+                EXECUTE format(
+                    'ALTER TABLE %I ADD COLUMN IF NOT EXISTS actualizado_en '
+                    'TIMESTAMPTZ NOT NULL DEFAULT NOW()', tabla);
+                EXECUTE format(
+                    'CREATE INDEX IF NOT EXISTS %I ON %I (actualizado_en)',
+                    'idx_' || tabla || '_actualizado_en', tabla);
+                EXECUTE format(
+                    'DROP TRIGGER IF EXISTS %I ON %I',
+                    'trg_' || tabla || '_actualizado_en', tabla);
+                EXECUTE format(
+                    'CREATE TRIGGER %I BEFORE UPDATE ON %I FOR EACH ROW '
+                    'EXECUTE FUNCTION arv_tocar_actualizado_en()',
+                    'trg_' || tabla || '_actualizado_en', tabla);
+            END LOOP;
+        END $$;
+
+        NOTIFY pgrst, 'reload schema';
+        """
+        supabase.rpc("exec_sql", {"sql": sql}).execute()
+        print("✅ Marcas 'actualizado_en' instaladas para el backup incremental.")
+        return True
+    except Exception as e:
+        print(f"❌ Error al instalar las marcas 'actualizado_en': {e}")
+        return False
+
+
 if __name__ == "__main__":
     print("Configurando base de datos en Supabase...")
     try:
@@ -350,6 +553,9 @@ if __name__ == "__main__":
             crear_tabla_chats_id_estados(cliente)
             crear_tabla_reportes(cliente)
             crear_tablas_criptoalertas(cliente)
+            crear_notificacion_cambios_recordatorios(cliente)
+            crear_funcion_entregar_recordatorios(cliente)
+            crear_marcas_actualizacion(cliente)
             print("✅ Configuración completada con éxito")
         else:
              print("⚠️ Salto de configuración por cliente nulo.")
@@ -0,0 +1,428 @@
+"""
+Simulador con reloj virtual del administrador de recordatorios.
+
+Ejecuta el código real de ``AdministradorRecordatorios`` (cola, ventana,
+verificación, despacho paralelo y acuses en bloque) contra un Supabase en
+memoria y un Telegram falso, sin hilos de fondo ni esperas reales: el reloj
+salta al siguiente vencimiento o recarga. Cada ciclo avanza el reloj lo que
+tardó de verdad en procesarse más una latencia modelada por llamada a la base
+y por envío a Telegram.
+
+    python simulador.py --recordatorios 1000000 --series 5000 --rafaga 0.3
+
+Informa los percentiles de retraso de entrega, las llamadas a la base por
+recordatorio y la memoria pico del scheduler (sin contar la base simulada).
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+os.environ.setdefault("TELEGRAM_TOKEN", "simulador")
+
+import reminders
+import supabase_db
+from planificador import iso_utc, marca_tiempo_utc
+from recurrencia import siguiente_ocurrencia
+
+
+# Inicio fijo para que dos corridas con la misma semilla sean comparables.
+INICIO_SIMULACION = marca_tiempo_utc("2026-01-05T00:00:00+00:00")
+# Tamaño de los baldes del índice por fecha de la base simulada.
+SEGUNDOS_POR_BALDE = 60
+
+_ID_BOTON = re.compile(r"^snooze(?:_custom)?:(\d+)")
+
+
+class RelojVirtual:
+    def __init__(self, ahora=INICIO_SIMULACION):
+        self.ahora = float(ahora)
+
+    def __call__(self):
+        return self.ahora
+
+    def avanzar(self, segundos):
+        self.ahora += max(0.0, segundos)
+
+
+class SupabaseEnMemoria:
+    """
+    Sustituto de las funciones de ``supabase_db`` que usa el scheduler.
+
+    Guarda las filas en arreglos compactos (un millón cabe en pocos MB) y las
+    materializa como dicts al consultarlas, como haría PostgREST. Cuenta las
+    peticiones igual que el cliente real: una por página de 1000 filas, una
+    por bloque de 200 IDs y una por llamada a la RPC de entrega.
+    """
+
+    def __init__(self, reloj):
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._fechas = array("d")
+        self._chats = array("l")
+        self._notificados = bytearray()
+        self._series = {}  # id -> [simbolo, intervalos, repeticion_creada]
+        self._baldes = {}
+        self.llamadas = {}
+        self.entregados = 0
+
+    def __len__(self):
+        return len(self._fechas)
+
+    def insertar(self, fecha, chat_id, simbolo=None, intervalos=0):
+        with self._lock:
+            return self._insertar(fecha, chat_id, simbolo, intervalos)
+
+    def _insertar(self, fecha, chat_id, simbolo, intervalos):
+        recordatorio_id = len(self._fechas) + 1
+        self._fechas.append(fecha)
+        self._chats.append(int(chat_id))
+        self._notificados.append(0)
+        if simbolo:
+            self._series[recordatorio_id] = [simbolo, intervalos, False]
+        self._baldes.setdefault(int(fecha // SEGUNDOS_POR_BALDE), []).append(recordatorio_id)
+        return recordatorio_id
+
+    def vencimiento(self, recordatorio_id):
+        return self._fechas[recordatorio_id - 1]
+
+    def total_llamadas(self):
+        return sum(self.llamadas.values())
+
+    def _contar(self, nombre, peticiones=1):
+        self.llamadas[nombre] = self.llamadas.get(nombre, 0) + max(1, peticiones)
+
+    def _fila(self, recordatorio_id):
+        serie = self._series.get(recordatorio_id)
+        return {
+            "id": recordatorio_id,
+            "chat_id": str(self._chats[recordatorio_id - 1]),
+            "usuario": "simulador",
+            "nombre_tarea": f"Tarea {recordatorio_id}",
+            "descripcion": "",
+            "fecha_hora": iso_utc(self._fechas[recordatorio_id - 1]),
+            "notificado": bool(self._notificados[recordatorio_id - 1]),
+            "aviso_constante": False,
+            "aviso_detenido": False,
+            "repetir": serie is not None,
+            "intervalo_repeticion": serie[0] if serie else "",
+            "intervalos": serie[1] if serie else 0,
+            "repeticion_creada": bool(serie and serie[2]),
+        }
+
+    def _pendientes_en(self, desde, hasta):
+        """IDs sin notificar con ``desde < fecha_hora <= hasta``."""
+        ids = []
+        primer_balde = None if desde is None else int(desde // SEGUNDOS_POR_BALDE)
+        for balde in sorted(self._baldes):
+            if balde * SEGUNDOS_POR_BALDE > hasta:
+                break
+            if primer_balde is not None and balde < primer_balde:
+                continue
+            vivos = [i for i in self._baldes[balde] if not self._notificados[i - 1]]
+            if not vivos and desde is None:
+                del self._baldes[balde]  # Balde ya entregado
+                continue
+            self._baldes[balde] = vivos
+            ids.extend(
+                i for i in vivos
+                if self._fechas[i - 1] <= hasta
+                and (desde is None or self._fechas[i - 1] > desde)
+            )
+        return ids
+
+    # --- Funciones con la misma firma que supabase_db ---
+
+    def obtener_recordatorios_pendientes(self, pagina_tamano=1000, hasta=None):
+        with self._lock:
+            limite = marca_tiempo_utc(hasta) if hasta else self._reloj()
+            filas = [self._fila(i) for i in self._pendientes_en(None, limite)]
+            # Dos consultas paginadas: sin notificar y avisos constantes.
+            self._contar("pendientes", math.ceil(len(filas) / pagina_tamano) + 1)
+            return filas
+
+    def obtener_recordatorios_nuevos_en_ventana(
+        self, desde_fecha, hasta, desde_id, pagina_tamano=1000
+    ):
+        with self._lock:
+            limite = marca_tiempo_utc(hasta)
+            ids = set(self._pendientes_en(marca_tiempo_utc(desde_fecha), limite))
+            ids.update(
+                i for i in range(int(desde_id) + 1, len(self._fechas) + 1)
+                if not self._notificados[i - 1] and self._fechas[i - 1] <= limite
+            )
+            self._contar("ventana", math.ceil(len(ids) / pagina_tamano))
+            return [self._fila(i) for i in sorted(ids)]
+
+    def obtener_recordatorios_por_ids(self, lista_ids, tamano_lote=200):
+        lista_ids = list(lista_ids)
+        with self._lock:
+            self._contar("por_ids", math.ceil(len(lista_ids) / tamano_lote))
+            return [
+                self._fila(i) for i in lista_ids if 0 < int(i) <= len(self._fechas)
+            ]
+
+    def entregar_recordatorios(self, ids):
+        """Misma semántica que la RPC ``arv_entregar_recordatorios``."""
+        with self._lock:
+            self._contar("entregar")
+            ahora = datetime.fromtimestamp(self._reloj(), tz=timezone.utc)
+            creados = []
+            for recordatorio_id in ids:
+                if self._notificados[recordatorio_id - 1]:
+                    continue
+                self._notificados[recordatorio_id - 1] = 1
+                self.entregados += 1
+                serie = self._series.get(recordatorio_id)
+                if not serie or serie[2]:
+                    continue
+                serie[2] = True
+                siguiente, _ = siguiente_ocurrencia(
+                    datetime.fromtimestamp(self._fechas[recordatorio_id - 1], tz=timezone.utc),
+                    serie[0],
+                    serie[1],
+                    ahora=ahora,
+                )
+                if siguiente is not None:
+                    nuevo_id = self._insertar(
+                        siguiente.timestamp(),
+                        self._chats[recordatorio_id - 1],
+                        serie[0],
+                        serie[1],
+                    )
+                    creados.append(self._fila(nuevo_id))
+            return creados
+
+
+class TelegramFalso:
+    """Registra cada mensaje y los IDs de recordatorio de sus botones."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mensajes = 0
+        self.duplicados = 0
+        self._vistos = bytearray()  # 1 por ID ya enviado
+        self._ciclo = []
+
+    def enviar_mensaje_con_grid(self, chat_id, mensaje, filas, formato=None):
+        ids = {
+            int(m.group(1))
+            for fila in filas
+            for boton in fila
+            for m in [_ID_BOTON.match(boton.get("data", ""))]
+            if m
+        }
+        with self._lock:
+            self.mensajes += 1
+            self._ciclo.append((time.perf_counter(), ids))
+            for recordatorio_id in ids:
+                if recordatorio_id >= len(self._vistos):
+                    self._vistos.extend(bytes(recordatorio_id + 1 - len(self._vistos)))
+                if self._vistos[recordatorio_id]:
+                    self.duplicados += 1
+                self._vistos[recordatorio_id] = 1
+        return SimpleNamespace(ok=True, json=lambda: {"ok": True, "result": {}})
+
+    def vaciar_ciclo(self):
+        with self._lock:
+            ciclo, self._ciclo = self._ciclo, []
+        return ciclo
+
+
+def poblar(base, recordatorios, duracion, series=0, chats=None, rafaga=0.0,
+           semilla=1):
+    """
+    Carga ``recordatorios`` filas con vencimientos en ``[inicio, inicio + duracion)``.
+
+    Una fracción ``rafaga`` vence en punto (minuto 0 de cada hora), que es
+    como se comportan los recordatorios creados a mano; las primeras
+    ``series`` son repetibles cada 5 a 60 minutos.
+    """
+    aleatorio = random.Random(semilla)
+    chats = chats or max(1, recordatorios // 20)
+    inicio = INICIO_SIMULACION
+    horas = max(1, int(duracion // 3600))
+    for numero in range(recordatorios):
+        if aleatorio.random() < rafaga:
+            fecha = inicio + 3600 * aleatorio.randrange(horas)
+        else:
+            fecha = inicio + aleatorio.random() * duracion
+        if numero < series:
+            base.insertar(fecha, aleatorio.randrange(chats), "x", aleatorio.choice((5, 15, 30, 60)))
+        else:
+            base.insertar(fecha, aleatorio.randrange(chats))
+
+
+def _percentil(ordenados, fraccion):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(fraccion * len(ordenados)))]
+
+
+def simular(recordatorios=1000, duracion=3600, series=0, chats=None, rafaga=0.0,
+            latencia_bd=0.03, latencia_telegram=0.05, trabajadores=None,
+            semilla=1, silencioso=True):
+    """
+    Corre la simulación y devuelve un dict con las métricas.
+
+    El retraso de cada aviso es el momento virtual en que Telegram lo recibe
+    menos su ``fecha_hora``: el ciclo empieza a su hora, suma el tiempo real
+    de procesamiento hasta ese envío, la latencia de las lecturas previas y la
+    de los envíos que le precedieron en su hilo de despacho.
+    """
+    reloj = RelojVirtual()
+    base = SupabaseEnMemoria(reloj)
+    telegram = TelegramFalso()
+    poblar(base, recordatorios, duracion, series, chats, rafaga, semilla)
+    fin = INICIO_SIMULACION + duracion
+
+    sustituciones = [
+        patch.object(supabase_db, nombre, getattr(base, nombre))
+        for nombre in (
+            "obtener_recordatorios_pendientes",
+            "obtener_recordatorios_nuevos_en_ventana",
+            "obtener_recordatorios_por_ids",
+            "entregar_recordatorios",
+        )
+    ] + [
+        patch.object(supabase_db, "_rpc_entrega_disponible", True),
+        patch.object(reminders, "enviar_mensaje_con_grid", telegram.enviar_mensaje_con_grid),
+        patch.object(
+            reminders.conversations,
+            "inicializar_conversaciones",
+            lambda chat_id=None, nombre_usuario="": {
+                chat_id: {"datos": {"zona_horaria": "UTC"}}
+            },
+        ),
+        patch.object(reminders, "actualizar_estado_chat_id", lambda **_: None),
+    ]
+
+    retrasos = array("d")
+    ciclos = 0
+    inicio_real = time.perf_counter()
+    with contextlib.ExitStack() as pila:
+        for sustitucion in sustituciones:
+            pila.enter_context(sustitucion)
+        if silencioso:
+            pila.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+
+        tracemalloc.start()
+        try:
+            admin = reminders.AdministradorRecordatorios(reloj=reloj)
+            if trabajadores:
+                admin.despachador.trabajadores = int(trabajadores)
+            base_memoria = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+            while reloj.ahora < fin:
+                inicio_ciclo = reloj.ahora
+                t0 = time.perf_counter()
+                llamadas_previas = base.total_llamadas()
+                admin._ciclo_entregas()
+                ciclos += 1
+
+                enviados = telegram.vaciar_ciclo()
+                llamadas = base.total_llamadas() - llamadas_previas
+                # El acuse en bloque va al final: solo las lecturas preceden al envío.
+                lecturas = max(0, llamadas - (1 if enviados else 0))
+                por_hilo = max(1, admin.despachador.trabajadores)
+                for orden, (instante, ids) in enumerate(sorted(enviados)):
+                    llegada = (
+                        inicio_ciclo
+                        + (instante - t0)
+                        + lecturas * latencia_bd
+                        + (orden // por_hilo + 1) * latencia_telegram
+                    )
+                    for recordatorio_id in ids:
+                        retrasos.append(llegada - base.vencimiento(recordatorio_id))
+
+                costo = (
+                    (time.perf_counter() - t0)
+                    + llamadas * latencia_bd
+                    + math.ceil(len(enviados) / por_hilo) * latencia_telegram
+                )
+                reloj.avanzar(costo)
+                proximo = min(
+                    admin.cola.proximo_vencimiento() or fin,
+                    admin._proxima_recarga,
+                    admin._proxima_resincronizacion,
+                    fin,
+                )
+                if proximo > reloj.ahora:
+                    reloj.ahora = proximo
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            admin.despachador.detener()
+
+    ordenados = sorted(retrasos)
+    entregados = base.entregados
+    llamadas_totales = base.total_llamadas()
+    return {
+        "recordatorios": recordatorios,
+        "filas_finales": len(base),
+        "entregados": entregados,
+        "mensajes": telegram.mensajes,
+        "duplicados": telegram.duplicados,
+        "ciclos": ciclos,
+        "retraso_p50_s": round(_percentil(ordenados, 0.50), 3),
+        "retraso_p95_s": round(_percentil(ordenados, 0.95), 3),
+        "retraso_p99_s": round(_percentil(ordenados, 0.99), 3),
+        "retraso_max_s": round(ordenados[-1] if ordenados else 0.0, 3),
+        "llamadas_bd": dict(base.llamadas),
+        "llamadas_bd_por_recordatorio": round(llamadas_totales / max(1, entregados), 4),
+        "memoria_pico_mb": round(max(0, pico - base_memoria) / 2**20, 1),
+        "duracion_real_s": round(time.perf_counter() - inicio_real, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--recordatorios", type=int, default=1_000_000)
+    parser.add_argument("--duracion", type=int, default=86400,
+                        help="Segundos virtuales simulados (por defecto un día).")
+    parser.add_argument("--series", type=int, default=5000,
+                        help="Cuántos recordatorios son repetibles.")
+    parser.add_argument("--chats", type=int, default=None)
+    parser.add_argument("--rafaga", type=float, default=0.3,
+                        help="Fracción que vence en punto de cada hora.")
+    parser.add_argument("--latencia-bd", type=float, default=0.03)
+    parser.add_argument("--latencia-telegram", type=float, default=0.05)
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+    args = parser.parse_args()
+
+    resultado = simular(
+        recordatorios=args.recordatorios,
+        duracion=args.duracion,
+        series=args.series,
+        chats=args.chats,
+        rafaga=args.rafaga,
+        latencia_bd=args.latencia_bd,
+        latencia_telegram=args.latencia_telegram,
+        trabajadores=args.trabajadores,
+        semilla=args.semilla,
+    )
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+    for clave, valor in resultado.items():
+        print(f"{clave:>30}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
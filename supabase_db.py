@@ -5,6 +5,7 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 from utilidades import hora_utc_servidor_segun_zona_host
 from services import enviar_telegram
+import metricas
 import socket
 import time
 import logging
@@ -51,6 +52,33 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 supabase: Client = None
 _clientes_supabase_por_hilo = threading.local()
 
+# Funciones interesadas en altas/ediciones/bajas de recordatorios (p. ej. el
+# planificador). Reciben ("guardado", fila) o ("eliminado", {"id": ...}).
+_oyentes_recordatorios = []
+
+
+def suscribir_cambios_recordatorios(oyente):
+    """Registra ``oyente(evento, registro)`` para cambios hechos en este proceso."""
+    if oyente not in _oyentes_recordatorios:
+        _oyentes_recordatorios.append(oyente)
+
+
+def cancelar_suscripcion_recordatorios(oyente):
+    if oyente in _oyentes_recordatorios:
+        _oyentes_recordatorios.remove(oyente)
+
+
+def _notificar_cambio_recordatorio(evento, registros):
+    """Avisa a los oyentes sin dejar que un error suyo afecte la escritura."""
+    if isinstance(registros, dict):
+        registros = [registros]
+    for registro in registros or []:
+        for oyente in list(_oyentes_recordatorios):
+            try:
+                oyente(evento, registro)
+            except Exception as e:
+                print(f"[WARN] Oyente de recordatorios falló: {e}")
+
 
 def _obtener_cliente_supabase_por_hilo():
     """
@@ -64,7 +92,7 @@ def _obtener_cliente_supabase_por_hilo():
         return None
     cliente = getattr(_clientes_supabase_por_hilo, "cliente", None)
     if cliente is None:
-        cliente = create_client(SUPABASE_URL, SUPABASE_KEY)
+        cliente = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
         _clientes_supabase_por_hilo.cliente = cliente
     return cliente
 
@@ -77,7 +105,7 @@ def inicializar_supabase():
         return False
     
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
         
         # Intentar una operación ligera para validar la conexión real
         # create_client es "lazy" y no conecta hasta que se hace una petición.
@@ -126,36 +154,42 @@ def notificar_error_base_datos(e, chat_id_usuario=None):
         except Exception as err:
             print(f"Error al notificar al usuario {chat_id_usuario}: {err}")
 
+def _preparar_recordatorio(datos):
+    """Normaliza un recordatorio a las columnas que se insertan en Supabase."""
+    return {
+        "chat_id": str(datos["chat_id"]),
+        "usuario": datos["usuario"],
+        "nombre_tarea": datos["nombre_tarea"],
+        "descripcion": datos.get("descripcion"),
+        "fecha_hora": datos.get("fecha_hora"),
+        "creado_en": datos["creado_en"],
+        "es_formato_utc": datos.get("es_formato_utc", False),
+        "notificado": False,
+        "aviso_constante": datos.get("aviso_constante", False),
+        "aviso_detenido": datos.get("aviso_detenido", False), # Fix: Explicitamente enviar estado
+        "repetir": datos.get("repetir", False) in [True, "si", "yes", "y"],
+        "intervalo_repeticion": datos.get("intervalo_repeticion", ""),
+        "intervalos": int(datos.get("intervalos", 0)),
+        "repeticion_creada": False
+    }
+
+
 @con_reintentos(max_reintentos=3)
 def guardar_recordatorio(datos):
     """Guarda un nuevo recordatorio en Supabase con todos los campos necesarios."""
-    if not supabase:
-        if not inicializar_supabase():
-            return False
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return False
 
     try:
         # Preparar datos para inserción
-        recordatorio = {
-            "chat_id": str(datos["chat_id"]),
-            "usuario": datos["usuario"],
-            "nombre_tarea": datos["nombre_tarea"],
-            "descripcion": datos.get("descripcion"),
-            "fecha_hora": datos.get("fecha_hora"),
-            "creado_en": datos["creado_en"],
-            "es_formato_utc": datos.get("es_formato_utc", False),
-            "notificado": False,
-            "aviso_constante": datos.get("aviso_constante", False),
-            "aviso_detenido": datos.get("aviso_detenido", False), # Fix: Explicitamente enviar estado
-            "repetir": datos.get("repetir", False) in [True, "si", "yes", "y"],
-            "intervalo_repeticion": datos.get("intervalo_repeticion", ""),
-            "intervalos": int(datos.get("intervalos", 0)),
-            "repeticion_creada": False
-        }
+        recordatorio = _preparar_recordatorio(datos)
 
         # Insertar en la tabla recordatorios
-        response = supabase.table("recordatorios").insert(recordatorio).execute()
+        response = cliente.table("recordatorios").insert(recordatorio).execute()
 
         if response.data:
+            _notificar_cambio_recordatorio("guardado", response.data[0])
             return response.data[0]['id']
         else:
             print("Error: No se recibieron datos de respuesta al insertar")
@@ -167,6 +201,229 @@ def guardar_recordatorio(datos):
         return None
 
 
+def guardar_recordatorios(lista, tamano_lote=500):
+    """
+    Inserta varios recordatorios con un INSERT multi-fila por lote.
+
+    Devuelve las filas creadas (con ``id``) en el mismo orden que ``lista``.
+    Si un lote falla se detiene ahí: devuelve solo las filas de los lotes
+    anteriores, que ya quedaron guardadas (un prefijo de ``lista``), o None si
+    no se guardó ninguna. Quien llama debe comparar el largo del resultado con
+    el de ``lista`` y reintentar solo el resto.
+    """
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return None
+    if not lista:
+        return []
+
+    creados = []
+    try:
+        filas = [_preparar_recordatorio(datos) for datos in lista]
+        for i in range(0, len(filas), tamano_lote):
+            lote = filas[i:i + tamano_lote]
+            response = cliente.table("recordatorios").insert(lote).execute()
+            if len(response.data or []) != len(lote):
+                print(f"Error: el lote {i // tamano_lote + 1} no devolvió sus {len(lote)} filas")
+                break
+            creados.extend(response.data)
+    except Exception as e:
+        print(f"Error al guardar {len(lista)} recordatorios en bloque: {e}")
+    if not creados:
+        return None
+    _notificar_cambio_recordatorio("guardado", creados)
+    return creados
+
+
+def _actualizar_recordatorios_en_bloque(ids, campos, tamano_lote=200):
+    """UPDATE ... WHERE id IN (...) en lotes. Devuelve los IDs confirmados."""
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return None
+    confirmados = []
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), tamano_lote):
+        response = cliente.table("recordatorios") \
+            .update(campos) \
+            .in_("id", ids[i:i + tamano_lote]) \
+            .execute()
+        confirmados.extend(r["id"] for r in (response.data or []))
+    return confirmados
+
+
+@con_reintentos(max_reintentos=3)
+def marcar_como_notificados(ids):
+    """Marca varios recordatorios como notificados en una sola petición por lote."""
+    return _actualizar_recordatorios_en_bloque(ids, {"notificado": True})
+
+
+@con_reintentos(max_reintentos=3)
+def marcar_como_repetidos(ids):
+    """Marca varios recordatorios con ``repeticion_creada`` en bloque."""
+    return _actualizar_recordatorios_en_bloque(ids, {"repeticion_creada": True})
+
+
+# None: aún no se sabe si `arv_entregar_recordatorios` está instalada.
+_rpc_entrega_disponible = None
+
+
+def _es_funcion_inexistente(error):
+    """True si PostgREST/Postgres reporta que la RPC no existe."""
+    codigo = getattr(error, "code", None)
+    return codigo in ("PGRST202", "42883") or "Could not find the function" in str(error)
+
+
+def entregar_recordatorios(ids):
+    """
+    Llama a la RPC ``arv_entregar_recordatorios``: marca ``ids`` como
+    notificados y crea la siguiente ocurrencia de los repetibles en una sola
+    transacción. Devuelve las filas nuevas, o None si la llamada falló (la RPC
+    es idempotente, así que se puede repetir con los mismos IDs).
+    """
+    global _rpc_entrega_disponible
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return None
+    try:
+        response = cliente.rpc(
+            "arv_entregar_recordatorios", {"p_ids": list(ids)}
+        ).execute()
+    except Exception as e:
+        if _es_funcion_inexistente(e):
+            _rpc_entrega_disponible = False
+            print("[WARN] RPC arv_entregar_recordatorios no instalada; "
+                  "ejecuta setup_supabase.py. Se usan escrituras separadas.")
+        else:
+            print(f"Error en arv_entregar_recordatorios: {e}")
+        return None
+    _rpc_entrega_disponible = True
+    creados = response.data or []
+    _notificar_cambio_recordatorio("guardado", creados)
+    return creados
+
+
+class LoteConfirmaciones:
+    """
+    Acumula los resultados de un ciclo de despacho para confirmarlos juntos.
+
+    Los hilos de envío registran cada recordatorio notificado y cada siguiente
+    ocurrencia; ``confirmar`` los escribe con un UPDATE ``in_`` por columna y un
+    INSERT multi-fila, en vez de tres peticiones por recordatorio. Lo que no se
+    pudo confirmar queda en el lote para el siguiente intento. Registrar dos
+    veces el mismo ``id`` no duplica la escritura.
+
+    ``al_confirmar(ids)`` se llama con los IDs que Supabase ya marcó como
+    notificados.
+    """
+
+    def __init__(self, al_confirmar=None):
+        self._lock = threading.Lock()
+        self._notificados = {}
+        self._repeticiones = {}
+        self.al_confirmar = al_confirmar
+
+    def __len__(self):
+        with self._lock:
+            return len(self._notificados) + len(self._repeticiones)
+
+    def notificado(self, recordatorio_id):
+        with self._lock:
+            self._notificados[recordatorio_id] = True
+
+    def repeticion(self, origen_id, nuevo):
+        """Registra la siguiente ocurrencia ``nuevo`` de ``origen_id``."""
+        with self._lock:
+            self._repeticiones.setdefault(origen_id, nuevo)
+
+    def _devolver(self, notificados=(), repeticiones=()):
+        with self._lock:
+            for recordatorio_id in notificados:
+                self._notificados.setdefault(recordatorio_id, True)
+            for origen_id, nuevo in repeticiones:
+                self._repeticiones.setdefault(origen_id, nuevo)
+
+    def _avisar(self, ids):
+        if ids and self.al_confirmar:
+            try:
+                self.al_confirmar(list(ids))
+            except Exception as e:
+                print(f"Error en al_confirmar: {e}")
+
+    def confirmar(self, tamano_lote=500):
+        """
+        Escribe el lote en Supabase y devuelve las filas nuevas creadas.
+
+        Con la RPC ``arv_entregar_recordatorios`` instalada, cada bloque de IDs
+        se confirma en una transacción. Si no existe se usan escrituras
+        separadas: el original solo se marca como repetido si su siguiente
+        ocurrencia se insertó, para no cortar la serie si el INSERT falla.
+        """
+        with self._lock:
+            notificados = list(self._notificados)
+            repeticiones = list(self._repeticiones.items())
+            self._notificados, self._repeticiones = {}, {}
+
+        if notificados and _rpc_entrega_disponible is not False:
+            creados, confirmados, fallidos = [], [], []
+            for i in range(0, len(notificados), tamano_lote):
+                bloque = notificados[i:i + tamano_lote]
+                nuevos = entregar_recordatorios(bloque)
+                if nuevos is not None:
+                    creados.extend(nuevos)
+                    confirmados.extend(bloque)
+                elif _rpc_entrega_disponible is False:
+                    break  # No instalada: el resto va por escrituras separadas
+                else:
+                    fallidos.extend(bloque)
+            self._avisar(confirmados)
+
+            hechos = set(confirmados)
+            if _rpc_entrega_disponible is not False:
+                pendientes = set(fallidos)
+                self._devolver(
+                    fallidos, [r for r in repeticiones if r[0] in pendientes]
+                )
+                return creados
+            notificados = [n for n in notificados if n not in hechos]
+            repeticiones = [r for r in repeticiones if r[0] not in hechos]
+            return creados + self._confirmar_por_separado(notificados, repeticiones)
+
+        return self._confirmar_por_separado(notificados, repeticiones)
+
+    def _confirmar_por_separado(self, notificados, repeticiones):
+        """Escritura sin RPC: INSERT multi-fila y un UPDATE ``in_`` por columna."""
+        creados = []
+        if repeticiones:
+            try:
+                creados = guardar_recordatorios([n for _, n in repeticiones])
+            except Exception as e:
+                print(f"Error al insertar repeticiones en bloque: {e}")
+                creados = None
+            if creados is None or len(creados) != len(repeticiones):
+                # Se guardó un prefijo: solo el resto vuelve al lote.
+                self._devolver(repeticiones=repeticiones[len(creados or []):])
+                creados = creados or []
+            origenes = [origen for origen, _ in repeticiones[:len(creados)]]
+            if origenes:
+                try:
+                    marcar_como_repetidos(origenes)
+                except Exception as e:
+                    print(f"Error al marcar repeticiones en bloque: {e}")
+
+        if notificados:
+            try:
+                confirmados = marcar_como_notificados(notificados)
+            except Exception as e:
+                print(f"Error al marcar notificados en bloque: {e}")
+                confirmados = None
+            if confirmados is None:
+                self._devolver(notificados)
+            else:
+                self._avisar(confirmados)
+
+        return creados
+
+
 # def obtener_recordatorios_pendientes():
 #     """Obtiene todos los recordatorios pendientes de notificar, incluyendo los que deben repetirse constantemente"""
 #     if not supabase:
@@ -205,31 +462,37 @@ def guardar_recordatorio(datos):
 #         print(f"Error al obtener recordatorios pendientes: {e}")
 #         return []
     
-def obtener_recordatorios_por_ids(lista_ids):
-    """Obtiene los recordatorios desde Supabase que coinciden con los IDs dados."""
-    if not supabase:
-        if not inicializar_supabase():
-            return None
+def obtener_recordatorios_por_ids(lista_ids, tamano_lote=200):
+    """
+    Obtiene los recordatorios desde Supabase que coinciden con los IDs dados.
+
+    Los IDs se consultan en lotes para no exceder el largo de URL de PostgREST.
+    """
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return None
 
     if not lista_ids:
         print("La lista de IDs está vacía.")
         return []
 
     try:
-        # Usar la cláusula `in_` para filtrar por múltiples IDs
-        response = (
-            supabase
-            .table("recordatorios")
-            .select("*")
-            .in_("id", lista_ids)
-            .execute()
-        )
+        encontrados = []
+        lista_ids = list(lista_ids)
+        for i in range(0, len(lista_ids), tamano_lote):
+            # Usar la cláusula `in_` para filtrar por múltiples IDs
+            response = (
+                cliente
+                .table("recordatorios")
+                .select("*")
+                .in_("id", lista_ids[i:i + tamano_lote])
+                .execute()
+            )
+            encontrados.extend(response.data or [])
 
-        if response.data:
-            return response.data
-        else:
+        if not encontrados:
             print("No se encontraron recordatorios con los IDs proporcionados.")
-            return []
+        return encontrados
 
     except Exception as e:
         print(f"Error al obtener recordatorios por IDs desde Supabase: {e}")
@@ -284,6 +547,7 @@ def aplazar_recordatorio(recordatorio_id, chat_id, nueva_fecha_hora):
             .eq("chat_id", str(chat_id))
             .execute()
         )
+        _notificar_cambio_recordatorio("guardado", response.data)
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error al aplazar recordatorio {recordatorio_id} para {chat_id}: {e}")
@@ -296,14 +560,7 @@ def obtener_todos_los_ids_recordatorios():
         if not inicializar_supabase():
             return []
     try:
-        # Paginación automática si son muchos, o traer solo IDs
-        # Supabase py client a veces trunca, pero 'select' sin limit puede ser peligroso.
-        # Mejor usar paginación básica o un limit alto si son pocos usuarios.
-        # Asumimos < 10000 por ahora.
-        response = supabase.table("recordatorios").select("id").execute()
-        if response.data:
-            return [r['id'] for r in response.data]
-        return []
+        return [r["id"] for r in iterar_tabla("recordatorios", "id")]
     except Exception as e:
         print(f"Error al obtener todos los IDs: {e}")
         return []
@@ -331,71 +588,157 @@ def guardar_reporte(datos):
         return None
 
 
+def _aplicar_filtros(query, filtros):
+    """Aplica filtros ``(columna, operador, valor)`` a una consulta de PostgREST."""
+    for columna, operador, valor in filtros:
+        if operador == "eq":
+            query = query.eq(columna, valor)
+        elif operador == "lte":
+            query = query.lte(columna, valor)
+        elif operador == "gt":
+            query = query.gt(columna, valor)
+        elif operador == "gte":
+            query = query.gte(columna, valor)
+        elif operador == "or":
+            query = query.or_(valor)
+    return query
+
+
+def iterar_tabla(tabla, columnas="*", clave="id", filtros=(), pagina_tamano=1000,
+                 cliente=None):
+    """
+    Recorre una tabla completa con paginación por clave
+    (``clave > ultima ORDER BY clave LIMIT pagina_tamano``), una página en
+    memoria a la vez.
+
+    ``columnas`` es la proyección del ``select``; la clave se agrega si falta.
+    ``pagina_tamano`` no debe superar el ``max-rows`` de PostgREST (1000 en
+    Supabase): una página más corta se toma como la última. Los errores de
+    Supabase se propagan al consumidor.
+    """
+    cliente = cliente or supabase
+    if cliente is None:
+        if not inicializar_supabase():
+            raise RuntimeError("Supabase no está disponible")
+        cliente = supabase
+    if columnas != "*" and clave not in [c.strip() for c in columnas.split(",")]:
+        columnas = f"{clave},{columnas}"
+
+    ultima = None
+    while True:
+        query = _aplicar_filtros(cliente.table(tabla).select(columnas), filtros)
+        if ultima is not None:
+            query = query.gt(clave, ultima)
+        datos = query.order(clave).limit(pagina_tamano).execute().data or []
+        yield from datos
+        if len(datos) < pagina_tamano:
+            return
+        ultima = datos[-1][clave]
+
+
+def _leer_recordatorios_paginados(filtros, pagina_tamano=1000, resultados=None):
+    """
+    Lee ``recordatorios`` aplicando filtros ``(columna, operador, valor)`` y
+    paginando con ``range``. Acumula en ``resultados`` indexado por ``id``.
+    """
+    resultados = {} if resultados is None else resultados
+    pagina = 0
+    while True:
+        desde = pagina * pagina_tamano
+        hasta = desde + pagina_tamano - 1
+        query = supabase \
+            .from_("recordatorios") \
+            .select("*") \
+            .order("id") \
+            .range(desde, hasta)
+
+        query = _aplicar_filtros(query, filtros)
+        response = query.execute()
+
+        if not response.data:
+            break  # ya no hay más
+        for r in response.data:
+            resultados[r["id"]] = r
+        if len(response.data) < pagina_tamano:
+            break
+        pagina += 1
+    return resultados
+
+
 @con_reintentos(max_reintentos=2)
-def obtener_recordatorios_pendientes(pagina_tamano=1000):
-    """Obtiene todos los recordatorios pendientes de notificar, incluyendo los que deben repetirse constantemente, con paginación."""
+def obtener_recordatorios_pendientes(pagina_tamano=1000, hasta=None):
+    """
+    Obtiene todos los recordatorios pendientes de notificar, incluyendo los que
+    deben repetirse constantemente, con paginación.
+
+    ``hasta`` (ISO UTC) amplía la consulta a una ventana futura; por defecto
+    solo se leen los ya vencidos.
+
+    Retorna None si la consulta falla, para distinguirlo de una ventana vacía.
+    """
     if not supabase:
         if not inicializar_supabase():
-            return []
+            return None
 
     try:
-        ahora = hora_utc_servidor_segun_zona_host().isoformat()
+        limite = hasta or hora_utc_servidor_segun_zona_host().isoformat()
         resultados = {}
 
-        def fetch_con_paginacion(filtros):
-            pagina = 0
-            while True:
-                desde = pagina * pagina_tamano
-                hasta = desde + pagina_tamano - 1
-                query = supabase \
-                    .from_("recordatorios") \
-                    .select("*") \
-                    .range(desde, hasta)
-
-                # Aplicar filtros
-                for columna, operador, valor in filtros:
-                    if operador == "eq":
-                        query = query.eq(columna, valor)
-                    elif operador == "lte":
-                        query = query.lte(columna, valor)
-
-                response = query.execute()
-
-                if not response.data:
-                    break  # ya no hay más
-                for r in response.data:
-                    resultados[r["id"]] = r
-                pagina += 1
-
         # Grupo 1: no notificado y fecha vencida
-        fetch_con_paginacion([
+        _leer_recordatorios_paginados([
             ("notificado", "eq", False),
-            ("fecha_hora", "lte", ahora)
-        ])
+            ("fecha_hora", "lte", limite)
+        ], pagina_tamano, resultados)
 
         # Grupo 2: aviso constante, no detenido, y fecha vencida
-        fetch_con_paginacion([
+        _leer_recordatorios_paginados([
             ("aviso_constante", "eq", True),
             ("aviso_detenido", "eq", False),
-            ("fecha_hora", "lte", ahora)
-        ])
+            ("fecha_hora", "lte", limite)
+        ], pagina_tamano, resultados)
 
         return list(resultados.values())
 
     except Exception as e:
         print(f"Error al obtener recordatorios pendientes: {e}")
-        return []
+        return None
+
+
+@con_reintentos(max_reintentos=2)
+def obtener_recordatorios_nuevos_en_ventana(desde_fecha, hasta, desde_id, pagina_tamano=1000):
+    """
+    Lectura incremental para el planificador: recordatorios sin notificar con
+    ``fecha_hora <= hasta`` que entraron a la ventana (``fecha_hora > desde_fecha``)
+    o que se crearon después de la última carga (``id > desde_id``).
+
+    Retorna None si la consulta falla, para distinguirlo de "sin cambios".
+    """
+    if not supabase:
+        if not inicializar_supabase():
+            return None
+
+    try:
+        resultados = _leer_recordatorios_paginados([
+            ("notificado", "eq", False),
+            ("fecha_hora", "lte", hasta),
+            ("or", "or", f"fecha_hora.gt.{desde_fecha},id.gt.{int(desde_id)}"),
+        ], pagina_tamano)
+        return list(resultados.values())
+
+    except Exception as e:
+        print(f"Error al obtener recordatorios nuevos de la ventana: {e}")
+        return None
 
 
 @con_reintentos(max_reintentos=3)
 def marcar_como_notificado(recordatorio_id):
     """Marca un recordatorio como notificado"""
-    if not supabase:
-        if not inicializar_supabase():
-            return False
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return False
     
     try:
-        response = supabase.table("recordatorios").update({"notificado": True}).eq("id", recordatorio_id).execute()
+        response = cliente.table("recordatorios").update({"notificado": True}).eq("id", recordatorio_id).execute()
         
         if response.data:
             return True
@@ -410,12 +753,12 @@ def marcar_como_notificado(recordatorio_id):
 @con_reintentos(max_reintentos=3)
 def marcar_como_repetido(recordatorio_id):
     """Marca un recordatorio como repetido"""
-    if not supabase:
-        if not inicializar_supabase():
-            return False
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return False
 
     try:
-        response = supabase.table("recordatorios").update({"repeticion_creada": True}).eq("id", recordatorio_id).execute()
+        response = cliente.table("recordatorios").update({"repeticion_creada": True}).eq("id", recordatorio_id).execute()
         
         if response.data:
             return True
@@ -449,6 +792,7 @@ def cambiar_estado_aviso_detenido(chat_id, estado):
             .execute()
         
         if response.data:
+            _notificar_cambio_recordatorio("guardado", response.data)
             print(f"Estado 'aviso_detenido' actualizado correctamente a {estado} para el chat_id {chat_id}.")
             return True
         else:
@@ -488,7 +832,7 @@ def eliminar_recordatorios_finalizados():
         return False
 
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        supabase = metricas.instrumentar_supabase(create_client(SUPABASE_URL, SUPABASE_KEY))
 
         sql = """
         DELETE FROM recordatorios
@@ -516,6 +860,7 @@ def eliminar_recordatorio_por_id(recordatorio_id):
         response = supabase.table("recordatorios").delete().eq("id", recordatorio_id).execute()
         
         if response.data:  # Verifica si algo fue eliminado
+            _notificar_cambio_recordatorio("eliminado", response.data)
             print(f"✅ Recordatorio con ID {recordatorio_id} eliminado correctamente.")
             return True
         else:
@@ -609,11 +954,11 @@ def obtener_info_chat(chat_id):
     Retorna un diccionario con la información si existe, o None si no se encuentra.
     """
 
-    if not supabase:
-        if not inicializar_supabase():
-            return []
+    cliente = _obtener_cliente_supabase_por_hilo()
+    if not cliente:
+        return None
     try:
-        response = supabase.table("chats_info").select("*").eq("chat_id", chat_id).single().execute()
+        response = cliente.table("chats_info").select("*").eq("chat_id", chat_id).single().execute()
         if response.data:
             return response.data
         else:
@@ -625,8 +970,7 @@ def obtener_info_chat(chat_id):
 def obtener_chat_ids_de_recordatorios():
     """Devuelve un conjunto de chat_id únicos desde la tabla 'recordatorios'."""
     try:
-        response = supabase.table("recordatorios").select("chat_id").execute()
-        return set([r["chat_id"] for r in response.data])
+        return {r["chat_id"] for r in iterar_tabla("recordatorios", "chat_id")}
     except Exception as e:
         print(f"[Error] al obtener chat_id de recordatorios: {e}")
         return set()
@@ -634,8 +978,7 @@ def obtener_chat_ids_de_recordatorios():
 def obtener_chat_ids_existentes_en_tabla(tabla):
     """Devuelve un conjunto de chat_id existentes en una tabla dada."""
     try:
-        response = supabase.table(tabla).select("chat_id").execute()
-        return set([c["chat_id"] for c in response.data])
+        return {c["chat_id"] for c in iterar_tabla(tabla, "chat_id", clave="chat_id")}
     except Exception as e:
         print(f"[Error] al obtener chat_id de {tabla}: {e}")
         return set()
@@ -812,13 +1155,14 @@ def actualizar_recordatorios_por_chat(chat_id: str) -> bool:
             nueva_fecha = dt_utc.isoformat()
 
             # 4) Actualizar fecha_hora y marcar como UTC
-            supabase.table("recordatorios") \
+            response = supabase.table("recordatorios") \
                    .update({
                        "fecha_hora": nueva_fecha,
                        "es_formato_utc": True
                    }) \
                    .eq("id", rec["id"]) \
                    .execute()
+            _notificar_cambio_recordatorio("guardado", response.data)
             updated += 1
 
         print(f"✅ Se actualizaron {updated} recordatorio(s) de chat {chat_id} a UTC.")
@@ -849,6 +1193,7 @@ def actualizar_campos_recordatorio(recordatorio_id: int, campos: dict) -> bool:
                            .eq("id", recordatorio_id) \
                            .execute()
         if response.data:
+            _notificar_cambio_recordatorio("guardado", response.data)
             print(f"✅ Recordatorio {recordatorio_id} actualizado: {campos}")
             return True
         else:
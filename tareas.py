@@ -0,0 +1,97 @@
+"""Ejecución de los jobs de mantenimiento fuera del bucle de ``schedule``."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metricas
+
+
+# Jobs de mantenimiento que pueden correr a la vez (backup, avisos, zonas).
+REMINDER_JOB_WORKERS = max(1, int(os.getenv("REMINDER_JOB_WORKERS", "2")))
+
+
+class EjecutorTareas:
+    """
+    Pool acotado para los jobs de mantenimiento.
+
+    ``lanzar`` regresa de inmediato, así que el bucle de ``schedule`` nunca se
+    queda esperando un backup. Como mucho corren ``trabajadores`` jobs a la
+    vez y cada nombre tiene una sola ejecución en curso o en cola: si al
+    tocarle otra vez la anterior no ha terminado, la nueva se omite en lugar de
+    acumularse. Un job que tarda más que su ``limite`` se reporta al terminar
+    (los hilos no se pueden interrumpir).
+    """
+
+    def __init__(self, trabajadores=REMINDER_JOB_WORKERS, reloj=time.monotonic):
+        self.trabajadores = max(1, int(trabajadores))
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._executor = None
+        self._en_curso = {}
+
+    def _obtener_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.trabajadores,
+                thread_name_prefix="maintenance-job",
+            )
+        return self._executor
+
+    def en_curso(self):
+        """Nombres de los jobs en ejecución o en cola."""
+        with self._lock:
+            return sorted(self._en_curso)
+
+    def lanzar(self, nombre, funcion, *args, limite=None):
+        """
+        Encola ``funcion(*args)`` como el job ``nombre``. Devuelve el futuro,
+        o None si ya había una ejecución de ``nombre`` pendiente.
+        """
+        with self._lock:
+            if nombre in self._en_curso:
+                desde = self._reloj() - self._en_curso[nombre]
+                print(
+                    f"[WARN] Job '{nombre}' sigue en curso tras {desde:.0f}s; "
+                    "se omite esta ejecución"
+                )
+                metricas.EJECUCIONES_TAREA.inc(tarea=nombre, resultado="omitida")
+                return None
+            self._en_curso[nombre] = self._reloj()
+            executor = self._obtener_executor()
+            metricas.TAREAS_EN_CURSO.fijar(len(self._en_curso))
+        return executor.submit(self._correr, nombre, funcion, args, limite)
+
+    def _correr(self, nombre, funcion, args, limite):
+        inicio = self._reloj()
+        resultado, estado = None, "ok"
+        try:
+            resultado = funcion(*args)
+        except Exception as e:
+            print(f"[ERROR] Job '{nombre}': {e}")
+            estado = "error"
+        finally:
+            duracion = self._reloj() - inicio
+            with self._lock:
+                self._en_curso.pop(nombre, None)
+                metricas.TAREAS_EN_CURSO.fijar(len(self._en_curso))
+            metricas.EJECUCIONES_TAREA.inc(tarea=nombre, resultado=estado)
+            metricas.DURACION_TAREA.fijar(duracion, tarea=nombre)
+            if limite and duracion > limite:
+                print(
+                    f"[WARN] Job '{nombre}' tardó {duracion:.0f}s "
+                    f"(límite {limite}s): se solapa con su siguiente ejecución"
+                )
+        return resultado
+
+    def detener(self, esperar=False):
+        """Descarta lo que siga en cola; los jobs ya iniciados terminan solos."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=esperar, cancel_futures=True)
+        with self._lock:
+            self._en_curso.clear()
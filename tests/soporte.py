@@ -0,0 +1,50 @@
+"""Datos y dobles compartidos por las pruebas del planificador de recordatorios."""
+
+import os
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from planificador import iso_utc, marca_tiempo_utc
+
+
+BASE = marca_tiempo_utc("2026-07-24T12:00:00+00:00")
+
+
+def registro(record_id, segundos=-60, **extra):
+    """Fila de recordatorio pendiente que vence ``segundos`` después de ``BASE``."""
+    record = {
+        "id": record_id,
+        "chat_id": "42",
+        "usuario": "ana",
+        "nombre_tarea": "Agua",
+        "descripcion": "Beber",
+        "fecha_hora": iso_utc(BASE + segundos),
+        "notificado": False,
+        "aviso_constante": False,
+        "aviso_detenido": False,
+    }
+    record.update(extra)
+    return record
+
+
+class RelojFijo:
+    """Reloj que las pruebas avanzan a mano asignando ``ahora``."""
+
+    def __init__(self, ahora=BASE):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+
+def administrador(reloj=None, horizonte=900, **kwargs):
+    """``AdministradorRecordatorios`` con reloj fijo y una ventana ya cargada."""
+    admin = reminders.AdministradorRecordatorios(reloj=reloj or RelojFijo(), **kwargs)
+    admin._horizonte = BASE + horizonte
+    return admin
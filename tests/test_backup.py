@@ -0,0 +1,296 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import backup_db
+from planificador import iso_utc, marca_tiempo_utc
+from supabase_db import iterar_tabla
+
+
+# Postgres desechable para las pruebas de integración: se recrean sus tablas.
+BACKUP_TEST_DSN = os.getenv("BACKUP_TEST_DSN", "")
+
+BASE = marca_tiempo_utc("2026-07-24T12:00:00+00:00")
+
+
+class ConsultaFalsa:
+    """Subconjunto del query builder de supabase-py sobre una lista de dicts."""
+
+    def __init__(self, filas, registro):
+        self._filas = filas
+        self._registro = registro
+        self._columnas = None
+        self._filtros = []
+        self._orden = []
+        self._limite = None
+        self._contar = False
+
+    def select(self, columnas, count=None):
+        self._contar = count == "exact"
+        if columnas != "*":
+            self._columnas = [c.strip() for c in columnas.split(",")]
+        return self
+
+    def gte(self, columna, valor):
+        self._filtros.append(
+            lambda f: marca_tiempo_utc(f.get(columna)) >= marca_tiempo_utc(valor)
+        )
+        return self
+
+    def gt(self, columna, valor):
+        self._filtros.append(lambda f: f.get(columna) > valor)
+        return self
+
+    def order(self, columna, desc=False):
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, limite):
+        self._limite = limite
+        return self
+
+    def execute(self):
+        self._registro.append(self)
+        filas = [f for f in self._filas if all(filtro(f) for filtro in self._filtros)]
+        total = len(filas)
+        for columna, desc in reversed(self._orden):
+            filas.sort(key=lambda f: f.get(columna), reverse=desc)
+        if self._limite:
+            filas = filas[:self._limite]
+        if self._columnas:
+            filas = [{c: f.get(c) for c in self._columnas} for f in filas]
+        return SimpleNamespace(
+            data=[dict(f) for f in filas], count=total if self._contar else None
+        )
+
+
+class SupabaseFalso:
+    def __init__(self, tablas):
+        self.tablas = tablas
+        self.consultas = []
+
+    def table(self, nombre):
+        return ConsultaFalsa(self.tablas.setdefault(nombre, []), self.consultas)
+
+
+def _recordatorio(record_id, actualizado):
+    return {
+        "id": record_id,
+        "chat_id": "42",
+        "usuario": "ana",
+        "nombre_tarea": f"Tarea {record_id}",
+        "fecha_hora": iso_utc(BASE + 3600),
+        "notificado": False,
+        "actualizado_en": iso_utc(actualizado),
+    }
+
+
+class LecturaSupabaseTests(unittest.TestCase):
+    def test_incremental_read_pages_only_rows_changed_since_watermark(self):
+        filas = [_recordatorio(i, BASE - 3600) for i in range(1, 6)]
+        filas += [_recordatorio(i, BASE) for i in range(6, 9)]
+        supabase = SupabaseFalso({"recordatorios": filas})
+
+        leidas = backup_db._leer_supabase(
+            supabase, "recordatorios", desde=iso_utc(BASE - 60), pagina_tamano=2
+        )
+
+        self.assertEqual([f["id"] for f in leidas], [6, 7, 8])
+        self.assertEqual(len(supabase.consultas), 2)
+
+    def test_keyset_pagination_adds_key_to_projection_and_stops_on_short_page(self):
+        filas = [_recordatorio(i, BASE) for i in range(1, 8)]
+        supabase = SupabaseFalso({"recordatorios": filas})
+
+        leidas = iterar_tabla("recordatorios", "chat_id", pagina_tamano=3, cliente=supabase)
+
+        self.assertEqual(next(leidas), {"id": 1, "chat_id": "42"})
+        self.assertEqual(len(supabase.consultas), 1)  # Una página a la vez
+        self.assertEqual([f["id"] for f in leidas], [2, 3, 4, 5, 6, 7])
+        self.assertEqual(len(supabase.consultas), 3)
+
+    def test_reconciliation_runs_without_watermark_or_when_due(self):
+        ahora = backup_db.datetime(2026, 7, 24, 12, tzinfo=backup_db.timezone.utc)
+        hace = lambda horas: ahora - backup_db.timedelta(hours=horas)
+        self.assertTrue(backup_db._toca_conciliar(None, hace(0), ahora))
+        self.assertTrue(backup_db._toca_conciliar("2026-07-24T11:00:00+00:00", None, ahora))
+        self.assertFalse(backup_db._toca_conciliar("2026-07-24T11:00:00+00:00", hace(1), ahora))
+        self.assertTrue(backup_db._toca_conciliar("2026-07-24T11:00:00+00:00", hace(7), ahora))
+
+    def test_copy_stream_escapes_fields_and_honours_read_size(self):
+        filas = [
+            {"id": 1, "texto": "a\tb\\c\nd", "ok": True, "extra": {"k": 1}},
+            {"id": 2, "texto": None, "ok": False, "extra": None},
+        ]
+        lector = backup_db._LectorCopy(filas, ["id", "texto", "ok", "extra"])
+
+        partes = []
+        while parte := lector.read(5):
+            self.assertLessEqual(len(parte), 5)
+            partes.append(parte)
+
+        self.assertEqual(
+            "".join(partes),
+            '1\ta\\tb\\\\c\\nd\tt\t{"k": 1}\n'
+            "2\t\\N\tf\t\\N\n",
+        )
+
+
+@patch("supabase_db._obtener_cliente_supabase_por_hilo", new=lambda: object())
+@patch("supabase_db.supabase", new=object())
+@patch.object(backup_db, "_asegurar_esquema_incremental", new=lambda conn: None)
+@patch.object(backup_db, "_asegurar_esquema_cripto", new=lambda conn: None)
+@patch.object(backup_db, "_get_pg_connection", new=lambda: MagicMock())
+class EjecutarBackupTests(unittest.TestCase):
+    def test_tables_run_in_parallel_on_their_own_connections(self):
+        hilos = set()
+
+        def copiar(cliente, conn, tabla, fin=None, detener=None):
+            hilos.add(threading.get_ident())
+            time.sleep(0.2)
+            return 1
+
+        with patch.object(backup_db, "backup_tabla", side_effect=copiar):
+            inicio = time.monotonic()
+            resultados = backup_db.ejecutar_backup(trabajadores=8)
+            duracion = time.monotonic() - inicio
+
+        self.assertEqual(set(resultados.values()), {1})
+        self.assertEqual(len(hilos), len(backup_db.TABLAS_A_RESPALDAR))
+        self.assertLess(duracion, 0.2 * 3)
+
+    def test_deadline_stops_waiting_for_slow_tables(self):
+        liberar = threading.Event()
+
+        def copiar(cliente, conn, tabla, fin=None, detener=None):
+            if tabla == "recordatorios":
+                liberar.wait(2)
+            return 0
+
+        with patch.object(backup_db, "backup_tabla", side_effect=copiar):
+            inicio = time.monotonic()
+            resultados = backup_db.ejecutar_backup(trabajadores=2, plazo=0.2)
+            duracion = time.monotonic() - inicio
+        liberar.set()
+
+        self.assertLess(duracion, 1)
+        self.assertEqual(resultados["recordatorios"], -1)
+        self.assertEqual(resultados["chats_info"], 0)
+
+    def test_late_tables_are_told_to_stop_and_block_the_next_cycle(self):
+        detenidas = []
+        liberar = threading.Event()
+
+        def copiar(cliente, conn, tabla, fin=None, detener=None):
+            if tabla == "recordatorios" and not liberar.is_set():
+                detener.wait(2)
+                detenidas.append(detener.is_set())
+                liberar.wait(2)
+                return -1
+            return 0
+
+        with patch.object(backup_db, "backup_tabla", side_effect=copiar):
+            backup_db.ejecutar_backup(trabajadores=2, plazo=0.2)
+            self.assertEqual(backup_db.ejecutar_backup(trabajadores=2, plazo=0.2), {})
+            liberar.set()
+            for futuro in list(backup_db._rezagados):
+                futuro.result(2)
+            resultados = backup_db.ejecutar_backup(trabajadores=8, plazo=5)
+
+        self.assertEqual(detenidas, [True])
+        self.assertEqual(set(resultados), set(backup_db.TABLAS_A_RESPALDAR))
+
+
+@unittest.skipUnless(BACKUP_TEST_DSN, "BACKUP_TEST_DSN no definido")
+class BackupIncrementalPostgresTests(unittest.TestCase):
+    def setUp(self):
+        import psycopg2
+
+        self.conn = psycopg2.connect(BACKUP_TEST_DSN)
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "DROP TABLE IF EXISTS _backup_metadata, "
+                + ", ".join(backup_db.TABLAS_A_RESPALDAR)
+            )
+            cursor.execute((PROJECT_ROOT / "init_backup_db.sql").read_text("utf-8"))
+        self.conn.commit()
+        backup_db._asegurar_esquema_incremental(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _contar(self, sql):
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_second_run_copies_only_changes_and_reconciles_deletions(self):
+        # Ediciones espaciadas un minuto; la última fue hace 20 minutos.
+        filas = [_recordatorio(i, BASE - 7200 + 60 * i) for i in range(1, 101)]
+        supabase = SupabaseFalso({"recordatorios": filas})
+        with patch.object(backup_db, "BACKUP_BATCH_ROWS", 30):
+            self.assertEqual(backup_db.backup_tabla(supabase, self.conn, "recordatorios"), 100)
+
+        filas[0].update(notificado=True, actualizado_en=iso_utc(BASE))
+        filas.append(_recordatorio(101, BASE))
+        del filas[50]
+        with patch.object(backup_db, "BACKUP_RECONCILE_HOURS", 0):
+            copiados = backup_db.backup_tabla(supabase, self.conn, "recordatorios")
+
+        # Las dos filas cambiadas más las 3 que caen en el margen de relectura.
+        self.assertEqual(copiados, 2 + 3)
+        self.assertEqual(self._contar("SELECT COUNT(*) FROM recordatorios"), 100)
+        self.assertTrue(self._contar("SELECT notificado FROM recordatorios WHERE id = 1"))
+        self.assertEqual(
+            self._contar(
+                "SELECT registros_eliminados FROM _backup_metadata "
+                "WHERE tabla = 'recordatorios'"
+            ),
+            1,
+        )
+        self.assertTrue(
+            self._contar(
+                "SELECT duracion_segundos IS NOT NULL FROM _backup_metadata "
+                "WHERE tabla = 'recordatorios'"
+            )
+        )
+
+    def test_unchanged_table_is_skipped_until_its_fingerprint_changes(self):
+        filas = [_recordatorio(i, BASE - 7200 + 60 * i) for i in range(1, 11)]
+        supabase = SupabaseFalso({"recordatorios": filas})
+        backup_db.backup_tabla(supabase, self.conn, "recordatorios")
+
+        supabase.consultas.clear()
+        self.assertEqual(backup_db.backup_tabla(supabase, self.conn, "recordatorios"), 0)
+        self.assertEqual(len(supabase.consultas), 2)  # Solo la huella
+
+        # La baja cambia la huella y el conteo: se concilia sin esperar 6 h.
+        del filas[3]
+        self.assertEqual(backup_db.backup_tabla(supabase, self.conn, "recordatorios"), 3)
+        self.assertEqual(self._contar("SELECT COUNT(*) FROM recordatorios"), 9)
+
+    def test_incompatible_row_falls_back_to_row_by_row_copy(self):
+        filas = [_recordatorio(i, BASE) for i in range(1, 11)]
+        filas[4]["fecha_hora"] = "no es una fecha"
+        supabase = SupabaseFalso({"recordatorios": filas})
+
+        with self.assertLogs("backup_db", "WARNING") as registros:
+            copiados = backup_db.backup_tabla(supabase, self.conn, "recordatorios")
+
+        self.assertEqual(copiados, 9)
+        self.assertEqual(self._contar("SELECT COUNT(*) FROM recordatorios"), 9)
+        self.assertIn("COPY falló", registros.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
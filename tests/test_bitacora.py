@@ -0,0 +1,151 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from bitacora import BitacoraEntregas
+from planificador import iso_utc
+from soporte import BASE, administrador, registro
+
+
+class BitacoraTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, "entregas.db")
+        self.bitacora = BitacoraEntregas(self.ruta, reloj=lambda: BASE)
+
+    def tearDown(self):
+        self.bitacora.cerrar()
+        self.directorio.cleanup()
+
+    def _reabrir(self):
+        """Simula un reinicio del proceso."""
+        self.bitacora.cerrar()
+        self.bitacora = BitacoraEntregas(self.ruta, reloj=lambda: BASE)
+
+
+class BitacoraEntregasTests(BitacoraTestCase):
+    def test_started_send_is_not_repeated_after_restart(self):
+        self.assertTrue(self.bitacora.registrar_intento(registro(1)))
+        self._reabrir()  # Caída antes de conocer el resultado
+
+        self.assertFalse(self.bitacora.registrar_intento(registro(1)))
+        self.assertEqual([p["id"] for p in self.bitacora.pendientes()], [1])
+
+    def test_failed_send_can_be_retried_and_snooze_is_a_new_occurrence(self):
+        self.bitacora.registrar_intento(registro(1))
+        self.bitacora.registrar_resultado(registro(1), exito=False)
+        self.assertTrue(self.bitacora.registrar_intento(registro(1)))
+
+        self.bitacora.registrar_resultado(registro(1), exito=True)
+        self.bitacora.confirmar([1])
+        self.assertFalse(self.bitacora.registrar_intento(registro(1)))
+        self.assertTrue(self.bitacora.registrar_intento(registro(1, fecha_hora=iso_utc(BASE))))
+        self.assertEqual(self.bitacora.purgar(dias=0), 0)
+
+    def test_confirmation_leaves_failed_sends_pending(self):
+        self.bitacora.registrar_intento(registro(1))
+        self.bitacora.registrar_resultado(registro(1), exito=False)
+
+        self.bitacora.confirmar([1])
+
+        self.assertEqual(
+            [(p["id"], p["estado"]) for p in self.bitacora.pendientes()],
+            [(1, "fallido")],
+        )
+        self.assertTrue(self.bitacora.registrar_intento(registro(1)))
+
+
+class EnvioConBitacoraTests(BitacoraTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = administrador(bitacora=self.bitacora)
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_occurrence_in_ledger_is_acknowledged_without_sending(
+        self, conversaciones, enviar
+    ):
+        conversaciones.return_value = {}
+        enviar.return_value = MagicMock(ok=True)
+        lote = reminders.supabase_db.LoteConfirmaciones()
+
+        self.admin._enviar_recordatorio(registro(1), lote=lote)
+        self.admin._enviar_recordatorio(registro(1), lote=lote)
+
+        enviar.assert_called_once()
+        self.assertEqual(list(lote._notificados), [1])
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_rejected_send_is_not_acknowledged_and_is_retried(
+        self, conversaciones, enviar
+    ):
+        conversaciones.return_value = {}
+        enviar.return_value = MagicMock(ok=False)
+        lote = reminders.supabase_db.LoteConfirmaciones()
+
+        self.assertFalse(self.admin._enviar_recordatorio(registro(1), lote=lote))
+
+        self.assertEqual(list(lote._notificados), [])
+        self.assertEqual(
+            self.admin.cola.proximo_vencimiento(),
+            BASE + reminders.REMINDER_RETRY_SECONDS,
+        )
+        enviar.return_value = MagicMock(ok=True)
+        self.assertTrue(self.admin._enviar_recordatorio(registro(1), lote=lote))
+        self.assertEqual(enviar.call_count, 2)
+        self.assertEqual(list(lote._notificados), [1])
+
+    @patch("reminders.supabase_db._rpc_entrega_disponible", True)
+    @patch("reminders.supabase_db.entregar_recordatorios")
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_restart_acknowledges_sent_but_unconfirmed_occurrences(
+        self, por_ids, entregar
+    ):
+        self.bitacora.registrar_intento(registro(1))
+        self.bitacora.registrar_intento(registro(2))
+        self.bitacora.registrar_resultado(registro(2), exito=True)
+        # 2 se aplazó después del envío: ya es otra ocurrencia.
+        por_ids.return_value = [registro(1), registro(2, fecha_hora=iso_utc(BASE + 600))]
+        entregar.return_value = []
+
+        self.assertTrue(self.admin._reconciliar_bitacora())
+
+        entregar.assert_called_once_with([1])
+        self.assertEqual(self.bitacora.pendientes(), [])
+        self.assertTrue(self.admin._bitacora_reconciliada)
+
+    @patch("reminders.supabase_db._rpc_entrega_disponible", True)
+    @patch("reminders.supabase_db.entregar_recordatorios")
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_restart_does_not_acknowledge_failed_sends(self, por_ids, entregar):
+        self.bitacora.registrar_intento(registro(1))
+        self.bitacora.registrar_resultado(registro(1), exito=False)
+        por_ids.return_value = [registro(1)]
+
+        self.assertTrue(self.admin._reconciliar_bitacora())
+
+        entregar.assert_not_called()
+        self.assertEqual([p["estado"] for p in self.bitacora.pendientes()], ["fallido"])
+        self.assertTrue(self.bitacora.registrar_intento(registro(1)))
+
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids", return_value=None)
+    def test_reconciliation_is_retried_while_supabase_is_down(self, por_ids):
+        self.bitacora.registrar_intento(registro(1))
+
+        self.assertFalse(self.admin._reconciliar_bitacora())
+        self.assertFalse(self.admin._bitacora_reconciliada)
+        self.assertEqual(len(self.bitacora.pendientes()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from planificador import iso_utc
+from soporte import BASE, registro
+
+
+class LoteConfirmacionesTests(unittest.TestCase):
+    @patch("reminders.supabase_db.marcar_como_notificados")
+    @patch("reminders.supabase_db.guardar_recordatorios")
+    @patch("reminders.supabase_db._obtener_cliente_supabase_por_hilo")
+    def test_rpc_rolls_the_whole_batch_forward_in_one_call(
+        self, cliente, guardar, notificados
+    ):
+        cliente.return_value.rpc.return_value.execute.return_value.data = [
+            {"id": 100, "fecha_hora": "2026-07-25T12:00:00"}
+        ]
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        for record_id in (1, 2, 1):
+            lote.notificado(record_id)
+        lote.repeticion(1, {"fecha_hora": "2026-07-25T12:00:00"})
+
+        with patch.object(reminders.supabase_db, "_rpc_entrega_disponible", None):
+            creados = lote.confirmar()
+
+        cliente.return_value.rpc.assert_called_once_with(
+            "arv_entregar_recordatorios", {"p_ids": [1, 2]}
+        )
+        guardar.assert_not_called()
+        notificados.assert_not_called()
+        self.assertEqual([c["id"] for c in creados], [100])
+        self.assertEqual(len(lote), 0)
+
+    @patch("reminders.supabase_db.marcar_como_notificados")
+    @patch("reminders.supabase_db._obtener_cliente_supabase_por_hilo")
+    def test_missing_rpc_falls_back_and_failed_rpc_is_retried(
+        self, cliente, notificados
+    ):
+        notificados.side_effect = lambda ids: list(ids)
+        rpc = cliente.return_value.rpc.return_value.execute
+        lote = reminders.supabase_db.LoteConfirmaciones()
+
+        with patch.object(reminders.supabase_db, "_rpc_entrega_disponible", True):
+            rpc.side_effect = RuntimeError("timeout")
+            lote.notificado(1)
+            self.assertEqual(lote.confirmar(), [])
+            notificados.assert_not_called()
+            self.assertEqual(len(lote), 1)
+
+            rpc.side_effect = RuntimeError("PGRST202 Could not find the function")
+            self.assertEqual(lote.confirmar(), [])
+            notificados.assert_called_once_with([1])
+            self.assertFalse(reminders.supabase_db._rpc_entrega_disponible)
+            self.assertEqual(len(lote), 0)
+
+    @patch.object(reminders.supabase_db, "_rpc_entrega_disponible", False)
+    @patch("reminders.supabase_db.marcar_como_repetidos")
+    @patch("reminders.supabase_db.guardar_recordatorios")
+    @patch("reminders.supabase_db.marcar_como_notificados")
+    def test_cycle_is_acknowledged_with_one_call_per_kind(
+        self, notificados, guardar, repetidos
+    ):
+        notificados.side_effect = lambda ids: list(ids)
+        guardar.side_effect = lambda filas: [
+            dict(f, id=100 + i) for i, f in enumerate(filas)
+        ]
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        for record_id in (1, 2, 3):
+            lote.notificado(record_id)
+        lote.repeticion(1, {"fecha_hora": "2026-07-25T12:00:00+00:00"})
+        lote.repeticion(3, {"fecha_hora": "2026-07-26T12:00:00+00:00"})
+
+        creados = lote.confirmar()
+
+        notificados.assert_called_once_with([1, 2, 3])
+        guardar.assert_called_once()
+        repetidos.assert_called_once_with([1, 3])
+        self.assertEqual([c["id"] for c in creados], [100, 101])
+        self.assertEqual(len(lote), 0)
+
+    @patch.object(reminders.supabase_db, "_rpc_entrega_disponible", False)
+    @patch("reminders.supabase_db.marcar_como_repetidos")
+    @patch("reminders.supabase_db.guardar_recordatorios")
+    @patch("reminders.supabase_db.marcar_como_notificados")
+    def test_failed_writes_stay_queued_for_the_next_cycle(
+        self, notificados, guardar, repetidos
+    ):
+        notificados.side_effect = RuntimeError("Supabase caído")
+        guardar.return_value = None
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        lote.notificado(1)
+        lote.repeticion(1, {"fecha_hora": "2026-07-25T12:00:00+00:00"})
+
+        self.assertEqual(lote.confirmar(), [])
+
+        repetidos.assert_not_called()
+        self.assertEqual(len(lote), 2)
+
+    @patch("reminders.supabase_db._notificar_cambio_recordatorio")
+    @patch("reminders.supabase_db._obtener_cliente_supabase_por_hilo")
+    def test_bulk_insert_returns_the_saved_prefix_when_a_batch_fails(
+        self, cliente, notificar
+    ):
+        insertar = cliente.return_value.table.return_value.insert
+        insertar.return_value.execute.side_effect = [
+            Mock(data=[{"id": 100}, {"id": 101}]),
+            RuntimeError("timeout"),
+        ]
+        filas = [
+            {"chat_id": "42", "usuario": "ana", "nombre_tarea": f"T{i}",
+             "creado_en": iso_utc(BASE)}
+            for i in range(3)
+        ]
+
+        creados = reminders.supabase_db.guardar_recordatorios(filas, tamano_lote=2)
+
+        self.assertEqual([c["id"] for c in creados], [100, 101])
+        insertar.return_value.execute.side_effect = RuntimeError("timeout")
+        self.assertIsNone(reminders.supabase_db.guardar_recordatorios(filas))
+
+    @patch.object(reminders.supabase_db, "_rpc_entrega_disponible", False)
+    @patch("reminders.supabase_db.marcar_como_repetidos")
+    @patch("reminders.supabase_db.guardar_recordatorios")
+    @patch("reminders.supabase_db.marcar_como_notificados")
+    def test_partial_insert_requeues_only_the_unsaved_repetitions(
+        self, notificados, guardar, repetidos
+    ):
+        notificados.side_effect = lambda ids: list(ids)
+        guardar.return_value = [{"id": 100}]
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        lote.repeticion(1, {"fecha_hora": "2026-07-25T12:00:00+00:00"})
+        lote.repeticion(3, {"fecha_hora": "2026-07-26T12:00:00+00:00"})
+
+        self.assertEqual(lote.confirmar(), [{"id": 100}])
+
+        repetidos.assert_called_once_with([1])
+        self.assertEqual(list(lote._repeticiones), [3])
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    @patch("reminders.supabase_db.guardar_recordatorio")
+    @patch("reminders.supabase_db.marcar_como_notificado")
+    def test_send_with_batch_defers_supabase_writes(
+        self, marcar, guardar, conversaciones, enviar
+    ):
+        conversaciones.return_value = {}
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        admin = reminders.AdministradorRecordatorios()
+
+        admin._enviar_recordatorio(
+            registro(
+                7, -60, usuario="ana", nombre_tarea="Pagar",
+                descripcion="Luz", repetir=True,
+                intervalo_repeticion="d", intervalos=1,
+            ),
+            lote=lote,
+        )
+
+        enviar.assert_called_once()
+        marcar.assert_not_called()
+        guardar.assert_not_called()
+        self.assertEqual(list(lote._notificados), [7])
+        self.assertEqual(list(lote._repeticiones), [7])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from despacho import DespachadorPorChat
+from soporte import administrador, registro
+
+
+class DespachadorPorChatTests(unittest.TestCase):
+    def test_chats_run_concurrently_but_each_chat_keeps_its_order(self):
+        despachador = DespachadorPorChat(trabajadores=4)
+        self.addCleanup(despachador.detener)
+        lock = threading.Lock()
+        activos = {"ahora": 0, "max": 0}
+        orden = {}
+
+        def enviar(elemento):
+            with lock:
+                activos["ahora"] += 1
+                activos["max"] = max(activos["max"], activos["ahora"])
+            time.sleep(0.02)
+            with lock:
+                activos["ahora"] -= 1
+                orden.setdefault(elemento["chat_id"], []).append(elemento["id"])
+            if elemento["id"] == 5:
+                raise RuntimeError("Telegram caído")
+            return elemento["id"] * 10
+
+        elementos = [
+            {"id": i, "chat_id": str(i % 3)} for i in range(9)
+        ]
+        resultados = despachador.despachar(elementos, enviar)
+
+        self.assertGreater(activos["max"], 1)
+        self.assertEqual(orden, {
+            "0": [0, 3, 6],
+            "1": [1, 4, 7],
+            "2": [2, 5, 8],
+        })
+        self.assertEqual(resultados[4], 40)
+        self.assertIsNone(resultados[5])
+        stats = despachador.estadisticas()
+        self.assertEqual(stats["pendientes"], 0)
+        self.assertEqual(stats["ultimo_ciclo"]["enviados"], 8)
+        self.assertEqual(stats["ultimo_ciclo"]["errores"], 1)
+        self.assertEqual(stats["ultimo_ciclo"]["chats"], 3)
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_rejected_sends_are_counted_as_errors(self, conversaciones, enviar):
+        conversaciones.return_value = {}
+        enviar.side_effect = lambda chat_id, *a, **k: Mock(ok=chat_id != "2")
+        admin = administrador()
+        admin.despachador = DespachadorPorChat(trabajadores=1)
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        elementos = [
+            registro(i, -30, chat_id=str(i), usuario="ana", nombre_tarea="T", descripcion="")
+            for i in range(1, 4)
+        ]
+
+        admin.despachador.despachar(
+            elementos, lambda e: admin._enviar_recordatorio(e, lote=lote)
+        )
+
+        ciclo = admin.despachador.estadisticas()["ultimo_ciclo"]
+        self.assertEqual((ciclo["enviados"], ciclo["errores"]), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import metricas
+from planificador import iso_utc
+from soporte import BASE, administrador
+
+
+class HistogramaTests(unittest.TestCase):
+    def test_buckets_are_cumulative_in_exposition(self):
+        histograma = metricas.Histograma("arv_test_latency_seconds", "Prueba.", (1, 5))
+        for valor in (0.5, 2, 2, 30):
+            histograma.observar(valor)
+
+        texto = metricas.exponer()
+
+        self.assertIn('arv_test_latency_seconds_bucket{le="1"} 1', texto)
+        self.assertIn('arv_test_latency_seconds_bucket{le="5"} 3', texto)
+        self.assertIn('arv_test_latency_seconds_bucket{le="+Inf"} 4', texto)
+        self.assertIn("arv_test_latency_seconds_sum 34.5", texto)
+
+    def test_label_values_are_escaped(self):
+        contador = metricas.Contador("arv_test_escaped_total", "Prueba.", ("operacion",))
+        contador.inc(operacion='GET "a\\b"\nc')
+
+        self.assertIn(
+            'arv_test_escaped_total{operacion="GET \\"a\\\\b\\"\\nc"} 1',
+            metricas.exponer(),
+        )
+
+
+class EndpointMetricasTests(unittest.TestCase):
+    def setUp(self):
+        from flask import Flask
+        import routes
+
+        app = Flask(__name__)
+        app.register_blueprint(routes.routes)
+        self.cliente = app.test_client()
+
+    def test_public_endpoint_needs_the_configured_token(self):
+        with patch.object(metricas, "REMINDER_METRICS_TOKEN", ""):
+            self.assertEqual(self.cliente.get("/metrics").status_code, 404)
+        with patch.object(metricas, "REMINDER_METRICS_TOKEN", "secreto"):
+            self.assertEqual(self.cliente.get("/metrics").status_code, 401)
+            respuesta = self.cliente.get(
+                "/metrics", headers={"Authorization": "Bearer secreto"}
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn("arv_reminder_cycles_total", respuesta.get_data(as_text=True))
+
+
+class MetricasCicloTests(unittest.TestCase):
+    @patch("reminders.enviar_mensaje_con_grid", return_value=Mock(ok=True))
+    @patch("reminders.conversations.inicializar_conversaciones", return_value={})
+    @patch("reminders.supabase_db.LoteConfirmaciones.confirmar", return_value=[])
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_cycle_records_delivery_lag_and_request_counts(
+        self, por_ids, confirmar, conversaciones, enviar
+    ):
+        registro = {
+            "id": 1,
+            "chat_id": "42",
+            "usuario": "ana",
+            "nombre_tarea": "Agua",
+            "descripcion": "Beber",
+            "fecha_hora": iso_utc(BASE - 7),
+            "notificado": False,
+        }
+        por_ids.return_value = [registro]
+        admin = administrador()
+        admin._proxima_recarga = admin._proxima_resincronizacion = BASE + 60
+        admin.cola.programar(registro)
+        retrasos = metricas.RETRASO_ENTREGA.cuenta
+        suma = metricas.RETRASO_ENTREGA._suma
+        ciclos = metricas.CICLOS.total()
+        envios = metricas.ENVIOS_TELEGRAM.valor(resultado="ok")
+
+        admin._ciclo_entregas()
+        admin.despachador.detener()
+
+        self.assertEqual(metricas.RETRASO_ENTREGA.cuenta, retrasos + 1)
+        self.assertAlmostEqual(metricas.RETRASO_ENTREGA._suma - suma, 7)
+        self.assertEqual(metricas.CICLOS.total(), ciclos + 1)
+        self.assertEqual(metricas.ENVIOS_TELEGRAM.valor(resultado="ok"), envios + 1)
+        self.assertEqual(metricas.VENCIDOS_CICLO.valor(), 1)
+        self.assertEqual(metricas.EN_COLA.valor(), 0)
+
+
+class PeticionesSupabaseTests(unittest.TestCase):
+    def test_every_postgrest_request_of_an_instrumented_client_is_counted(self):
+        import httpx
+        from supabase import create_client
+
+        def responder(peticion):
+            return httpx.Response(200, json=[], request=peticion)
+
+        cliente = metricas.instrumentar_supabase(create_client(
+            "https://demo.supabase.co", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+        ))
+        metricas.instrumentar_supabase(cliente)  # Idempotente
+        cliente.postgrest.session._transport = httpx.MockTransport(responder)
+        lecturas = metricas.PETICIONES_SUPABASE.valor(operacion="GET recordatorios")
+        rpc = metricas.PETICIONES_SUPABASE.valor(
+            operacion="POST rpc/arv_entregar_recordatorios"
+        )
+
+        cliente.table("recordatorios").select("id").execute()
+        cliente.rpc("arv_entregar_recordatorios", {"p_ids": [1]}).execute()
+
+        self.assertEqual(
+            metricas.PETICIONES_SUPABASE.valor(operacion="GET recordatorios"), lecturas + 1
+        )
+        self.assertEqual(
+            metricas.PETICIONES_SUPABASE.valor(
+                operacion="POST rpc/arv_entregar_recordatorios"
+            ),
+            rpc + 1,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
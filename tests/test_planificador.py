@@ -0,0 +1,256 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from planificador import ColaVencimientos, iso_utc, marca_tiempo_utc
+from soporte import BASE, RelojFijo, administrador, registro
+
+
+class ColaVencimientosTests(unittest.TestCase):
+    def test_naive_dates_are_read_as_utc(self):
+        self.assertEqual(marca_tiempo_utc("2026-07-24T12:00:00"), BASE)
+        self.assertEqual(marca_tiempo_utc("2026-07-24T12:00:00Z"), BASE)
+        self.assertIsNone(marca_tiempo_utc("no es fecha"))
+
+    def test_extracts_in_due_order_and_reschedule_replaces_entry(self):
+        cola = ColaVencimientos(reloj=RelojFijo(BASE))
+        cola.programar(registro(1, 30))
+        cola.programar(registro(2, -10))
+        cola.programar(registro(3, 5))
+        cola.programar(registro(1, -5))
+        cola.cancelar(3)
+
+        self.assertEqual(len(cola), 2)
+        vencidos = cola.extraer_vencidos(BASE)
+        self.assertEqual([r["id"] for r in vencidos], [2, 1])
+        self.assertIsNone(cola.proximo_vencimiento())
+
+    def test_earlier_item_wakes_the_waiting_thread(self):
+        cola = ColaVencimientos()
+        cola.programar(registro(1, 0), vencimiento=time.time() + 60)
+        terminado = threading.Event()
+
+        def esperar():
+            cola.esperar()
+            terminado.set()
+
+        hilo = threading.Thread(target=esperar, daemon=True)
+        hilo.start()
+        time.sleep(0.05)
+        cola.programar(registro(2, 0), vencimiento=time.time())
+        self.assertTrue(terminado.wait(2))
+
+
+class AdministradorEntregasTests(unittest.TestCase):
+    def setUp(self):
+        self.reloj = RelojFijo()
+        self.admin = administrador(self.reloj)
+
+    @patch.object(reminders.AdministradorRecordatorios, "_enviar_recordatorio")
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_delivers_only_rows_still_pending_in_supabase(self, por_ids, enviar):
+        enviar.return_value = None
+        por_ids.return_value = [
+            registro(1, -60),
+            registro(2, -60, notificado=True),
+            registro(3, 300),
+            registro(4, -60, notificado=True, aviso_constante=True),
+        ]
+        for record_id in (1, 2, 3, 4, 5):
+            self.admin.cola.programar(registro(record_id, -60))
+
+        self.admin._entregar(self.admin.cola.extraer_vencidos(BASE))
+
+        por_ids.assert_called_once_with([1, 2, 3, 4, 5])
+        self.assertEqual(
+            [c.args[0]["id"] for c in enviar.call_args_list],
+            [1, 4],
+        )
+        # Aplazado: vuelve a la cola con su nueva hora.
+        self.assertEqual(self.admin.cola.proximo_vencimiento(), BASE + 60)
+        self.assertIn(3, self.admin.cola)
+        # Constante: se reenvía tras el intervalo configurado.
+        self.assertIn(4, self.admin.cola)
+
+    @patch("reminders.chat_bloqueado", new=lambda chat_id: chat_id == "13")
+    @patch.object(reminders.AdministradorRecordatorios, "_enviar_recordatorio")
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_blocked_chat_is_acknowledged_without_sending(self, por_ids, enviar):
+        por_ids.return_value = [
+            registro(1, -60),
+            registro(2, -60, chat_id="13", aviso_constante=True),
+        ]
+        for record_id in (1, 2):
+            self.admin.cola.programar(registro(record_id, -60))
+
+        with patch.object(self.admin._confirmaciones, "confirmar", return_value=[]):
+            self.admin._entregar(self.admin.cola.extraer_vencidos(BASE))
+
+        self.assertEqual([c.args[0]["id"] for c in enviar.call_args_list], [1])
+        self.assertIn(2, self.admin._confirmaciones._notificados)
+        self.assertNotIn(2, self.admin.cola)
+
+    @patch.object(reminders.AdministradorRecordatorios, "_enviar_recordatorio")
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_keeps_due_rows_when_supabase_does_not_answer(self, por_ids, enviar):
+        por_ids.return_value = None
+        self.admin.cola.programar(registro(1, -60))
+
+        self.admin._entregar(self.admin.cola.extraer_vencidos(BASE))
+
+        enviar.assert_not_called()
+        self.assertEqual(
+            self.admin.cola.proximo_vencimiento(),
+            BASE + reminders.REMINDER_RETRY_SECONDS,
+        )
+
+    @patch("reminders.supabase_db.obtener_recordatorios_nuevos_en_ventana")
+    @patch("reminders.supabase_db.obtener_recordatorios_pendientes")
+    def test_incremental_load_uses_previous_horizon_and_last_id(
+        self, pendientes, nuevos
+    ):
+        self.admin._horizonte = None
+        pendientes.return_value = [registro(7, 100), registro(9, 200)]
+        nuevos.return_value = [registro(12, 950)]
+
+        self.admin._cargar_ventana(completa=True)
+        horizonte = self.admin._horizonte
+        self.reloj.ahora = BASE + 120
+        self.admin._cargar_ventana()
+
+        kwargs = nuevos.call_args.kwargs
+        self.assertEqual(kwargs["desde_fecha"], iso_utc(horizonte))
+        self.assertEqual(kwargs["desde_id"], 9)
+        self.assertEqual(self.admin._ultimo_id, 12)
+        self.assertEqual(len(self.admin.cola), 3)
+
+    @patch("reminders.supabase_db.obtener_recordatorios_pendientes")
+    def test_failed_full_read_keeps_window_and_retries(self, pendientes):
+        self.admin._horizonte = BASE + 900
+        self.admin._proxima_resincronizacion = 0.0
+        self.admin.cola.programar(registro(3, 300))
+        pendientes.return_value = None
+
+        self.assertEqual(self.admin._cargar_ventana(completa=True), 0)
+
+        self.assertEqual(self.admin._horizonte, BASE + 900)
+        self.assertEqual(len(self.admin.cola), 1)
+        self.assertEqual(
+            self.admin._proxima_resincronizacion,
+            BASE + reminders.REMINDER_RETRY_SECONDS,
+        )
+
+        pendientes.return_value = [registro(3, 300), registro(4, 400)]
+        self.reloj.ahora = BASE + reminders.REMINDER_RETRY_SECONDS
+        self.admin._cargar_ventana(completa=True)
+
+        self.assertGreater(self.admin._horizonte, BASE + 900)
+        self.assertEqual(len(self.admin.cola), 2)
+
+
+class WorkerTests(unittest.TestCase):
+    @patch("reminders.calentar_conexiones", new=lambda: None)
+    @patch("crypto_alerts.detener_monitor_criptoalertas")
+    @patch("crypto_alerts.iniciar_monitor_criptoalertas")
+    @patch("reminders.detener_administrador")
+    @patch("reminders.iniciar_administrador")
+    @patch("reminders.supabase_db.inicializar_supabase")
+    def test_worker_waits_for_supabase_then_owns_delivery_until_stopped(
+        self, inicializar, iniciar, detener, iniciar_monitor, detener_monitor
+    ):
+        inicializar.side_effect = [False, True]
+        evento = threading.Event()
+        hilo = threading.Thread(
+            target=reminders.ejecutar_worker,
+            kwargs={"detener": evento, "espera_reintento": 0.01},
+        )
+        hilo.start()
+        for _ in range(200):
+            if iniciar_monitor.called:
+                break
+            time.sleep(0.01)
+        evento.set()
+        hilo.join(2)
+
+        self.assertFalse(hilo.is_alive())
+        self.assertEqual(inicializar.call_count, 2)
+        iniciar.assert_called_once()
+        iniciar_monitor.assert_called_once()
+        detener.assert_called_once()
+        detener_monitor.assert_called_once()
+
+
+class CambiosRecordatoriosTests(unittest.TestCase):
+    def setUp(self):
+        self.reloj = RelojFijo()
+        self.admin = administrador(self.reloj)
+
+    def test_local_write_notifies_subscribed_scheduler(self):
+        reminders.supabase_db.suscribir_cambios_recordatorios(
+            self.admin._al_cambiar_recordatorio
+        )
+        self.addCleanup(
+            reminders.supabase_db.cancelar_suscripcion_recordatorios,
+            self.admin._al_cambiar_recordatorio,
+        )
+
+        reminders.supabase_db._notificar_cambio_recordatorio(
+            "guardado", [registro(5, 300)]
+        )
+
+        self.assertEqual(self.admin.cola.proximo_vencimiento(), BASE + 300)
+
+    def test_snooze_reschedules_and_out_of_window_or_deleted_rows_leave(self):
+        self.admin.cola.programar(registro(1, 30))
+        self.admin.cola.programar(registro(2, 30))
+        self.admin.cola.programar(registro(3, 30))
+
+        self.admin._al_cambiar_recordatorio("guardado", registro(1, 120))
+        self.admin._al_cambiar_recordatorio("guardado", registro(2, 5000))
+        self.admin._al_cambiar_recordatorio("eliminado", {"id": 3})
+
+        self.assertEqual(
+            [r["id"] for r in self.admin.cola.extraer_vencidos(BASE + 900)],
+            [1],
+        )
+
+    def test_stopped_constant_reminder_is_cancelled(self):
+        constante = registro(
+            4, -60, notificado=True, aviso_constante=True
+        )
+        self.admin._al_cambiar_recordatorio("guardado", constante)
+        self.assertIn(4, self.admin.cola)
+
+        self.admin._al_cambiar_recordatorio(
+            "guardado", dict(constante, aviso_detenido=True)
+        )
+        self.assertNotIn(4, self.admin.cola)
+
+    @patch("reminders.supabase_db.obtener_recordatorios_por_ids")
+    def test_postgres_notifications_are_fetched_in_one_batch(self, por_ids):
+        por_ids.return_value = [registro(8, 60)]
+        self.admin.cola.programar(registro(9, 60))
+
+        self.admin._al_notificar_postgres([
+            {"id": 8, "op": "UPDATE"},
+            {"id": 8, "op": "UPDATE"},
+            {"id": 9, "op": "DELETE"},
+        ])
+
+        por_ids.assert_called_once_with([8])
+        self.assertIn(8, self.admin.cola)
+        self.assertNotIn(9, self.admin.cola)
+
+
+if __name__ == "__main__":
+    unittest.main()
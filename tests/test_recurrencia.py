@@ -0,0 +1,94 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from recurrencia import siguiente_ocurrencia
+
+
+class SiguienteOcurrenciaTests(unittest.TestCase):
+    def test_on_time_reminder_moves_one_interval(self):
+        fecha = datetime(2026, 7, 24, 12, 0)
+        self.assertEqual(
+            siguiente_ocurrencia(fecha, "x", 5, ahora=datetime(2026, 7, 24, 12, 0, 3)),
+            (datetime(2026, 7, 24, 12, 5), 0),
+        )
+
+    def test_day_of_downtime_jumps_to_first_future_occurrence(self):
+        fecha = datetime(2026, 7, 23, 12, 0)
+        ahora = datetime(2026, 7, 24, 12, 2, tzinfo=timezone.utc)
+
+        siguiente, omitidas = siguiente_ocurrencia(fecha, "x", 5, ahora=ahora)
+
+        self.assertEqual(siguiente, datetime(2026, 7, 24, 12, 5))
+        self.assertEqual(omitidas, 24 * 12)
+
+    def test_months_are_anchored_to_the_original_day(self):
+        fecha = datetime(2026, 1, 31, 9, 0)
+        self.assertEqual(
+            siguiente_ocurrencia(fecha, "m", 1, ahora=datetime(2026, 1, 31, 9, 1)),
+            (datetime(2026, 2, 28, 9, 0), 0),
+        )
+        self.assertEqual(
+            siguiente_ocurrencia(fecha, "m", 1, ahora=datetime(2026, 3, 1)),
+            (datetime(2026, 3, 31, 9, 0), 1),
+        )
+        self.assertEqual(
+            siguiente_ocurrencia(
+                datetime(2024, 2, 29), "a", 1, ahora=datetime(2027, 3, 1)
+            ),
+            (datetime(2028, 2, 29), 3),
+        )
+
+    def test_invalid_interval_has_no_next_occurrence(self):
+        self.assertEqual(
+            siguiente_ocurrencia(datetime(2026, 7, 24), "q", 1), (None, 0)
+        )
+        self.assertEqual(
+            siguiente_ocurrencia(datetime(2026, 7, 24), "d", 0), (None, 0)
+        )
+
+
+class EnvioRecurrenteTests(unittest.TestCase):
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_missed_occurrences_are_summarised_in_one_message(
+        self, conversaciones, enviar
+    ):
+        conversaciones.return_value = {}
+        ahora = datetime(2026, 7, 24, 12, 2, tzinfo=timezone.utc).timestamp()
+        admin = reminders.AdministradorRecordatorios(reloj=lambda: ahora)
+        lote = reminders.supabase_db.LoteConfirmaciones()
+
+        admin._enviar_recordatorio(
+            {
+                "id": 3,
+                "chat_id": "42",
+                "usuario": "ana",
+                "nombre_tarea": "Agua",
+                "descripcion": "Beber",
+                "fecha_hora": "2026-07-23T12:00:00",
+                "repetir": True,
+                "intervalo_repeticion": "x",
+                "intervalos": 5,
+            },
+            lote=lote,
+        )
+
+        enviar.assert_called_once()
+        self.assertIn("Te perdiste 288 repeticiones", enviar.call_args.args[1])
+        ((origen, nuevo),) = lote._repeticiones.items()
+        self.assertEqual(origen, 3)
+        self.assertEqual(nuevo["fecha_hora"], "2026-07-24T12:05:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
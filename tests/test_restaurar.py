@@ -0,0 +1,171 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import backup_db
+import restaurar_db
+
+
+BACKUP_TEST_DSN = os.getenv("BACKUP_TEST_DSN", "")
+
+
+class ColumnaInexistente(Exception):
+    code = restaurar_db.COLUMNA_INEXISTENTE
+
+
+class SupabaseRegistro:
+    """
+    Recibe los UPSERT de la restauración; puede fallar a partir de una clave.
+    ``sin_columnas`` simula columnas que la tabla de Supabase no tiene.
+    """
+
+    def __init__(self, fallar_desde=None, sin_columnas=()):
+        self.filas = {}
+        self.lotes = 0
+        self.fallar_desde = fallar_desde
+        self.sin_columnas = set(sin_columnas)
+        self.lecturas = 0
+        self._lock = threading.Lock()
+
+    def table(self, tabla):
+        registro = self
+
+        class Consulta:
+            lote = None
+
+            def select(self, columnas):
+                self.columnas = set(columnas.split(","))
+                return self
+
+            def limit(self, cantidad):
+                return self
+
+            def upsert(self, lote, on_conflict, returning):
+                self.lote = lote
+                return self
+
+            def execute(self):
+                if self.lote is None:
+                    registro.lecturas += 1
+                    if self.columnas & registro.sin_columnas:
+                        raise ColumnaInexistente("column does not exist")
+                    return SimpleNamespace(data=[])
+                if set(self.lote[0]) & registro.sin_columnas:
+                    raise ColumnaInexistente("column does not exist")
+                claves = [f["id"] for f in self.lote]
+                if registro.fallar_desde is not None and max(claves) >= registro.fallar_desde:
+                    raise ConnectionError("Supabase caído")
+                with registro._lock:
+                    registro.lotes += 1
+                    registro.filas.update((f["id"], f) for f in self.lote)
+                return SimpleNamespace(data=[])
+
+        return Consulta()
+
+    def rpc(self, nombre, parametros):
+        return SimpleNamespace(execute=lambda: None)
+
+
+class AvanceContiguoTests(unittest.TestCase):
+    def test_checkpoint_only_moves_past_batches_whose_predecessors_finished(self):
+        avance = restaurar_db._AvanceContiguo(None, 0)
+
+        self.assertFalse(avance.terminar(1, 200, 100))
+        self.assertIsNone(avance.ultima_clave)
+        self.assertTrue(avance.terminar(0, 100, 100))
+        self.assertEqual((avance.ultima_clave, avance.filas), (200, 200))
+
+
+class ColumnasDestinoTests(unittest.TestCase):
+    def test_only_columns_present_in_supabase_are_restored(self):
+        columnas = ["id", "chat_id", "actualizado_en"]
+
+        self.assertEqual(
+            restaurar_db._columnas_destino(SupabaseRegistro(), "recordatorios", columnas),
+            columnas,
+        )
+        supabase = SupabaseRegistro(sin_columnas={"actualizado_en"})
+        self.assertEqual(
+            restaurar_db._columnas_destino(supabase, "recordatorios", columnas),
+            ["id", "chat_id"],
+        )
+        self.assertEqual(supabase.lecturas, 4)
+
+    def test_other_errors_are_not_mistaken_for_missing_columns(self):
+        supabase = Mock()
+        consulta = supabase.table.return_value.select.return_value.limit.return_value
+        consulta.execute.side_effect = ConnectionError("Supabase caído")
+
+        with self.assertRaises(ConnectionError):
+            restaurar_db._columnas_destino(supabase, "recordatorios", ["id"])
+
+
+@unittest.skipUnless(BACKUP_TEST_DSN, "BACKUP_TEST_DSN no definido")
+class RestauracionPostgresTests(unittest.TestCase):
+    def setUp(self):
+        import psycopg2
+
+        self.conn = psycopg2.connect(BACKUP_TEST_DSN)
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "DROP TABLE IF EXISTS _backup_metadata, "
+                + ", ".join(backup_db.TABLAS_A_RESPALDAR)
+            )
+            cursor.execute((PROJECT_ROOT / "init_backup_db.sql").read_text("utf-8"))
+            cursor.execute("""
+                INSERT INTO recordatorios (id, chat_id, usuario, nombre_tarea, fecha_hora)
+                SELECT i, '42', 'ana', 'Tarea ' || i, TIMESTAMP '2026-07-24 12:00' + i * INTERVAL '1 minute'
+                FROM generate_series(1, 2500) AS i
+            """)
+        self.conn.commit()
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, "restauracion.json")
+
+    def tearDown(self):
+        self.conn.close()
+        self.directorio.cleanup()
+
+    def _restaurar(self, supabase):
+        return restaurar_db.restaurar_tabla(
+            self.conn, "recordatorios", restaurar_db.PuntosControl(self.ruta),
+            trabajadores=3, lote_tamano=200, crear_cliente=lambda: supabase,
+        )
+
+    def test_restore_preserves_ids_and_resumes_from_checkpoint(self):
+        caido = SupabaseRegistro(fallar_desde=1801)
+        with patch.object(restaurar_db, "RESTORE_RETRIES", 1):
+            with self.assertRaises(ConnectionError):
+                self._restaurar(caido)
+
+        estado = restaurar_db.PuntosControl(self.ruta).tabla("recordatorios")
+        self.assertEqual(estado["ultima_clave"], 1800)
+        self.assertFalse(estado["completa"])
+
+        supabase = SupabaseRegistro()
+        self.assertEqual(self._restaurar(supabase), 2500)
+        self.assertEqual(sorted(supabase.filas), list(range(1801, 2501)))
+        self.assertEqual(supabase.filas[2000]["fecha_hora"], "2026-07-25T21:20:00+00:00")
+        self.assertEqual(supabase.lotes, 4)  # 700 filas en lotes de 200
+
+        # Ya completa: una tercera ejecución no sube nada.
+        self.assertEqual(self._restaurar(SupabaseRegistro(fallar_desde=0)), 2500)
+
+    def test_columns_missing_in_supabase_are_left_out(self):
+        supabase = SupabaseRegistro(sin_columnas={"actualizado_en"})
+
+        self.assertEqual(self._restaurar(supabase), 2500)
+        self.assertNotIn("actualizado_en", supabase.filas[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import reminders
+from soporte import administrador, registro
+
+
+class ResumenPorChatTests(unittest.TestCase):
+    def test_groups_busy_chats_and_keeps_constant_reminders_apart(self):
+        elementos = reminders.agrupar_en_resumenes(
+            [
+                registro(1, 0),
+                registro(2, 0, chat_id="7"),
+                registro(3, 0, aviso_constante=True),
+                registro(4, 0),
+                registro(5, 0),
+            ],
+            minimo=3,
+            maximo=2,
+        )
+
+        self.assertEqual(
+            [e["id"] for e in elementos],
+            ["resumen:1", "resumen:5", 2, 3],
+        )
+        self.assertEqual([r["id"] for r in elementos[0]["resumen"]], [1, 4])
+        self.assertEqual(
+            reminders.agrupar_en_resumenes([registro(1, 0)] * 3, minimo=0),
+            [registro(1, 0)] * 3,
+        )
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_digest_is_one_message_with_buttons_per_item(
+        self, conversaciones, enviar
+    ):
+        conversaciones.return_value = {}
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        registros = [
+            registro(i, -30, usuario="ana", nombre_tarea=f"T{i}", descripcion="")
+            for i in (1, 2)
+        ]
+
+        administrador()._enviar_resumen(
+            registros, lote=lote
+        )
+
+        enviar.assert_called_once()
+        self.assertIn("2 RECORDATORIOS", enviar.call_args.args[1])
+        filas = enviar.call_args.args[2]
+        self.assertEqual(
+            [b["data"] for b in filas[1]],
+            ["snooze:2:5:r", "snooze:2:20:r", "snooze_custom:2:r"],
+        )
+        self.assertEqual(list(lote._notificados), [1, 2])
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_long_digest_is_split_to_fit_telegram_limit(self, conversaciones, enviar):
+        conversaciones.return_value = {}
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        registros = [
+            registro(i, -30, usuario="ana", nombre_tarea=f"T{i}", descripcion="x" * 1500)
+            for i in range(1, 6)
+        ]
+
+        administrador()._enviar_resumen(
+            registros, lote=lote
+        )
+
+        textos = [c.args[1] for c in enviar.call_args_list]
+        self.assertEqual(len(textos), 3)
+        self.assertTrue(all(len(t) <= 4096 for t in textos))
+        self.assertIn("2 RECORDATORIOS", textos[0])
+        self.assertNotIn("RECORDATORIOS*", textos[2])  # El último va solo
+        self.assertEqual(list(lote._notificados), [1, 2, 3, 4, 5])
+
+    @patch("reminders.enviar_mensaje_con_grid")
+    @patch("reminders.conversations.inicializar_conversaciones")
+    def test_rejected_digest_falls_back_to_single_messages(self, conversaciones, enviar):
+        conversaciones.return_value = {}
+        enviar.side_effect = [Mock(ok=False), Mock(ok=True), Mock(ok=True)]
+        lote = reminders.supabase_db.LoteConfirmaciones()
+        registros = [
+            registro(i, -30, usuario="ana", nombre_tarea=f"T{i}", descripcion="")
+            for i in (1, 2)
+        ]
+
+        administrador()._enviar_resumen(
+            registros, lote=lote
+        )
+
+        self.assertEqual(enviar.call_count, 3)
+        self.assertIn("*RECORDATORIO*", enviar.call_args_list[1].args[1])
+        self.assertEqual(list(lote._notificados), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
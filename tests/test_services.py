@@ -0,0 +1,437 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import metricas
+import services
+from archivos_telegram import CacheArchivosTelegram
+
+
+class TelegramLocal(BaseHTTPRequestHandler):
+    """API de Telegram mínima con keep-alive que anota cada conexión."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.peticiones.append((self.path, self.client_address, cuerpo))
+        time.sleep(self.server.demora)
+        estado, respuesta = 200, {"ok": True, "result": {"message_id": 1}}
+        if self.server.respuestas:
+            estado, respuesta = self.server.respuestas.pop(0)
+        respuesta = json.dumps(respuesta).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(respuesta)))
+        self.end_headers()
+        self.wfile.write(respuesta)
+
+    def log_message(self, *args):
+        pass
+
+
+class TelegramTestCase(unittest.TestCase):
+    def setUp(self):
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), TelegramLocal)
+        self.servidor.peticiones = []
+        self.servidor.respuestas = []
+        self.servidor.demora = 0
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.cliente = services.ClienteTelegram(
+            base_url=f"http://127.0.0.1:{self.servidor.server_port}/botTEST",
+            tamano_pool=4,
+            limitador=services.LimitadorTelegram(por_segundo=1000, por_chat=1000),
+        )
+
+    def tearDown(self):
+        self.cliente.cerrar()
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+class ClienteTelegramTests(TelegramTestCase):
+    def test_sequential_calls_reuse_one_keep_alive_connection(self):
+        for i in range(5):
+            respuesta = self.cliente.post("sendMessage", json={"chat_id": 1, "text": str(i)})
+            self.assertEqual(respuesta.status_code, 200)
+
+        conexiones = {direccion for _, direccion, _ in self.servidor.peticiones}
+        self.assertEqual(len(conexiones), 1)
+        self.assertEqual(self.servidor.peticiones[0][0], "/botTEST/sendMessage")
+
+    def test_warm_up_leaves_connections_ready_in_the_pool(self):
+        self.cliente.calentar(conexiones=2)
+        calentadas = {direccion for _, direccion, _ in self.servidor.peticiones}
+
+        self.cliente.post("sendMessage", json={"chat_id": 1, "text": "hola"})
+
+        self.assertEqual(len(calentadas), 2)
+        self.assertIn(self.servidor.peticiones[-1][1], calentadas)
+
+    def test_429_pauses_the_chat_for_retry_after_and_resends(self):
+        self.servidor.respuestas.append(
+            (429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 0.2}})
+        )
+        inicio = time.monotonic()
+
+        respuesta = self.cliente.post("sendMessage", json={"chat_id": 7, "text": "hola"})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(self.servidor.peticiones), 2)
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+
+
+@patch.object(services, "TELEGRAM_RETRY_BASE_SECONDS", 0.01)
+class ReintentosTelegramTests(TelegramTestCase):
+    def setUp(self):
+        super().setUp()
+        parche = patch.object(services, "cliente_telegram", self.cliente)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _cuerpos(self):
+        return [json.loads(cuerpo) for _, _, cuerpo in self.servidor.peticiones]
+
+    def test_server_errors_are_retried_until_success(self):
+        self.servidor.respuestas += [(502, {"ok": False}), (500, {"ok": False})]
+        peticiones = metricas.PETICIONES_TELEGRAM.valor(metodo="sendMessage")
+
+        respuesta = services.enviar_mensaje_con_grid(1, "hola", [])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(self.servidor.peticiones), 3)
+        self.assertEqual(
+            metricas.PETICIONES_TELEGRAM.valor(metodo="sendMessage"), peticiones + 3
+        )
+
+    def test_permanent_errors_are_not_retried(self):
+        self.servidor.respuestas.append((400, {
+            "ok": False,
+            "description": "Bad Request: message is not modified",
+        }))
+
+        respuesta = services.editar_mensaje_texto(1, 10, "*igual*", formato="Markdown")
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(len(self.servidor.peticiones), 1)
+
+    def test_bad_entities_downgrade_parse_mode_exactly_once(self):
+        error = (400, {
+            "ok": False,
+            "description": "Bad Request: can't parse entities: Can't find end of the entity",
+        })
+        self.servidor.respuestas += [error, error]
+
+        respuesta = services.enviar_telegram(1, tipo="texto", mensaje="*roto", formato="Markdown")
+
+        self.assertEqual(respuesta.status_code, 400)
+        cuerpos = self._cuerpos()
+        self.assertEqual(len(cuerpos), 2)
+        self.assertEqual(cuerpos[0]["parse_mode"], "Markdown")
+        self.assertNotIn("parse_mode", cuerpos[1])
+
+    def test_blocked_chat_is_marked_until_a_send_succeeds(self):
+        self.servidor.respuestas.append((403, {
+            "ok": False,
+            "description": "Forbidden: bot was blocked by the user",
+        }))
+
+        services.enviar_mensaje_con_grid(99, "hola", [])
+        self.assertTrue(services.chat_bloqueado(99))
+        self.assertEqual(len(self.servidor.peticiones), 1)
+
+        services.enviar_mensaje_con_grid(99, "hola", [])
+        self.assertFalse(services.chat_bloqueado(99))
+
+
+class CacheEdicionesTests(TelegramTestCase):
+    def setUp(self):
+        super().setUp()
+        for parche in (
+            patch.object(services, "cliente_telegram", self.cliente),
+            patch.object(services, "cache_ediciones", services.CacheEdiciones(capacidad=2)),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def _omitidas(self):
+        return metricas.EDICIONES_TELEGRAM.valor(resultado="omitida")
+
+    def test_unchanged_edit_is_skipped_and_counted(self):
+        botones = [[{"texto": "OK", "data": "ok"}]]
+        services.enviar_mensaje_con_grid(1, "Precio: 10", botones)  # message_id 1
+        omitidas = self._omitidas()
+
+        respuesta = services.editar_mensaje_con_grid(1, 1, "Precio: 10", botones)
+        self.assertEqual(respuesta.json()["result"]["message_id"], 1)
+        services.editar_mensaje_con_grid(1, 1, "Precio: 11", botones)
+        services.editar_mensaje_con_grid(1, 1, "Precio: 11", botones)
+
+        self.assertEqual(len(self.servidor.peticiones), 2)
+        self.assertEqual(self._omitidas() - omitidas, 2)
+        self.assertGreater(metricas.PROPORCION_EDICIONES_OMITIDAS.valor(), 0)
+
+    def test_keyboard_only_edit_keeps_the_remembered_text(self):
+        services.editar_mensaje_texto(1, 5, "Hola")
+        services.editar_botones_mensaje(1, 5, [{"texto": "A", "data": "a"}])
+        services.editar_botones_mensaje(1, 5, [{"texto": "A", "data": "a"}])
+        services.editar_mensaje_con_botones(1, 5, "Hola", [{"texto": "A", "data": "a"}])
+
+        self.assertEqual(len(self.servidor.peticiones), 2)
+
+    def test_not_modified_reply_is_remembered_and_lru_is_bounded(self):
+        self.servidor.respuestas.append((400, {
+            "ok": False,
+            "description": "Bad Request: message is not modified",
+        }))
+        services.editar_mensaje_texto(1, 5, "Hola")
+        services.editar_mensaje_texto(1, 5, "Hola")
+        self.assertEqual(len(self.servidor.peticiones), 1)
+
+        services.editar_mensaje_texto(1, 6, "Hola")
+        services.editar_mensaje_texto(1, 7, "Hola")  # Desplaza al mensaje 5
+        services.editar_mensaje_texto(1, 5, "Hola")
+        self.assertEqual(len(self.servidor.peticiones), 4)
+
+
+    def test_failed_edit_forgets_the_message(self):
+        services.editar_mensaje_texto(1, 5, "Hola")
+        self.servidor.respuestas.append((400, {
+            "ok": False,
+            "description": "Bad Request: message to edit not found",
+        }))
+        services.editar_mensaje_texto(1, 5, "Adiós")
+        services.editar_mensaje_texto(1, 5, "Hola")
+
+        self.assertEqual(len(self.servidor.peticiones), 3)
+
+    def test_cache_is_off_when_other_processes_edit_too(self):
+        self.assertFalse(services.varios_procesos_editan({}))
+        self.assertTrue(services.varios_procesos_editan({"WEB_ONLY": "true"}))
+        self.assertTrue(services.varios_procesos_editan({"WEB_WORKERS": "4"}))
+        self.assertTrue(services.varios_procesos_editan({"REMINDER_LEASE_DSN": "postgres://"}))
+
+
+class ClienteTelegramAsyncTests(TelegramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.asincrono = services.ClienteTelegramAsync(
+            base_url=self.cliente.base_url,
+            max_conexiones=100,
+            limitador=services.LimitadorTelegram(por_segundo=1000, por_chat=1000),
+        )
+        self.addCleanup(self.asincrono.cerrar)
+
+    def test_one_thread_keeps_many_calls_in_flight(self):
+        self.servidor.demora = 0.2
+        inicio = time.monotonic()
+
+        futuros = [
+            self.asincrono.programar(self.asincrono.post_async(
+                "sendMessage", json={"chat_id": i, "text": "hola"}
+            ))
+            for i in range(50)
+        ]
+        respuestas = [futuro.result(5) for futuro in futuros]
+
+        self.assertTrue(all(r.status_code == 200 for r in respuestas))
+        self.assertLess(time.monotonic() - inicio, 2)  # En serie serían 10 s
+
+    def test_sync_facade_returns_requests_response_and_retries(self):
+        self.servidor.respuestas.append((503, {"ok": False}))
+        peticiones = metricas.PETICIONES_TELEGRAM.valor(metodo="sendMessage")
+
+        with patch.object(services, "TELEGRAM_RETRY_BASE_SECONDS", 0.01):
+            respuesta = self.asincrono.post("sendMessage", json={"chat_id": 1, "text": "hola"})
+
+        self.assertTrue(respuesta.ok)
+        self.assertEqual(
+            metricas.PETICIONES_TELEGRAM.valor(metodo="sendMessage"), peticiones + 2
+        )
+        self.assertEqual(respuesta.json()["result"]["message_id"], 1)
+        self.assertEqual(len(self.servidor.peticiones), 2)
+
+    def test_async_helpers_share_the_edit_cache(self):
+        with patch.object(services, "cliente_telegram_async", self.asincrono), \
+                patch.object(services, "cache_ediciones", services.CacheEdiciones()):
+            for _ in range(2):
+                services.ejecutar_async(
+                    services.editar_mensaje_async(1, 5, "Hola", [[{"texto": "A", "data": "a"}]])
+                ).result(5)
+
+        self.assertEqual(len(self.servidor.peticiones), 1)
+        cuerpo = json.loads(self.servidor.peticiones[0][2])
+        self.assertEqual(cuerpo["reply_markup"]["inline_keyboard"][0][0]["callback_data"], "a")
+
+
+    def test_async_edit_with_url_drops_markdown_like_the_sync_helper(self):
+        with patch.object(services, "cliente_telegram_async", self.asincrono), \
+                patch.object(services, "cache_ediciones", services.CacheEdiciones()):
+            services.ejecutar_async(services.editar_mensaje_async(
+                1, 5, "Ver https://example.com/a_b", formato="Markdown"
+            )).result(5)
+
+        cuerpo = json.loads(self.servidor.peticiones[0][2])
+        self.assertNotIn("parse_mode", cuerpo)
+
+    def test_scheduled_calls_use_the_callers_lane(self):
+        carriles = []
+        original = self.asincrono.limitador.adquirir_async
+
+        async def anotar(chat_id=None, carril=services.PRIORIDAD_INTERACTIVA):
+            carriles.append(carril)
+            await original(chat_id, carril)
+
+        with patch.object(self.asincrono.limitador, "adquirir_async", anotar):
+            with services.prioridad(services.PRIORIDAD_AVISOS):
+                self.asincrono.programar(self.asincrono.post_async(
+                    "sendMessage", json={"chat_id": 1, "text": "aviso"}
+                )).result(5)
+            self.asincrono.programar(self.asincrono.post_async(
+                "sendMessage", json={"chat_id": 1, "text": "masiva"}
+            ), services.PRIORIDAD_MASIVA).result(5)
+
+        self.assertEqual(carriles, [services.PRIORIDAD_AVISOS, services.PRIORIDAD_MASIVA])
+
+    def test_bulk_edits_follow_the_configured_client(self):
+        ediciones = [(1, 5, "uno"), (1, 6, "dos")]
+        with patch.object(services, "cache_ediciones", services.CacheEdiciones()), \
+                patch.object(services, "cliente_telegram_async", self.asincrono), \
+                patch.object(self.asincrono, "programar") as programar:
+            with patch.object(services, "cliente_telegram", self.cliente):
+                respuestas = services.editar_mensajes_texto(ediciones)
+            programar.assert_not_called()
+
+        self.assertEqual([r.status_code for r in respuestas], [200, 200])
+        self.assertEqual(len(self.servidor.peticiones), 2)
+
+        with patch.object(services, "cache_ediciones", services.CacheEdiciones()), \
+                patch.object(services, "cliente_telegram_async", self.asincrono), \
+                patch.object(services, "cliente_telegram", self.asincrono):
+            respuestas = services.editar_mensajes_texto(ediciones)
+
+        self.assertEqual([r.status_code for r in respuestas], [200, 200])
+        self.assertEqual(len(self.servidor.peticiones), 4)
+
+    def test_module_clients_share_one_limiter(self):
+        self.assertIs(services.cliente_telegram.limitador, services.limitador_telegram)
+        self.assertIs(services.cliente_telegram_async.limitador, services.limitador_telegram)
+
+
+class CacheArchivosTests(TelegramTestCase):
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.db = os.path.join(directorio.name, "archivos.db")
+        self.ruta = os.path.join(directorio.name, "reporte.txt")
+        with open(self.ruta, "w", encoding="utf-8") as f:
+            f.write("contenido v1")
+        self.cache = CacheArchivosTelegram(self.db)
+        self.addCleanup(lambda: self.cache.cerrar())
+        for parche in (
+            patch.object(services, "cliente_telegram", self.cliente),
+            patch.object(services, "obtener_cache_archivos", lambda: self.cache),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def _subida(self, file_id):
+        self.servidor.respuestas.append(
+            (200, {"ok": True, "result": {"message_id": 1, "document": {"file_id": file_id}}})
+        )
+
+    def _fue_subida(self, indice):
+        # Solo el cuerpo multipart lleva el contenido del archivo.
+        return b"contenido" in self.servidor.peticiones[indice][2]
+
+    def test_repeated_document_is_sent_by_file_id_even_after_restart(self):
+        self._subida("F1")
+        services.enviar_documento(1, self.ruta, caption="Reporte")
+
+        self.cache.cerrar()
+        self.cache = CacheArchivosTelegram(self.db)  # Reinicio del proceso
+        services.enviar_documento(2, self.ruta, caption="Reporte")
+
+        self.assertTrue(self._fue_subida(0))
+        self.assertEqual(json.loads(self.servidor.peticiones[1][2])["document"], "F1")
+
+    def test_changed_content_or_rejected_file_id_uploads_again(self):
+        self._subida("F1")
+        services.enviar_documento(1, self.ruta)
+        with open(self.ruta, "w", encoding="utf-8") as f:
+            f.write("contenido v2, más largo")
+        self._subida("F2")
+        services.enviar_documento(1, self.ruta)
+        self.assertTrue(self._fue_subida(1))
+
+        self.servidor.respuestas.append((400, {
+            "ok": False, "description": "Bad Request: wrong file identifier/HTTP URL specified",
+        }))
+        self._subida("F3")
+        services.enviar_documento(1, self.ruta)
+
+        self.assertEqual(json.loads(self.servidor.peticiones[2][2])["document"], "F2")
+        self.assertTrue(self._fue_subida(3))
+        self.assertEqual(self.cache.buscar(self.ruta, "document")[0], "F3")
+
+
+class LimitadorTelegramTests(unittest.TestCase):
+    def test_per_chat_bucket_spaces_one_chat_without_slowing_others(self):
+        limitador = services.LimitadorTelegram(por_segundo=1000, por_chat=20, rafaga_chat=1)
+        inicio = time.monotonic()
+        for _ in range(3):
+            limitador.adquirir("1")
+        mismo_chat = time.monotonic() - inicio
+
+        inicio = time.monotonic()
+        for chat_id in range(2, 50):
+            limitador.adquirir(str(chat_id))
+        otros_chats = time.monotonic() - inicio
+
+        self.assertGreaterEqual(mismo_chat, 0.09)
+        self.assertLess(otros_chats, 0.05)
+
+    def test_interactive_lane_overtakes_waiting_broadcast(self):
+        limitador = services.LimitadorTelegram(por_segundo=5, por_chat=1000)
+        for chat_id in range(5):
+            limitador.adquirir(str(chat_id))  # Agota la cubeta global
+        orden = []
+
+        def enviar(nombre, carril):
+            limitador.adquirir(nombre, carril)
+            orden.append(nombre)
+
+        masiva = threading.Thread(target=enviar, args=("masiva", services.PRIORIDAD_MASIVA))
+        masiva.start()
+        time.sleep(0.05)
+        interactiva = threading.Thread(
+            target=enviar, args=("interactiva", services.PRIORIDAD_INTERACTIVA)
+        )
+        interactiva.start()
+        masiva.join(2)
+        interactiva.join(2)
+
+        self.assertEqual(orden, ["interactiva", "masiva"])
+
+    def test_priority_context_sets_lane_for_the_current_thread(self):
+        self.assertEqual(services.prioridad_actual(), services.PRIORIDAD_INTERACTIVA)
+        with services.prioridad(services.PRIORIDAD_MASIVA):
+            self.assertEqual(services.prioridad_actual(), services.PRIORIDAD_MASIVA)
+        self.assertEqual(services.prioridad_actual(), services.PRIORIDAD_INTERACTIVA)
+
+
+if __name__ == "__main__":
+    unittest.main()
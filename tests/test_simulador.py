@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import simulador
+
+
+class SimuladorTests(unittest.TestCase):
+    def test_every_due_reminder_is_delivered_once_through_the_real_scheduler(self):
+        resultado = simulador.simular(
+            recordatorios=600, duracion=3600, series=20, rafaga=0.5,
+            latencia_bd=0.0, latencia_telegram=0.01,
+        )
+
+        # Las series crean ocurrencias nuevas dentro de la hora simulada.
+        self.assertGreater(resultado["entregados"], 600)
+        self.assertEqual(resultado["duplicados"], 0)
+        self.assertEqual(resultado["mensajes"], resultado["entregados"])
+        self.assertLessEqual(resultado["retraso_p50_s"], resultado["retraso_p99_s"])
+        self.assertLess(resultado["llamadas_bd_por_recordatorio"], 3)
+
+    def test_in_memory_store_counts_paged_requests(self):
+        reloj = simulador.RelojVirtual()
+        base = simulador.SupabaseEnMemoria(reloj)
+        for _ in range(450):
+            base.insertar(reloj.ahora - 1, chat_id=1)
+
+        filas = base.obtener_recordatorios_por_ids(range(1, 451))
+
+        self.assertEqual(len(filas), 450)
+        self.assertEqual(base.llamadas, {"por_ids": 3})
+        self.assertEqual(base.entregar_recordatorios([1, 1, 2]), [])
+        self.assertEqual(len(base.obtener_recordatorios_pendientes()), 448)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault("TELEGRAM_TOKEN", "test-token")
+
+import metricas
+import reminders
+from tareas import EjecutorTareas
+
+
+class EjecutorTareasTests(unittest.TestCase):
+    def setUp(self):
+        self.tareas = EjecutorTareas(trabajadores=2)
+        self.soltar = threading.Event()
+
+    def tearDown(self):
+        self.soltar.set()
+        self.tareas.detener(esperar=True)
+
+    def test_overrunning_job_is_skipped_instead_of_queued_again(self):
+        omitidas = metricas.EJECUCIONES_TAREA.valor(tarea="backup", resultado="omitida")
+        primero = self.tareas.lanzar("backup", self.soltar.wait)
+
+        self.assertIsNone(self.tareas.lanzar("backup", self.soltar.wait))
+        self.assertEqual(self.tareas.en_curso(), ["backup"])
+        self.assertEqual(
+            metricas.EJECUCIONES_TAREA.valor(tarea="backup", resultado="omitida"),
+            omitidas + 1,
+        )
+
+        self.soltar.set()
+        self.assertTrue(primero.result(timeout=2))
+        self.assertEqual(self.tareas.en_curso(), [])
+        self.assertIsNotNone(self.tareas.lanzar("backup", lambda: None))
+
+    def test_failing_job_is_reported_and_frees_its_slot(self):
+        def fallar():
+            raise RuntimeError("Supabase caído")
+
+        self.assertIsNone(self.tareas.lanzar("zonas", fallar).result(timeout=2))
+        self.assertEqual(self.tareas.en_curso(), [])
+
+    def test_concurrency_is_bounded_by_the_pool(self):
+        activos, maximo = [0], [0]
+        lock = threading.Lock()
+
+        def trabajo():
+            with lock:
+                activos[0] += 1
+                maximo[0] = max(maximo[0], activos[0])
+            self.soltar.wait(0.05)
+            with lock:
+                activos[0] -= 1
+
+        futuros = [self.tareas.lanzar(f"job{i}", trabajo) for i in range(5)]
+        for futuro in futuros:
+            futuro.result(timeout=2)
+        self.assertEqual(maximo[0], 2)
+
+
+class AgendaMantenimientoTests(unittest.TestCase):
+    def test_schedule_loop_only_enqueues_jobs(self):
+        admin = reminders.AdministradorRecordatorios()
+        soltar = threading.Event()
+        admin.agenda.every(1).seconds.do(
+            admin.tareas.lanzar, "backup", soltar.wait, limite=1
+        )
+
+        admin.agenda.run_all()  # No bloquea aunque el job siga corriendo
+        self.assertEqual(admin.tareas.en_curso(), ["backup"])
+        soltar.set()
+        admin.tareas.detener(esperar=True)
+
+    def test_finished_zone_job_is_cancelled_on_the_schedule_thread(self):
+        admin = reminders.AdministradorRecordatorios()
+        admin.job_corregir = admin.agenda.every(1).minutes.do(lambda: None)
+        admin.corregir_recordatorios = lambda: True
+
+        hilo = threading.Thread(target=admin._job_corregir)
+        hilo.start()
+        hilo.join(2)
+
+        self.assertIsNone(admin.job_corregir)
+        self.assertEqual(len(admin.agenda.jobs), 1)  # Aún no la tocó otro hilo
+        admin._aplicar_cancelaciones()
+        self.assertEqual(admin.agenda.jobs, [])
+        admin.tareas.detener(esperar=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
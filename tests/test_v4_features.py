@@ -720,6 +720,21 @@ class SnoozeTests(unittest.TestCase):
 
         snooze.assert_called_once_with("42", 77, 20, 999)
 
+    @patch("conversations.iniciar_aplazamiento_personalizado")
+    @patch("conversations.aplazar_recordatorio_chat")
+    @patch("conversations.supabase_db.upsert_chat_info")
+    def test_digest_snooze_buttons_answer_in_a_new_message(
+        self,
+        upsert,
+        snooze,
+        custom,
+    ):
+        conversations.procesar_callback("42", "snooze:77:5:r", "Andy", "private", 999)
+        conversations.procesar_callback("42", "snooze_custom:77:r", "Andy", "private", 999)
+
+        snooze.assert_called_once_with("42", 77, 5, None)
+        self.assertIsNone(custom.call_args.kwargs["message_id"])
+
 
 class ReminderButtonTests(unittest.TestCase):
     @patch("reminders.supabase_db.marcar_como_notificado")